@@ -7,4 +7,6 @@ from locators import *
 from rtree import *
 from kdtree import *
 from sphere import *
+from geometryarray import *
+from indexio import *
 #why don't we import collection?
@@ -0,0 +1,400 @@
+"""
+Columnar arrays of geometries for PySAL: Python Spatial Analysis Library.
+"""
+
+import numpy as np
+from scipy import sparse
+from shapes import Point, Chain, Polygon
+
+__all__ = ['GeometryArray']
+
+POINT_TYPES = (1, 8)
+CHAIN_TYPES = (3,)
+POLYGON_TYPES = (5,)
+
+
+class GeometryArray(object):
+    """
+    A collection of geometries of one kind stored in flat arrays
+
+    The vertices of all the geometries are kept in a single array, the
+    parts (rings of polygons, lines of chains) of geometry i are
+    part_offsets[i]:part_offsets[i+1] and the vertices of part j are
+    vertex_offsets[j]:vertex_offsets[j+1], as in the dictionaries returned
+    by read_arrays of the shapefile, WKT and GeoJSON readers. Bounds, areas,
+    centroids and perimeters are computed for all the geometries at once
+    and cached.
+
+    Parameters
+    ----------
+    vertices        : array
+                      Nx2 array with the x, y of all the vertices
+    vertex_offsets  : array
+                      (nparts+1) offsets in vertices of each part
+    part_offsets    : array
+                      (n+1) offsets of the parts of each geometry, defaults
+                      to one part per geometry
+    shape_type      : int
+                      shapefile shape type: 1 (points), 8 (multipoints), 3
+                      (chains) or 5 (polygons), or their Z and M variants
+    bboxes          : array
+                      nx4 array with the bounding box of each geometry, if
+                      known, computed from the vertices otherwise
+
+    Attributes
+    ----------
+    bounds          : array
+                      nx4 array with the bounding box (left, lower, right,
+                      upper) of each geometry, nan for null geometries
+    signed_area     : array
+                      sum of the signed areas of the rings of each polygon,
+                      negative for clockwise outer rings
+    area            : array
+                      area of each polygon, holes excluded
+    centroid        : array
+                      nx2 array with the centroid of each polygon, accounting
+                      for parts and holes
+    perimeter       : array
+                      total length of the rings of each polygon, or of the
+                      parts of each chain
+
+    Notes
+    -----
+    Rings are closed implicitly: the last vertex of a ring is joined to the
+    first one. Holes must be oriented opposite to the outer rings.
+
+    Examples
+    --------
+    >>> import pysal
+    >>> shp = pysal.open(pysal.examples.get_path('columbus.shp'))
+    >>> ga = GeometryArray.from_arrays(shp.read_arrays())
+    >>> len(ga)
+    49
+    >>> polygons = pysal.open(pysal.examples.get_path('columbus.shp')).read()
+    >>> np.allclose(ga.area, [p.area for p in polygons])
+    True
+    >>> np.allclose(ga.centroid, [p.centroid for p in polygons])
+    True
+    >>> ga[0].vertices == polygons[0].vertices
+    True
+    """
+
+    def __init__(self, vertices, vertex_offsets, part_offsets=None,
+                 shape_type=5, bboxes=None):
+        self.vertices = np.asarray(vertices, dtype=float).reshape((-1, 2))
+        self.vertex_offsets = np.asarray(vertex_offsets, dtype=np.int64)
+        if part_offsets is None:
+            part_offsets = np.arange(len(self.vertex_offsets), dtype=np.int64)
+        self.part_offsets = np.asarray(part_offsets, dtype=np.int64)
+        self.shape_type = shape_type
+        self.Z = self.M = None
+        self._cache = {}
+        if bboxes is not None:
+            self._cache['bounds'] = np.asarray(bboxes, dtype=float)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Returns a GeometryArray from a dictionary in the format of
+        read_arrays (see pysal.core.util.shapefile.shp_file.read_arrays)
+        """
+        ga = cls(arrays['Vertices'], arrays['Vertex Offsets'],
+                 arrays['Part Offsets'], arrays['Shape Type'],
+                 arrays.get('BBOX'))
+        ga.Z = arrays.get('Z')
+        ga.M = arrays.get('M')
+        return ga
+
+    @classmethod
+    def from_shapes(cls, shapes):
+        """
+        Returns a GeometryArray with the vertices of a list of Points,
+        Chains or Polygons (one kind only, None for null geometries)
+
+        Polygon parts are stored clockwise and holes counterclockwise, and
+        rings are closed, as in shapefiles.
+
+        Examples
+        --------
+        >>> p = Polygon([Point((0, 0)), Point((10, 0)), Point((10, 10)), Point((0, 10))],
+        ...             [Point((1, 1)), Point((1, 2)), Point((2, 2)), Point((2, 1))])
+        >>> ga = GeometryArray.from_shapes([p, None])
+        >>> ga.area
+        array([ 99.,   0.])
+        >>> ga.centroid[0]
+        array([ 5.03535354,  5.03535354])
+        >>> ga.to_shapes()[0].area
+        99.0
+        """
+        kinds = set([type(s) for s in shapes if s is not None])
+        if len(kinds) > 1:
+            raise TypeError("Geometries of one kind expected (points, chains or polygons)")
+        kind = kinds.pop() if kinds else Polygon
+        numParts, parts = [], []
+        for shape in shapes:
+            if shape is None:
+                numParts.append(0)
+            elif kind is Point:
+                numParts.append(1)
+                parts.append([shape[:]])
+            elif kind is Chain:
+                numParts.append(len(shape._vertices))
+                parts.extend(shape._vertices)
+            elif kind is Polygon:
+                holes = [h[::-1] for h in shape._holes if h]
+                rings = [_closed(r) for r in shape._vertices + holes if r]
+                numParts.append(len(rings))
+                parts.extend(rings)
+            else:
+                raise TypeError("Unsupported shape type: %s" % kind.__name__)
+        shapeType = {Point: 1, Chain: 3, Polygon: 5}[kind]
+        numPoints = [len(part) for part in parts]
+        vertices = np.array([v[:] for part in parts for v in part], float)
+        return cls(vertices.reshape((-1, 2)), _offsets(numPoints),
+                   _offsets(numParts), shapeType)
+
+    def to_arrays(self):
+        """
+        Returns the geometries as a dictionary in the format of read_arrays
+        """
+        arrays = {'Shape Type': self.shape_type, 'BBOX': self.bounds,
+                  'Part Offsets': self.part_offsets,
+                  'Vertex Offsets': self.vertex_offsets,
+                  'Vertices': self.vertices}
+        if self.Z is not None:
+            arrays['Z'] = self.Z
+            arrays['M'] = self.M
+        return arrays
+
+    def to_shapes(self):
+        """
+        Returns the geometries as a list of Point, Chain or Polygon objects
+        (lists of Points for multipoints), None for null geometries
+        """
+        return [self[i] for i in xrange(len(self))]
+
+    def __len__(self):
+        return len(self.part_offsets) - 1
+
+    def __getitem__(self, i):
+        """
+        Returns geometry i as a Point, Chain or Polygon, as read by
+        pysal.open: clockwise rings of polygons are parts and
+        counterclockwise rings are holes
+        """
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('geometry index out of range')
+        vo = self.vertex_offsets
+        parts = [map(tuple, self.vertices[vo[j]:vo[j + 1]].tolist())
+                 for j in xrange(self.part_offsets[i], self.part_offsets[i + 1])]
+        if not parts:
+            return None
+        kind = self.shape_type % 10
+        if kind in POINT_TYPES:
+            points = [Point(pt) for part in parts for pt in part]
+            return points[0] if kind == 1 else points
+        if kind in CHAIN_TYPES:
+            return Chain(parts if len(parts) > 1 else parts[0])
+        start, stop = self.part_offsets[i], self.part_offsets[i + 1]
+        cw = self._ring_areas[0][start:stop] <= 0
+        if not cw.any():
+            return Polygon(parts if len(parts) > 1 else parts[0])
+        holes = [r for r, c in zip(parts, cw) if not c] or None
+        return Polygon([r for r, c in zip(parts, cw) if c], holes)
+
+    @property
+    def bounds(self):
+        if 'bounds' not in self._cache:
+            bounds = np.empty((len(self), 4), float)
+            bounds.fill(np.nan)
+            starts = self.vertex_offsets[self.part_offsets]
+            valid = starts[1:] > starts[:-1]
+            if valid.any():
+                bounds[valid, :2] = np.minimum.reduceat(self.vertices,
+                                                        starts[:-1][valid])
+                bounds[valid, 2:] = np.maximum.reduceat(self.vertices,
+                                                        starts[:-1][valid])
+            self._cache['bounds'] = bounds
+        return self._cache['bounds']
+
+    @property
+    def signed_area(self):
+        if 'signed_area' not in self._cache:
+            self._check_polygons('signed_area')
+            self._cache['signed_area'] = self._by_geometry(
+                self._ring_areas[0])
+        return self._cache['signed_area']
+
+    @property
+    def area(self):
+        if 'area' not in self._cache:
+            self._cache['area'] = np.abs(self.signed_area)
+        return self._cache['area']
+
+    @property
+    def centroid(self):
+        if 'centroid' not in self._cache:
+            self._check_polygons('centroid')
+            areas, moments = self._ring_areas
+            with np.errstate(invalid='ignore', divide='ignore'):
+                centroid = np.column_stack(
+                    (self._by_geometry(moments[:, 0]),
+                     self._by_geometry(moments[:, 1]))) / \
+                    self.signed_area[:, None]
+            self._cache['centroid'] = centroid
+        return self._cache['centroid']
+
+    @property
+    def perimeter(self):
+        if 'perimeter' not in self._cache:
+            i, j = self._edges(closed=self.shape_type % 10 in POLYGON_TYPES)
+            d = self.vertices[j] - self.vertices[i]
+            lengths = np.hypot(d[:, 0], d[:, 1])
+            parts = _bincount(self._vertex_parts[i], lengths,
+                              len(self.vertex_offsets) - 1)
+            self._cache['perimeter'] = self._by_geometry(parts)
+        return self._cache['perimeter']
+
+    def shared_boundaries(self):
+        """
+        Returns the pairs of polygons sharing a part of their boundaries
+        and the length of boundary they share
+
+        The edges of all the rings are put in a canonical order (lowest
+        end point first) and sorted, so that the edges found in two
+        polygons end up next to each other. Edges are shared when they
+        have the same end points; a border digitized with different
+        vertices on each side is not detected.
+
+        Returns
+        -------
+        i, j        : arrays
+                      the polygons of each pair, i < j
+        lengths     : array
+                      total length of the edges shared by i and j
+
+        Examples
+        --------
+        >>> squares = [Polygon([Point((x, 0)), Point((x, 1)), Point((x + 1, 1)), Point((x + 1, 0))])
+        ...            for x in range(3)]
+        >>> big = Polygon([Point((0, 1)), Point((0, 3)), Point((3, 3)), Point((3, 1)),
+        ...                Point((2, 1)), Point((1, 1))])
+        >>> GeometryArray.from_shapes(squares + [big]).shared_boundaries()
+        (array([0, 0, 1, 1, 2]), array([1, 3, 2, 3, 3]), array([ 1.,  1.,  1.,  1.,  1.]))
+        """
+        self._check_polygons('shared_boundaries')
+        if 'shared_boundaries' not in self._cache:
+            start, end = self._edges(closed=True)
+            a, b = self.vertices[start], self.vertices[end]
+            swap = (a[:, 0] > b[:, 0]) | ((a[:, 0] == b[:, 0]) &
+                                         (a[:, 1] > b[:, 1]))
+            a[swap], b[swap] = b[swap], a[swap]
+            keep = (a != b).any(axis=1)
+            a, b = a[keep], b[keep]
+            geometry = np.repeat(np.arange(len(self)), np.diff(
+                self.part_offsets))[self._vertex_parts[start[keep]]]
+            order = np.lexsort((b[:, 1], b[:, 0], a[:, 1], a[:, 0]))
+            edges = np.hstack((a, b))[order]
+            geometry = geometry[order]
+            d = edges[:, 2:] - edges[:, :2]
+            lengths = np.hypot(d[:, 0], d[:, 1])
+            i, j, shared = [], [], []
+            # pair each edge with the next ones as long as they are equal
+            same = np.ones(len(edges), bool)
+            for step in xrange(1, len(edges)):
+                same = same[:-1] & (edges[step:] == edges[:-step]).all(axis=1)
+                if not same.any():
+                    break
+                first = np.flatnonzero(same)
+                gi, gj = geometry[first], geometry[first + step]
+                pair = gi != gj
+                i.append(np.minimum(gi, gj)[pair])
+                j.append(np.maximum(gi, gj)[pair])
+                shared.append(lengths[first][pair])
+            n = len(self)
+            pairs = sparse.coo_matrix(
+                (np.concatenate([[]] + shared),
+                 (np.concatenate([[]] + i).astype(int),
+                  np.concatenate([[]] + j).astype(int))),
+                shape=(n, n)).tocsr().tocoo()  # sums the edges of each pair
+            self._cache['shared_boundaries'] = (pairs.row.astype(int),
+                                                pairs.col.astype(int),
+                                                pairs.data)
+        return self._cache['shared_boundaries']
+
+    @property
+    def _vertex_parts(self):
+        """Part of each vertex"""
+        if '_vertex_parts' not in self._cache:
+            self._cache['_vertex_parts'] = np.repeat(
+                np.arange(len(self.vertex_offsets) - 1),
+                np.diff(self.vertex_offsets))
+        return self._cache['_vertex_parts']
+
+    @property
+    def _ring_areas(self):
+        """
+        Signed area of each ring and the sums of (x_i + x_j) * f, (y_i +
+        y_j) * f over its edges divided by 6, f being the cross product of
+        the vertices of edge (i, j)
+        """
+        if '_ring_areas' not in self._cache:
+            i, j = self._edges(closed=True)
+            x, y = self.vertices[:, 0], self.vertices[:, 1]
+            f = x[i] * y[j] - x[j] * y[i]
+            ring = self._vertex_parts[i]
+            m = len(self.vertex_offsets) - 1
+            areas = _bincount(ring, f, m) / 2.0
+            moments = np.column_stack((
+                _bincount(ring, (x[i] + x[j]) * f, m),
+                _bincount(ring, (y[i] + y[j]) * f, m)))
+            self._cache['_ring_areas'] = (areas, moments / 6.0)
+        return self._cache['_ring_areas']
+
+    def _edges(self, closed):
+        """
+        Start and end vertices of the edges of all the parts, the last
+        vertex of each part being joined to the first one if closed
+        """
+        starts = self.vertex_offsets[:-1]
+        ends = self.vertex_offsets[1:]
+        i = np.arange(len(self.vertices))
+        j = i + 1
+        last = ends[ends > starts] - 1
+        j[last] = starts[ends > starts]
+        if not closed:
+            keep = np.ones(len(i), bool)
+            keep[last] = False
+            i, j = i[keep], j[keep]
+        return i, j
+
+    def _by_geometry(self, values):
+        """Sums the values of the parts of each geometry"""
+        return _bincount(
+            np.repeat(np.arange(len(self)), np.diff(self.part_offsets)),
+            values, len(self))
+
+    def _check_polygons(self, attr):
+        if self.shape_type % 10 not in POLYGON_TYPES + (0,):
+            raise TypeError("%s is only defined for polygons" % attr)
+
+
+def _bincount(index, weights, n):
+    """Sums of the weights by index, for indices in range(n)"""
+    if not n:
+        # np.bincount requires a positive minlength in older numpy
+        return np.zeros(0)
+    return np.bincount(index, weights=weights, minlength=n)
+
+
+def _closed(ring):
+    if ring[0] != ring[-1]:
+        return ring + ring[:1]
+    return ring
+
+
+def _offsets(counts):
+    return np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
@@ -0,0 +1,383 @@
+"""
+Persistence of spatial indexes for PySAL: Python Spatial Analysis Library.
+
+Indexes are written to a single binary file: a JSON header describing the
+index and its arrays, followed by the raw (aligned) data of each array, so
+that loading only maps the arrays in memory instead of rebuilding the
+index. The header records the size, modification time and CRC-32 checksum
+of the geometry file the index was built from, if any, and load_index
+refuses an index whose source has changed since.
+"""
+
+import os
+import json
+import zlib
+import cPickle
+import numpy as np
+import scipy
+import scipy.spatial
+from shapes import Point
+from rtree import PackedRTree
+import locators
+from locators import Grid, PointLocator, PolygonLocator
+from kdtree import Arc_KDTree
+from geometryarray import GeometryArray
+
+__all__ = ['save_index', 'load_index', 'file_checksum']
+
+MAGIC = 'PYSALIDX'
+FORMAT_VERSION = 1
+ALIGNMENT = 64  # of the data of each array in the file
+CHUNK_SIZE = 1024 ** 2
+
+
+def save_index(index, path, source=None):
+    """
+    Writes a spatial index to a file, read back with load_index
+
+    Parameters
+    ----------
+    index   : PackedRTree, Grid, PointLocator, PolygonLocator, Arc_KDTree
+              or scipy.spatial.cKDTree
+              the index to write
+    path    : string
+              name of the index file
+    source  : string
+              name of the geometry file the index was built from, whose
+              size, modification time and checksum are recorded
+
+    Examples
+    --------
+    >>> import tempfile, pysal
+    >>> shp = pysal.examples.get_path('columbus.shp')
+    >>> pl = PolygonLocator(pysal.open(shp).read())
+    >>> f = tempfile.NamedTemporaryFile(suffix='.idx'); fname = f.name; f.close()
+    >>> save_index(pl, fname, source=shp)
+    >>> pl2 = load_index(fname, source=shp)
+    >>> len(pl2.contains_point((8.5, 14)))
+    1
+    >>> pl2.contains_points([(8.5, 14)]) == pl.contains_points([(8.5, 14)])
+    array([ True], dtype=bool)
+    >>> del pl2
+    >>> os.remove(fname)
+    """
+    kind = _kind(index)
+    arrays, meta = SERIALIZERS[kind][0](index)
+    header = {'version': FORMAT_VERSION, 'kind': kind, 'meta': meta,
+              'source': _stamp(source, checksum=True) if source else None,
+              'arrays': []}
+    arrays = [(name, np.ascontiguousarray(a)) for name, a in
+              sorted(arrays.iteritems())]
+    # offsets are relative to the end of the (padded) header
+    offset = 0
+    for name, a in arrays:
+        if a.dtype.hasobject:
+            raise TypeError("Array %s of objects can not be saved" % name)
+        header['arrays'].append({'name': name, 'dtype': a.dtype.str,
+                                 'shape': a.shape, 'offset': offset})
+        offset = _aligned(offset + a.nbytes)
+    text = json.dumps(header)
+    start = _aligned(len(MAGIC) + 8 + len(text))
+    tmp = path + '.tmp'
+    f = open(tmp, 'wb')
+    try:
+        f.write(MAGIC)
+        f.write(np.array([len(text)], '<u8').tostring())
+        f.write(text)
+        for (name, a), spec in zip(arrays, header['arrays']):
+            f.seek(start + spec['offset'])
+            f.write(a.tostring())
+        f.truncate(start + offset)
+    finally:
+        f.close()
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp, path)
+
+
+def load_index(path, source=None, mmap=True):
+    """
+    Reads a spatial index written by save_index
+
+    Parameters
+    ----------
+    path    : string
+              name of the index file
+    source  : string
+              name of the geometry file the index should have been built
+              from. The index is only returned if the file has the size
+              and checksum recorded by save_index (the checksum is only
+              computed if its modification time changed).
+    mmap    : boolean
+              if True the arrays of the index are memory mapped (read
+              only), if False they are read in memory
+
+    Returns
+    -------
+    index   : the index, of the type given to save_index, or None if it is
+              out of date with respect to source
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> tree = PackedRTree(np.array([[0, 0, 1, 1], [2, 2, 3, 3.]]))
+    >>> f = tempfile.NamedTemporaryFile(suffix='.idx'); fname = f.name; f.close()
+    >>> save_index(tree, fname)
+    >>> load_index(fname).query_point((2.5, 2.5))
+    array([1])
+    >>> os.remove(fname)
+    """
+    f = open(path, 'rb')
+    try:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a PySAL index file" % path)
+        length = int(np.fromstring(f.read(8), '<u8')[0])
+        header = json.loads(f.read(length))
+        if header['version'] > FORMAT_VERSION:
+            raise ValueError("Unsupported index file version: %s" %
+                             header['version'])
+        if source is not None and not _up_to_date(header['source'], source):
+            return None
+        start = _aligned(len(MAGIC) + 8 + length)
+        arrays = {}
+        for spec in header['arrays']:
+            dtype = np.dtype(str(spec['dtype']))
+            shape = tuple(spec['shape'])
+            count = int(np.prod(shape))
+            if mmap and count:
+                arrays[spec['name']] = np.memmap(
+                    path, dtype, 'r', start + spec['offset'], shape)
+            else:
+                f.seek(start + spec['offset'])
+                arrays[spec['name']] = np.fromfile(
+                    f, dtype, count).reshape(shape)
+    finally:
+        f.close()
+    return SERIALIZERS[header['kind']][1](arrays, header['meta'])
+
+
+def file_checksum(path):
+    """
+    Returns the CRC-32 checksum of the content of a file
+
+    Examples
+    --------
+    >>> import pysal
+    >>> file_checksum(pysal.examples.get_path('columbus.shx'))
+    1965839539
+    """
+    crc = 0
+    f = open(path, 'rb')
+    try:
+        chunk = f.read(CHUNK_SIZE)
+        while chunk:
+            crc = zlib.crc32(chunk, crc)
+            chunk = f.read(CHUNK_SIZE)
+    finally:
+        f.close()
+    return crc & 0xffffffff
+
+
+def _stamp(source, checksum):
+    st = os.stat(source)
+    stamp = {'size': st.st_size, 'mtime': st.st_mtime}
+    if checksum:
+        stamp['crc32'] = file_checksum(source)
+    return stamp
+
+
+def _up_to_date(recorded, source):
+    """
+    True if source has the size and content recorded. The content is only
+    checked when the modification time differs.
+    """
+    if recorded is None:
+        return False
+    try:
+        stamp = _stamp(source, checksum=False)
+    except OSError:
+        return False
+    if stamp['size'] != recorded['size']:
+        return False
+    return (stamp['mtime'] == recorded['mtime'] or
+            file_checksum(source) == recorded['crc32'])
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _kind(index):
+    for kind, cls in KINDS:
+        if type(index) is cls or (not isinstance(cls, type) and
+                                  isinstance(index, cls)):
+            return kind
+    raise TypeError("Unsupported index type: %s" % type(index).__name__)
+
+
+def _split(values, prefix):
+    """Separates the arrays of a dictionary from its other (JSON) values"""
+    arrays, meta = {}, {}
+    for key, value in values.iteritems():
+        if isinstance(value, np.ndarray):
+            arrays[prefix + key] = value
+        else:
+            meta[key] = value
+    return arrays, meta
+
+
+def _join(arrays, meta, prefix):
+    values = dict((key[len(prefix):], a) for key, a in arrays.iteritems()
+                  if key.startswith(prefix))
+    values.update(meta)
+    return values
+
+
+def _rtree_arrays(tree):
+    return ({'ids': tree.ids, 'boxes': tree.boxes, 'children': tree.children},
+            {'n': int(tree.n), 'node_size': int(tree.node_size)})
+
+
+def _rtree_load(arrays, meta):
+    tree = PackedRTree.__new__(PackedRTree)
+    tree.n = meta['n']
+    tree.node_size = meta['node_size']
+    tree.ids = arrays['ids']
+    tree.boxes = arrays['boxes']
+    tree.children = arrays['children']
+    return tree
+
+
+def _grid_arrays(grid):
+    cells = sorted(grid.hash)
+    entries = [entry for cell in cells for entry in grid.hash[cell]]
+    items = [item for pt, item in entries]
+    arrays = {'cells': np.array(cells, np.int64).reshape((-1, 2)),
+              'offsets': np.cumsum([0] + [len(grid.hash[c]) for c in cells]),
+              'points': np.array([pt[:] for pt, item in entries],
+                                 float).reshape((-1, 2))}
+    try:
+        values = np.array(items)
+    except ValueError:
+        # e.g. scalars mixed with sequences
+        values = None
+    if values is None or values.dtype.hasobject or values.ndim != 1 or \
+            values.tolist() != items:
+        # not a plain array of numbers or strings
+        arrays['pickled_items'] = np.fromstring(cPickle.dumps(items, 2),
+                                                np.uint8)
+    else:
+        arrays['items'] = values
+    return arrays, {'res': grid.res, 'x_range': grid.x_range,
+                    'y_range': grid.y_range}
+
+
+def _grid_load(arrays, meta):
+    from shapes import Rectangle
+    (left, right), (lower, upper) = meta['x_range'], meta['y_range']
+    grid = Grid(Rectangle(left, lower, right, upper), meta['res'])
+    if 'pickled_items' in arrays:
+        items = cPickle.loads(arrays['pickled_items'].tostring())
+    else:
+        items = arrays['items'].tolist()
+    points = [Point(pt) for pt in arrays['points'].tolist()]
+    entries = zip(points, items)
+    offsets = arrays['offsets']
+    for k, cell in enumerate(arrays['cells'].tolist()):
+        grid.hash[tuple(cell)] = entries[offsets[k]:offsets[k + 1]]
+    return grid
+
+
+def _point_locator_arrays(locator):
+    points = locator._locator._points
+    return {'points': np.array([pt[:] for pt in points],
+                               float).reshape((-1, 2))}, {}
+
+
+def _point_locator_load(arrays, meta):
+    return PointLocator([Point(pt) for pt in arrays['points'].tolist()])
+
+
+def _polygon_locator_arrays(locator):
+    if locator._pip_index is None:
+        locator._pip_index = locators._pip_index(locator._locator)
+    polygons = locator._polygons
+    if not isinstance(polygons, GeometryArray):
+        polygons = GeometryArray.from_shapes(polygons)
+    arrays, meta = _split(locator._pip_index, 'pip_')
+    tree, meta['rtree'] = _rtree_arrays(locator._rtree)
+    arrays.update(_split(tree, 'rtree_')[0])
+    shapes = polygons.to_arrays()
+    arrays.update({'vertices': shapes['Vertices'],
+                   'vertex_offsets': shapes['Vertex Offsets'],
+                   'part_offsets': shapes['Part Offsets'],
+                   'bboxes': shapes['BBOX']})
+    meta['shape_type'] = shapes['Shape Type']
+    return arrays, meta
+
+
+def _polygon_locator_load(arrays, meta):
+    locator = PolygonLocator([])
+    # polygons are rebuilt from their vertices when they are returned
+    polygons = GeometryArray(arrays['vertices'], arrays['vertex_offsets'],
+                             arrays['part_offsets'], meta['shape_type'],
+                             arrays['bboxes'])
+    locator._locator = locator._polygons = polygons
+    locator._rtree = _rtree_load(_join(arrays, {}, 'rtree_'), meta['rtree'])
+    pip = _join(arrays, dict((k, v) for k, v in meta.iteritems()
+                             if k not in ('rtree', 'shape_type')), 'pip_')
+    pip['origin'] = tuple(pip['origin'])
+    pip['shape'] = tuple(pip['shape'])
+    locator._pip_index = pip
+    return locator
+
+
+def _kdtree_arrays(tree):
+    """The state pickled by cKDTree, split into arrays and scalars"""
+    arrays, meta = {}, {'scipy': scipy.__version__, 'state': []}
+    for k, value in enumerate(tree.__reduce__()[2]):
+        if isinstance(value, np.ndarray):
+            arrays['state_%d' % k] = value
+            meta['state'].append({'array': k})
+        elif isinstance(value, str):
+            arrays['state_%d' % k] = np.fromstring(value, np.uint8)
+            meta['state'].append({'bytes': k})
+        else:
+            meta['state'].append({'value': value})
+    if isinstance(tree, Arc_KDTree):
+        meta['radius'] = tree.radius
+    return arrays, meta
+
+
+def _kdtree_load(arrays, meta):
+    if meta['scipy'] != scipy.__version__:
+        raise ValueError("KDTree saved with scipy %s, not %s" %
+                         (meta['scipy'], scipy.__version__))
+    state = []
+    for k, item in enumerate(meta['state']):
+        if 'array' in item:
+            state.append(arrays['state_%d' % k])
+        elif 'bytes' in item:
+            state.append(arrays['state_%d' % k].tostring())
+        else:
+            state.append(item['value'])
+    if 'radius' in meta:
+        tree = Arc_KDTree.__new__(Arc_KDTree)
+        tree.radius = meta['radius']
+        tree.circumference = 2 * np.pi * tree.radius
+    else:
+        tree = scipy.spatial.cKDTree.__new__(scipy.spatial.cKDTree)
+    tree.__setstate__(tuple(state))
+    return tree
+
+
+KINDS = [('PackedRTree', PackedRTree), ('Grid', Grid),
+         ('PointLocator', PointLocator), ('PolygonLocator', PolygonLocator),
+         ('Arc_KDTree', Arc_KDTree), ('cKDTree', scipy.spatial.cKDTree)]
+SERIALIZERS = {'PackedRTree': (_rtree_arrays, _rtree_load),
+               'Grid': (_grid_arrays, _grid_load),
+               'PointLocator': (_point_locator_arrays, _point_locator_load),
+               'PolygonLocator': (_polygon_locator_arrays,
+                                  _polygon_locator_load),
+               'Arc_KDTree': (_kdtree_arrays, _kdtree_load),
+               'cKDTree': (_kdtree_arrays, _kdtree_load)}
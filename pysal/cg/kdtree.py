@@ -1,11 +1,12 @@
 """
 KDTree for PySAL: Python Spatial Analysis Library.
 
-Adds support for Arc Distance to scipy.spatial.KDTree.
+Adds support for Arc Distance to scipy.spatial.cKDTree.
 """
 import sys
 import math
 import scipy.spatial
+import scipy.sparse
 import numpy
 from scipy import inf
 import sphere
@@ -15,7 +16,7 @@ DISTANCE_METRICS = ['Euclidean', 'Arc']
 FLOAT_EPS = numpy.finfo(float).eps
 
 
-class Arc_KDTree(scipy.spatial.KDTree):
+class Arc_KDTree(scipy.spatial.cKDTree):
     def __init__(self, data, leafsize=10, radius=1.0):
         """
         KDTree using Arc Distance instead of Euclidean Distance.
@@ -24,7 +25,12 @@ class Arc_KDTree(scipy.spatial.KDTree):
         For Example, pass in the the radius of earth in miles to get back miles.
         Assumes data are Lng/Lat, does not account for geoids.
 
-        For more information see docs for scipy.spatial.KDTree
+        The points are converted to XYZ coordinates on the unit sphere in
+        bulk and indexed by the compiled scipy.spatial.cKDTree. Queries take
+        arrays of points, and the chord distances they return are converted
+        to arc distances at once.
+
+        For more information see docs for scipy.spatial.cKDTree
 
         Examples
         --------
@@ -39,24 +45,23 @@ class Arc_KDTree(scipy.spatial.KDTree):
         """
         self.radius = radius
         self.circumference = 2 * math.pi * radius
-        scipy.spatial.KDTree.__init__(self, map(sphere.toXYZ, data), leafsize)
+        scipy.spatial.cKDTree.__init__(self, self._toXYZ(data), leafsize)
 
     def _toXYZ(self, x):
-        if not issubclass(type(x), numpy.ndarray):
-            x = numpy.array(x)
-        if len(x.shape) == 2 and x.shape[1] == 3:  # assume point is already in XYZ
-            return x
-        if len(x.shape) == 1 and x.shape[0] == 3:  # assume point is already in XYZ
+        """
+        Converts a Lng/Lat point, or an array of them, to XYZ coordinates.
+        Points with 3 coordinates are assumed to be in XYZ already.
+        """
+        x = numpy.asarray(x, dtype=float)
+        if x.shape[-1] == 3:
             return x
-        elif len(x.shape) == 1:
-            x = numpy.array(sphere.toXYZ(x))
-        else:
-            x = map(sphere.toXYZ, x)
-        return x
+        if x.ndim == 1:
+            return sphere.toXYZ(x[None])[0]
+        return sphere.toXYZ(x)
 
     def count_neighbors(self, other, r, p=2):
         """
-        See scipy.spatial.KDTree.count_neighbors
+        See scipy.spatial.cKDTree.count_neighbors
 
         Parameters
         ----------
@@ -75,17 +80,19 @@ class Arc_KDTree(scipy.spatial.KDTree):
         if r > 0.5 * self.circumference:
             raise ValueError("r, must not exceed 1/2 circumference of the sphere (%f)." % self.circumference * 0.5)
         r = sphere.arcdist2linear(r, self.radius)
-        return scipy.spatial.KDTree.count_neighbors(self, other, r)
+        return scipy.spatial.cKDTree.count_neighbors(self, other, r)
 
-    def query(self, x, k=1, eps=0, p=2, distance_upper_bound=inf):
+    def query(self, x, k=1, eps=0, p=2, distance_upper_bound=inf, n_jobs=1):
         """
-        See scipy.spatial.KDTree.query
+        See scipy.spatial.cKDTree.query
 
         Parameters
         ----------
         x : array-like, last dimension self.m
             query points are lng/lat.
         p: ignored, kept to maintain compatibility with scipy.spatial.KDTree
+        n_jobs: number of processes used by cKDTree.query, -1 for all the
+            cores (not used by versions of scipy before 0.16)
 
         Examples
         --------
@@ -108,27 +115,29 @@ class Arc_KDTree(scipy.spatial.KDTree):
         if distance_upper_bound != inf:
             distance_upper_bound = sphere.arcdist2linear(
                 distance_upper_bound, self.radius)
-        d, i = scipy.spatial.KDTree.query(self, self._toXYZ(x), k,
-                                          eps=eps, distance_upper_bound=distance_upper_bound)
-        dims = len(d.shape)
-        r = self.radius
-        if dims == 0:
-            return sphere.linear2arcdist(d, r), i
-        if dims == 1:
-            #TODO: implement linear2arcdist on numpy arrays
-            d = [sphere.linear2arcdist(x, r) for x in d]
-        elif dims == 2:
-            d = [[sphere.linear2arcdist(x, r) for x in row] for row in d]
-        return numpy.array(d), i
+        kwargs = {'eps': eps, 'distance_upper_bound': distance_upper_bound}
+        if n_jobs != 1:
+            kwargs['n_jobs'] = n_jobs
+        d, i = scipy.spatial.cKDTree.query(self, self._toXYZ(x), k, **kwargs)
+        # rounding can put antipodal points slightly beyond the diameter
+        d = numpy.minimum(d, 2.0)
+        if not numpy.ndim(d):
+            return sphere.linear2arcdist(float(d), self.radius), i
+        return sphere.linear2arcdist(d, self.radius), i
 
     def query_ball_point(self, x, r, p=2, eps=0):
         """
-        See scipy.spatial.KDTree.query_ball_point
+        See scipy.spatial.cKDTree.query_ball_point
 
         Parameters
         ----------
         p: ignored, kept to maintain compatibility with scipy.spatial.KDTree
 
+        Returns
+        -------
+        The sorted indices of the points within r of x, or an object array
+        of them for an array of points
+
         Examples
         --------
         >>> pts = [(0,90), (0,0), (180,0), (0,-90)]
@@ -140,17 +149,23 @@ class Arc_KDTree(scipy.spatial.KDTree):
         array([[0, 1, 2, 3], [0, 1, 2, 3], [0, 1, 2, 3], [0, 1, 2, 3]], dtype=object)
         """
         eps = sphere.arcdist2linear(eps, self.radius)
-        #scipy.sphere.KDTree.query_ball_point appears to ignore the eps argument.
         # we have some floating point errors moving back and forth between cordinate systems,
         # so we'll account for that be adding some to our radius, 3*float's eps value.
         if r > 0.5 * self.circumference:
             raise ValueError("r, must not exceed 1/2 circumference of the sphere (%f)." % self.circumference * 0.5)
         r = sphere.arcdist2linear(r, self.radius) + FLOAT_EPS * 3
-        return scipy.spatial.KDTree.query_ball_point(self, self._toXYZ(x), r, eps=eps)
+        res = scipy.spatial.cKDTree.query_ball_point(
+            self, self._toXYZ(x), r, eps=eps)
+        if isinstance(res, numpy.ndarray):
+            for l in res.flat:
+                l.sort()
+        else:
+            res.sort()
+        return res
 
     def query_ball_tree(self, other, r, p=2, eps=0):
         """
-        See scipy.spatial.KDTree.query_ball_tree
+        See scipy.spatial.cKDTree.query_ball_tree
 
         Parameters
         ----------
@@ -166,7 +181,6 @@ class Arc_KDTree(scipy.spatial.KDTree):
         [[0, 1, 2, 3], [0, 1, 2, 3], [0, 1, 2, 3], [0, 1, 2, 3]]
         """
         eps = sphere.arcdist2linear(eps, self.radius)
-        #scipy.sphere.KDTree.query_ball_point appears to ignore the eps argument.
         # we have some floating point errors moving back and forth between cordinate systems,
         # so we'll account for that be adding some to our radius, 3*float's eps value.
         if self.radius != other.radius:
@@ -174,11 +188,14 @@ class Arc_KDTree(scipy.spatial.KDTree):
         if r > 0.5 * self.circumference:
             raise ValueError("r, must not exceed 1/2 circumference of the sphere (%f)." % self.circumference * 0.5)
         r = sphere.arcdist2linear(r, self.radius) + FLOAT_EPS * 3
-        return scipy.spatial.KDTree.query_ball_tree(self, other, r, eps=eps)
+        res = scipy.spatial.cKDTree.query_ball_tree(self, other, r, eps=eps)
+        for l in res:
+            l.sort()
+        return res
 
     def query_pairs(self, r, p=2, eps=0):
         """
-        See scipy.spatial.KDTree.query_pairs
+        See scipy.spatial.cKDTree.query_pairs
 
         Parameters
         ----------
@@ -196,11 +213,11 @@ class Arc_KDTree(scipy.spatial.KDTree):
         if r > 0.5 * self.circumference:
             raise ValueError("r, must not exceed 1/2 circumference of the sphere (%f)." % self.circumference * 0.5)
         r = sphere.arcdist2linear(r, self.radius) + FLOAT_EPS * 3
-        return scipy.spatial.KDTree.query_pairs(self, r, eps=eps)
+        return scipy.spatial.cKDTree.query_pairs(self, r, eps=eps)
 
     def sparse_distance_matrix(self, other, max_distance, p=2):
         """
-        See scipy.spatial.KDTree.sparse_distance_matrix
+        See scipy.spatial.cKDTree.sparse_distance_matrix
 
         Parameters
         ----------
@@ -227,13 +244,16 @@ class Arc_KDTree(scipy.spatial.KDTree):
             raise ValueError("max_distance, must not exceed 1/2 circumference of the sphere (%f)." % self.circumference * 0.5)
         max_distance = sphere.arcdist2linear(
             max_distance, self.radius) + FLOAT_EPS * 3
-        D = scipy.spatial.KDTree.sparse_distance_matrix(
-            self, other, max_distance)
-        D = D.tocoo()
-        #print D.data
-        a2l = lambda x: sphere.linear2arcdist(x, self.radius)
-        #print map(a2l,D.data)
-        return scipy.sparse.coo_matrix((map(a2l, D.data), (D.row, D.col))).todok()
+        try:
+            D = scipy.spatial.cKDTree.sparse_distance_matrix(
+                self, other, max_distance, output_type='coo_matrix')
+        except TypeError:
+            # scipy < 0.17 only returns dok matrices
+            D = scipy.spatial.cKDTree.sparse_distance_matrix(
+                self, other, max_distance).tocoo()
+        d = sphere.linear2arcdist(numpy.minimum(D.data, 2.0), self.radius)
+        return scipy.sparse.coo_matrix((d, (D.row, D.col)),
+                                       shape=(self.n, other.n)).todok()
 
 
 def KDTree(data, leafsize=10, distance_metric='Euclidean', radius=1.0):
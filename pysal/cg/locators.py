@@ -8,6 +8,8 @@ __credits__ = "Copyright (c) 2005-2011 Sergio J. Rey"
 import math
 import copy
 import doctest
+import multiprocessing as mp
+import numpy as np
 from rtree import *
 from standalone import *
 from shapes import *
@@ -651,14 +653,14 @@ class PolygonLocator:
         """
 
         self._locator = polygons
-        # create and rtree
-        self._rtree = RTree()
-        for polygon in polygons:
-            x = polygon.bounding_box.left
-            y = polygon.bounding_box.lower
-            X = polygon.bounding_box.right
-            Y = polygon.bounding_box.upper
-            self._rtree.insert(polygon, Rect(x, y, X, Y))
+        # bulk load a packed rtree with the bounding boxes
+        self._polygons = list(polygons)
+        bboxes = np.zeros((len(polygons), 4), float)
+        for i, polygon in enumerate(polygons):
+            bb = polygon.bounding_box
+            bboxes[i] = bb.left, bb.lower, bb.right, bb.upper
+        self._rtree = PackedRTree(bboxes)
+        self._pip_index = None
 
     def inside(self, query_rectangle):
         """
@@ -699,11 +701,9 @@ class PolygonLocator:
         upper = query_rectangle.upper
         lower = query_rectangle.lower
 
-        # rtree rect
-        qr = Rect(left, lower, right, upper)
         # bb overlaps
-        res = [r.leaf_obj() for r in self._rtree.query_rect(qr)
-               if r.is_leaf()]
+        res = [self._polygons[i] for i in
+               self._rtree.query_rect([left, lower, right, upper])]
 
         qp = Polygon([Point((left, lower)), Point((right, lower)),
                       Point((right, upper)), Point((left, upper))])
@@ -766,12 +766,9 @@ class PolygonLocator:
         upper = query_rectangle.upper
         lower = query_rectangle.lower
 
-        # rtree rect
-        qr = Rect(left, lower, right, upper)
-
         # bb overlaps
-        res = [r.leaf_obj() for r in self._rtree.query_rect(qr)
-               if r.is_leaf()]
+        res = [self._polygons[i] for i in
+               self._rtree.query_rect([left, lower, right, upper])]
         # have to check for polygon overlap using segment intersection
 
         # add polys whose bb contains at least one of the corners of the query
@@ -784,8 +781,7 @@ class PolygonLocator:
         pnts = [sw, se, ne, nw]
         cs = []
         for pnt in pnts:
-            c = [r.leaf_obj() for r in self._rtree.query_point(
-                pnt) if r.is_leaf()]
+            c = [self._polygons[i] for i in self._rtree.query_point(pnt)]
             cs.extend(c)
 
         cs = list(set(cs))
@@ -907,6 +903,9 @@ class PolygonLocator:
         2
         """
         n = self._locator
+        if not isinstance(n, list):
+            # polygons of a locator restored with load_index
+            n = self._locator = list(n)
         for polygon in n:
             points = polygon.vertices
             pl = BruteForcePointLocator(points)
@@ -952,11 +951,66 @@ class PolygonLocator:
 
         """
         # bbounding box containment
-        res = [r.leaf_obj() for r in self._rtree.query_point(point)
-               if r.is_leaf()]
+        res = [self._polygons[i] for i in self._rtree.query_point(point)]
         # explicit containment check for candidate polygons needed
         return [poly for poly in res if poly.contains_point(point)]
 
+    def contains_points(self, points, cores=1, chunksize=65536):
+        """
+        Returns, for many points at once, the index of the polygon that
+        contains each point
+
+        Candidate polygons are found through a grid of bounding boxes and
+        the winding number test of Polygon.contains_point is evaluated for
+        all the candidates and edges of a chunk of points with array
+        operations.
+
+        Parameters
+        ----------
+        points    : array
+                    mx2 array (or sequence) of point coordinates
+        cores     : integer
+                    number of processes sharing the chunks of points
+        chunksize : integer
+                    number of points processed at once
+
+        Returns
+        -------
+        ids       : array
+                    m int array with the position of the containing polygon
+                    in the list given to the locator, -1 if no polygon
+                    contains the point. If several polygons contain a
+                    point, the first one is returned.
+
+        Examples
+        --------
+        >>> p1 = Polygon([Point((0,0)), Point((6,0)), Point((4,4))])
+        >>> p2 = Polygon([Point((1,2)), Point((4,0)), Point((4,4))])
+        >>> p3 = Polygon([Point((10, 0)), Point((10, 10)), Point((20, 10)), Point((20, 0))],
+        ...              [Point((12, 2)), Point((14, 2)), Point((14, 4)), Point((12, 4))])
+        >>> pl = PolygonLocator([p1, p2, p3])
+        >>> pl.contains_points([(2, 2), (2, 2.5), (1, 1), (13, 3), (11, 1), (30, 30)])
+        array([ 0,  1,  0, -1,  2, -1])
+        """
+        if self._pip_index is None:
+            self._pip_index = _pip_index(self._locator)
+        points = np.asarray(points, dtype=float).reshape((-1, 2))
+        blocks = [points[i:i + chunksize]
+                  for i in xrange(0, len(points), chunksize)]
+        if cores > 1 and len(blocks) > 1:
+            pool = mp.Pool(min(cores, len(blocks)), _pip_init,
+                           (self._pip_index,))
+            try:
+                ids = pool.map(_pip_worker, blocks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            ids = [_pip_query(self._pip_index, block) for block in blocks]
+        if not ids:
+            return np.zeros(0, int)
+        return np.concatenate(ids)
+
     def proximity(self, origin, r, rule='vertex'):
         """
         Returns the indexed polygons located within some distance of an
@@ -988,3 +1042,178 @@ class PolygonLocator:
         """
         raise NotImplementedError
 
+
+# Batch point in polygon.
+#
+# The index holds the bounding boxes of the polygons in a uniform grid
+# (cell -> sorted polygon ids, in CSR form) and all their edges in flat
+# arrays, grouped by polygon. Each edge knows the position of its ring in
+# the polygon, and hole[k, r] tells whether ring r of polygon k is a hole.
+
+_PIP_EDGES_PER_BLOCK = 2 ** 21
+
+
+def _pip_index(polygons):
+    """
+    Builds the arrays used by PolygonLocator.contains_points
+    """
+    n = len(polygons)
+    bboxes = np.empty((n, 4), float)
+    xs, ys, edgeRing, edgeStart, holes = [], [], [], [], []
+    numEdges = np.zeros(n, int)
+    nv = 0
+    for k, polygon in enumerate(polygons):
+        bb = polygon.bounding_box
+        bboxes[k] = bb.left, bb.lower, bb.right, bb.upper
+        rings = polygon._part_rings + polygon._hole_rings
+        holes.append([False] * len(polygon._part_rings) +
+                     [True] * len(polygon._hole_rings))
+        for r, ring in enumerate(rings):
+            vertices = [v[:] for v in ring.vertices]
+            m = len(vertices)
+            xs.extend([v[0] for v in vertices])
+            ys.extend([v[1] for v in vertices])
+            edgeStart.append(np.arange(nv, nv + m - 1))
+            edgeRing.append(np.repeat(r, m - 1))
+            numEdges[k] += m - 1
+            nv += m
+    maxRings = max([len(h) for h in holes] + [1])
+    hole = np.zeros((n, maxRings), bool)
+    part = np.zeros((n, maxRings), bool)
+    for k, h in enumerate(holes):
+        hole[k, :len(h)] = h
+        part[k, :len(h)] = np.logical_not(h)
+    index = {'bboxes': bboxes, 'x': np.array(xs, float),
+             'y': np.array(ys, float), 'hole': hole, 'part': part,
+             'edgeOffsets': np.concatenate(([0], np.cumsum(numEdges))),
+             'edgeStart': np.concatenate(edgeStart or [np.zeros(0, int)]),
+             'edgeRing': np.concatenate(edgeRing or [np.zeros(0, int)])}
+    index.update(_bbox_grid(bboxes))
+    return index
+
+
+def _bbox_grid(bboxes):
+    """
+    Registers each bounding box in the cells of a uniform grid it overlaps.
+    Cells are about the size of a typical bounding box.
+    """
+    n = len(bboxes)
+    if not n:
+        return {'origin': (0., 0.), 'cellSize': 1., 'shape': (1, 1),
+                'cellOffsets': np.zeros(2, int), 'cellIds': np.zeros(0, int)}
+    x0, y0 = bboxes[:, 0].min(), bboxes[:, 1].min()
+    width = bboxes[:, 2].max() - x0
+    height = bboxes[:, 3].max() - y0
+    sizes = np.maximum(bboxes[:, 2] - bboxes[:, 0], bboxes[:, 3] - bboxes[:, 1])
+    cellSize = max(math.sqrt(width * height / n), np.median(sizes))
+    if not cellSize > 0:
+        cellSize = max(width, height, 1.)
+    nx = int(width / cellSize) + 1
+    ny = int(height / cellSize) + 1
+    ix0, iy0, ix1, iy1 = [
+        np.clip(np.floor((bboxes[:, j] - o) / cellSize).astype(int), 0, s - 1)
+        for j, o, s in ((0, x0, nx), (1, y0, ny), (2, x0, nx), (3, y0, ny))]
+    wx = ix1 - ix0 + 1
+    counts = wx * (iy1 - iy0 + 1)
+    ids = np.repeat(np.arange(n), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                counts)
+    cells = (iy0[ids] + local // wx[ids]) * nx + ix0[ids] + local % wx[ids]
+    order = np.lexsort((ids, cells))
+    cellOffsets = np.concatenate(
+        ([0], np.cumsum(np.bincount(cells, minlength=nx * ny))))
+    return {'origin': (x0, y0), 'cellSize': cellSize, 'shape': (nx, ny),
+            'cellOffsets': cellOffsets, 'cellIds': ids[order]}
+
+
+def _pip_query(index, points):
+    """
+    Returns the position of the first polygon of the index containing each
+    of the points (mx2 array), -1 where none does
+    """
+    m = len(points)
+    result = np.empty(m, int)
+    result.fill(-1)
+    if not m:
+        return result
+    px, py = points[:, 0], points[:, 1]
+    # candidate (point, polygon) pairs from the grid, then the bboxes
+    (x0, y0), cellSize, (nx, ny) = (index['origin'], index['cellSize'],
+                                    index['shape'])
+    with np.errstate(invalid='ignore'):
+        cx = np.floor((px - x0) / cellSize)
+        cy = np.floor((py - y0) / cellSize)
+    inGrid = (cx >= 0) & (cx < nx) & (cy >= 0) & (cy < ny)
+    cells = np.where(inGrid, cy * nx + cx, 0).astype(int)
+    cellOffsets = index['cellOffsets']
+    counts = np.where(inGrid, cellOffsets[cells + 1] - cellOffsets[cells], 0)
+    pts = np.repeat(np.arange(m), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                counts)
+    polys = index['cellIds'][cellOffsets[cells[pts]] + local]
+    bb = index['bboxes'][polys]
+    inBox = ((px[pts] >= bb[:, 0]) & (px[pts] <= bb[:, 2]) &
+             (py[pts] >= bb[:, 1]) & (py[pts] <= bb[:, 3]))
+    pts, polys = pts[inBox], polys[inBox]
+    # winding numbers of the candidate pairs, in blocks of edges
+    edgeOffsets = index['edgeOffsets']
+    numEdges = edgeOffsets[polys + 1] - edgeOffsets[polys]
+    work = np.cumsum(numEdges)
+    inside = np.zeros(len(pts), bool)
+    start = 0
+    while start < len(pts):
+        base = work[start - 1] if start else 0
+        stop = max(np.searchsorted(work, base + _PIP_EDGES_PER_BLOCK,
+                                   'right'), start + 1)
+        inside[start:stop] = _pip_pairs(index, px[pts[start:stop]],
+                                        py[pts[start:stop]],
+                                        polys[start:stop],
+                                        numEdges[start:stop])
+        start = stop
+    # pairs are sorted by point and polygon, keep the first polygon found
+    pts, polys = pts[inside][::-1], polys[inside][::-1]
+    result[pts] = polys
+    return result
+
+
+def _pip_pairs(index, px, py, polys, numEdges):
+    """
+    Polygon.contains_point for the pairs of points (px, py) and polygons,
+    evaluated over all their edges at once
+    """
+    npairs = len(polys)
+    pairs = np.repeat(np.arange(npairs), numEdges)
+    local = np.arange(numEdges.sum()) - np.repeat(np.cumsum(numEdges) -
+                                                  numEdges, numEdges)
+    edges = index['edgeOffsets'][polys][pairs] + local
+    i = index['edgeStart'][edges]
+    xi = index['x'][i] - px[pairs]
+    yi = index['y'][i] - py[pairs]
+    xj = index['x'][i + 1] - px[pairs]
+    yj = index['y'][i + 1] - py[pairs]
+    # winding number contributions, as in Ring.contains_point
+    w = np.zeros(len(i), float)
+    cross = yi * yj < 0
+    c = np.flatnonzero(cross)
+    r = xi[c] + yi[c] * (xj[c] - xi[c]) / (yi[c] - yj[c])
+    w[c] = np.where(r > 0, np.where(yi[c] < 0, 1., -1.), 0.)
+    half = ~cross & (yi == 0) & (xi > 0)
+    w[half] = np.where(yj[half] > 0, 0.5, -0.5)
+    half2 = ~cross & ~half & (yj == 0) & (xj > 0)
+    w[half2] = np.where(yi[half2] < 0, 0.5, -0.5)
+    maxRings = index['hole'].shape[1]
+    key = pairs * maxRings + index['edgeRing'][edges]
+    winding = np.bincount(key, weights=w, minlength=npairs * maxRings)
+    inRing = winding.reshape((npairs, maxRings)) != 0
+    inHole = (inRing & index['hole'][polys]).any(axis=1)
+    inPart = (inRing & index['part'][polys]).any(axis=1)
+    return inPart & ~inHole
+
+
+def _pip_init(index):
+    global _pip_worker_index
+    _pip_worker_index = index
+
+
+def _pip_worker(points):
+    return _pip_query(_pip_worker_index, points)
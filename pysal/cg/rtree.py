@@ -13,15 +13,17 @@ see doc/ref/r-tree-clustering-split-algo.pdf
 
 __author__ = "Sergio J. Rey"
 
-__all__ = ['RTree', 'Rect', 'Rtree']
+__all__ = ['RTree', 'Rect', 'Rtree', 'PackedRTree']
 
 MAXCHILDREN = 10
+QUERY_BLOCK = 16384  # queries walked down a PackedRTree at once
 MAX_KMEANS = 5
 BUFFER = 0.0000001
 import math
 import random
 import time
 import array
+import numpy as np
 
 
 class Rect(object):
@@ -637,3 +639,322 @@ def k_means_cluster(root, k, nodes):
             return clusters
         else:
             cluster_centers = new_cluster_centers
+
+
+class PackedRTree(object):
+    """
+    Static R-tree bulk loaded with the Sort-Tile-Recursive algorithm [1]_
+
+    The tree is built once from an array of bounding boxes and stored in
+    flat arrays: the boxes of the items followed by those of the nodes,
+    level by level up to the root, and the range of the children of each
+    node. Queries are answered for many rectangles or points at once by
+    walking down the tree one level at a time with array operations.
+
+    Parameters
+    ----------
+    bboxes      : array
+                  nx4 array of bounding boxes (left, lower, right, upper).
+                  Rows with nan values are not indexed.
+    node_size   : integer
+                  maximum number of children of a node
+
+    Attributes
+    ----------
+    n           : integer
+                  number of bounding boxes given to the tree
+    ids         : array
+                  row in bboxes of each indexed item, in tree order
+    boxes       : array
+                  bounding boxes of the items, in tree order, followed by
+                  those of the nodes; the root is the last one
+    children    : array
+                  (start, stop) range in boxes of the children of each
+                  node, in the order of the nodes in boxes
+
+    References
+    ----------
+
+    .. [1] Leutenegger, S. T., Edgington, J. M., Lopez, M. A. (1997)
+       "STR: A simple and efficient algorithm for R-tree packing". Proceedings
+       of the 13th International Conference on Data Engineering, 497-506.
+
+    Examples
+    --------
+    >>> bboxes = [[i, j, i + 1, j + 1] for j in range(10) for i in range(10)]
+    >>> t = PackedRTree(bboxes, node_size=4)
+    >>> t.query_rect([0.5, 0.5, 1.5, 1.5])
+    array([ 0,  1, 10, 11])
+    >>> t.query_point((2.5, 0.5))
+    array([2])
+    >>> offsets, ids = t.query_points([(2.5, 0.5), (20, 20), (1, 1)])
+    >>> offsets
+    array([0, 1, 1, 5])
+    >>> ids
+    array([ 2,  0,  1, 10, 11])
+    >>> ids, dists = t.nearest([(-1, 0.5), (3.5, 3.5)])
+    >>> ids
+    array([ 0, 33])
+    >>> dists
+    array([ 1.,  0.])
+    """
+
+    def __init__(self, bboxes, node_size=16):
+        bboxes = np.asarray(bboxes, dtype=float).reshape((-1, 4))
+        self.n = len(bboxes)
+        self.node_size = node_size
+        valid = np.flatnonzero(~np.isnan(bboxes).any(axis=1))
+        self.ids = valid[_str_order(bboxes[valid], node_size)]
+        level = bboxes[self.ids]
+        boxes, children = [level], []
+        offset = 0
+        while len(level) > 1 or (len(level) and not children):
+            starts = np.arange(0, len(level), node_size)
+            stops = np.minimum(starts + node_size, len(level))
+            nodes = np.column_stack((
+                np.minimum.reduceat(level[:, 0], starts),
+                np.minimum.reduceat(level[:, 1], starts),
+                np.maximum.reduceat(level[:, 2], starts),
+                np.maximum.reduceat(level[:, 3], starts)))
+            ranges = np.column_stack((starts, stops)) + offset
+            order = _str_order(nodes, node_size)
+            offset += len(level)
+            level = nodes[order]
+            boxes.append(level)
+            children.append(ranges[order])
+        self.boxes = np.concatenate(boxes)
+        self.children = np.concatenate(children or [np.zeros((0, 2), int)])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query_rect(self, rect):
+        """
+        Returns the rows of the bounding boxes intersecting a rectangle
+
+        Parameters
+        ----------
+        rect        : list or Rectangle
+                      [left, lower, right, upper] of the query rectangle, or
+                      an object with left, lower, right and upper attributes
+
+        Returns
+        -------
+        ids         : array
+                      sorted rows of the intersecting bounding boxes
+        """
+        if hasattr(rect, 'left'):
+            rect = [rect.left, rect.lower, rect.right, rect.upper]
+        return self.query_rects([rect])[1]
+
+    def query_point(self, point):
+        """
+        Returns the rows of the bounding boxes containing a point (x, y)
+        """
+        return self.query_points([point])[1]
+
+    def query_rects(self, rects):
+        """
+        Returns the bounding boxes intersecting each of many rectangles.
+        Boxes that only touch a rectangle intersect it.
+
+        Parameters
+        ----------
+        rects       : array
+                      mx4 array of rectangles (left, lower, right, upper)
+
+        Returns
+        -------
+        offsets     : array
+                      m+1 offsets in ids of the results of each rectangle
+        ids         : array
+                      rows of the intersecting bounding boxes, sorted for
+                      each rectangle
+        """
+        rects = np.asarray(rects, dtype=float).reshape((-1, 4))
+        counts, ids = [np.zeros(0, int)], [np.zeros(0, int)]
+        for start in xrange(0, len(rects), QUERY_BLOCK):
+            c, i = self._query_rects(rects[start:start + QUERY_BLOCK])
+            counts.append(c)
+            ids.append(i)
+        offsets = np.concatenate(([0], np.cumsum(np.concatenate(counts))))
+        return offsets, np.concatenate(ids)
+
+    def query_points(self, points):
+        """
+        Returns the bounding boxes containing each of many points (mx2
+        array), see query_rects
+        """
+        points = np.asarray(points, dtype=float).reshape((-1, 2))
+        return self.query_rects(np.hstack((points, points)))
+
+    def nearest(self, points):
+        """
+        Returns the bounding box nearest to each of many points
+
+        Parameters
+        ----------
+        points      : array
+                      mx2 array of points
+
+        Returns
+        -------
+        ids         : array
+                      row of the nearest bounding box of each point, the
+                      lowest one in case of ties, -1 for an empty tree or
+                      a point with nan coordinates
+        dists       : array
+                      euclidean distance from each point to its nearest
+                      bounding box, 0 for points inside it
+        """
+        points = np.asarray(points, dtype=float).reshape((-1, 2))
+        ids = np.empty(len(points), int)
+        ids.fill(-1)
+        dists = np.empty(len(points), float)
+        dists.fill(np.inf)
+        valid = np.flatnonzero(~np.isnan(points).any(axis=1))
+        if len(self.ids):
+            for start in xrange(0, len(valid), QUERY_BLOCK):
+                block = valid[start:start + QUERY_BLOCK]
+                ids[block], dists[block] = self._nearest(points[block])
+        return ids, dists
+
+    def _query_rects(self, rects):
+        """
+        query_rects for a block of rectangles, returns the number of
+        results of each rectangle and the results
+        """
+        def overlaps(q, b):
+            r = rects[q]
+            return ((b[:, 0] <= r[:, 2]) & (b[:, 2] >= r[:, 0]) &
+                    (b[:, 1] <= r[:, 3]) & (b[:, 3] >= r[:, 1]))
+
+        q, items = self._search(len(rects), overlaps)
+        ids = self.ids[items]
+        order = np.lexsort((ids, q))
+        return np.bincount(q, minlength=len(rects)), ids[order]
+
+    def _nearest(self, points):
+        """
+        nearest for a block of points without nan coordinates
+        """
+        m = len(points)
+
+        def mindist(q, b):
+            x, y = points[q, 0], points[q, 1]
+            dx = np.maximum(np.maximum(b[:, 0] - x, x - b[:, 2]), 0)
+            dy = np.maximum(np.maximum(b[:, 1] - y, y - b[:, 3]), 0)
+            return dx * dx + dy * dy
+
+        # the item reached by always descending into the nearest child
+        # bounds the distance of the nearest one
+        q = np.arange(m)
+        node = np.repeat(len(self.boxes) - 1, m)
+        while node[0] >= len(self.ids):
+            q, node = self._expand(q, node)
+            at = np.flatnonzero(_is_min_by(q, mindist(q, self.boxes[node])))
+            first = at[_group_starts(q[at])]
+            q, node = q[first], node[first]
+        bound = mindist(q, self.boxes[node])
+
+        q, items = self._search(
+            m, lambda q, b: mindist(q, b) <= bound[q])
+        d = mindist(q, self.boxes[items])
+        found = self.ids[items]
+        at = np.flatnonzero(_is_min_by(q, d))
+        at = at[_is_min_by(q[at], found[at])]
+        return found[at], np.sqrt(d[at])
+
+    def _search(self, m, test):
+        """
+        Walks down the tree for m queries, keeping the (query, box) pairs
+        for which test(queries, boxes) is True. Returns the pairs reached
+        at the items, sorted by query, as arrays of queries and positions
+        in boxes.
+        """
+        numItems = len(self.ids)
+        if not numItems or not m:
+            return np.zeros(0, int), np.zeros(0, int)
+        q = np.arange(m)
+        node = np.repeat(len(self.boxes) - 1, m)
+        keep = test(q, self.boxes[node])
+        q, node = q[keep], node[keep]
+        while len(node) and node[0] >= numItems:
+            q, node = self._expand(q, node)
+            keep = test(q, self.boxes[node])
+            q, node = q[keep], node[keep]
+        return q, node
+
+    def _expand(self, q, node):
+        """
+        Replaces the (query, node) pairs by the pairs of the queries and
+        the children of their nodes
+        """
+        ranges = self.children[node - len(self.ids)]
+        counts = ranges[:, 1] - ranges[:, 0]
+        local = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        return (np.repeat(q, counts),
+                np.repeat(ranges[:, 0], counts) + local)
+
+    def save(self, path, source=None):
+        """
+        Writes the tree to a file, read back with PackedRTree.load
+
+        Parameters
+        ----------
+        path    : string
+                  file written, see pysal.cg.indexio.save_index
+        source  : string
+                  file the tree was built from, the tree is only loaded
+                  back while that file is unchanged
+        """
+        from indexio import save_index
+        save_index(self, path, source)
+
+    @classmethod
+    def load(cls, path, source=None, mmap=True):
+        """
+        Reads a tree written by PackedRTree.save, returns None if source
+        changed since. The arrays of the tree are memory-mapped from the
+        file unless mmap is False.
+        """
+        from indexio import load_index
+        tree = load_index(path, source, mmap)
+        if tree is not None and not isinstance(tree, cls):
+            raise ValueError("%s does not hold a PackedRTree" % path)
+        return tree
+
+
+def _str_order(boxes, node_size):
+    """
+    Sort-Tile-Recursive order of boxes: sorted by the x of their centers
+    into vertical slices of about sqrt(n/node_size) groups of node_size
+    boxes, and by the y of their centers within each slice
+    """
+    k = len(boxes)
+    if k <= node_size:
+        return np.arange(k)
+    numGroups = int(math.ceil(k / float(node_size)))
+    sliceSize = int(math.ceil(math.sqrt(numGroups))) * node_size
+    cx = boxes[:, 0] + boxes[:, 2]
+    cy = boxes[:, 1] + boxes[:, 3]
+    rank = np.empty(k, int)
+    rank[np.argsort(cx, kind='mergesort')] = np.arange(k)
+    return np.lexsort((cy, rank // sliceSize))
+
+
+def _group_starts(groups):
+    """
+    Positions where the runs of equal values of groups start
+    """
+    return np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+
+
+def _is_min_by(groups, values):
+    """
+    Flags the smallest values of each run of equal groups (a sorted array)
+    """
+    starts = _group_starts(groups)
+    lows = np.minimum.reduceat(values, starts)
+    return values == np.repeat(lows, np.diff(np.append(starts, len(groups))))
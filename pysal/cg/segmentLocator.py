@@ -3,11 +3,12 @@ import scipy
 import numpy
 from pysal.cg.shapes import Rectangle, Point, LineSegment
 from pysal.cg.standalone import get_segment_point_dist, get_bounding_box
+from pysal.cg.rtree import PackedRTree, QUERY_BLOCK, _is_min_by
 import random
 import time
 
 __all__ = ["SegmentGrid", "SegmentLocator",
-           "Polyline_Shapefile_SegmentLocator"]
+           "Polyline_Shapefile_SegmentLocator", "PackedSegmentLocator"]
 DEBUG = False
 
 
@@ -70,6 +71,138 @@ class Polyline_Shapefile_SegmentLocator(object):
         return possibles[numpy.argmin(distances)]
 
 
+class PackedSegmentLocator(object):
+    """
+    Nearest segment index answering many query points at once
+
+    The bounding boxes of the segments are bulk loaded in a PackedRTree.
+    For each block of query points, the segment of the nearest bounding box
+    gives an upper bound on the distance to the nearest segment, the
+    segments with a bounding box within that bound are gathered with a
+    single tree query and the point to segment distances of all the
+    candidates are computed with array operations.
+
+    Parameters
+    ----------
+    segments    : list or array
+                  LineSegments, or an nx4 array (or nx2x2) with the end
+                  points (x1, y1, x2, y2) of each segment
+    node_size   : int
+                  number of children of the nodes of the tree
+
+    Attributes
+    ----------
+    segments    : array
+                  nx4 array with the end points of the segments
+    tree        : PackedRTree
+                  index of the bounding boxes of the segments
+
+    Examples
+    --------
+    >>> segs = [LineSegment(Point((0, 0)), Point((0, 10))),
+    ...         LineSegment(Point((0, 10)), Point((10, 10))),
+    ...         LineSegment(Point((10, 10)), Point((10, 0)))]
+    >>> locator = PackedSegmentLocator(segs)
+    >>> ids, dists, coords = locator.snap([(2, 5), (9, 11), (5, -3)])
+    >>> ids
+    array([0, 1, 0])
+    >>> dists
+    array([ 2.        ,  1.        ,  5.83095189])
+    >>> coords
+    array([[  0.,   5.],
+           [  9.,  10.],
+           [  0.,   0.]])
+    >>> locator.nearest(Point((8, 4)))
+    2
+    """
+
+    def __init__(self, segments, node_size=16):
+        if len(segments) and hasattr(segments[0], 'p1'):
+            segments = [seg.p1[:] + seg.p2[:] for seg in segments]
+        self.segments = numpy.asarray(segments, dtype=float).reshape((-1, 4))
+        s = self.segments
+        bboxes = numpy.column_stack((numpy.minimum(s[:, 0], s[:, 2]),
+                                     numpy.minimum(s[:, 1], s[:, 3]),
+                                     numpy.maximum(s[:, 0], s[:, 2]),
+                                     numpy.maximum(s[:, 1], s[:, 3])))
+        self.tree = PackedRTree(bboxes, node_size)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def nearest(self, pt):
+        """
+        Returns the id of the segment nearest to pt, None if there are no
+        segments
+        """
+        i = self.snap([pt[:2]])[0][0]
+        return int(i) if i >= 0 else None
+
+    def snap(self, points):
+        """
+        Returns the nearest segment of each of many points and the point
+        of that segment nearest to it
+
+        Parameters
+        ----------
+        points      : array
+                      mx2 array of points
+
+        Returns
+        -------
+        ids         : array
+                      row of the nearest segment of each point, the lowest
+                      one in case of ties, -1 if there are no segments or the
+                      point has nan coordinates
+        dists       : array
+                      distance from each point to its nearest segment
+        coords      : array
+                      mx2 array with the projection of each point on its
+                      nearest segment (nan where ids is -1)
+        """
+        points = numpy.asarray(points, dtype=float).reshape((-1, 2))
+        m = len(points)
+        ids = numpy.empty(m, int)
+        ids.fill(-1)
+        dists = numpy.empty(m, float)
+        dists.fill(numpy.inf)
+        coords = numpy.empty((m, 2), float)
+        coords.fill(numpy.nan)
+        first = self.tree.nearest(points)[0]
+        valid = numpy.flatnonzero(first >= 0)
+        for start in xrange(0, len(valid), QUERY_BLOCK):
+            block = valid[start:start + QUERY_BLOCK]
+            pts = points[block]
+            bound = _project(self.segments[first[block]], pts)[0]
+            offsets, candidates = self.tree.query_rects(numpy.column_stack(
+                (pts - bound[:, None], pts + bound[:, None])))
+            owner = numpy.repeat(numpy.arange(len(block)), numpy.diff(offsets))
+            d, snapped = _project(self.segments[candidates], pts[owner])
+            # candidates are sorted for each point: keep the first minimum
+            best = numpy.flatnonzero(_is_min_by(owner, d))
+            best = best[numpy.unique(owner[best], return_index=True)[1]]
+            ids[block] = candidates[best]
+            dists[block] = d[best]
+            coords[block] = snapped[best]
+        return ids, dists, coords
+
+
+def _project(segments, points):
+    """
+    Distances from points to segments (one to one) and projections of the
+    points on the segments
+    """
+    a = segments[:, :2]
+    v = segments[:, 2:] - a
+    length2 = (v ** 2).sum(axis=1)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        t = ((points - a) * v).sum(axis=1) / length2
+    t = numpy.where(length2 > 0, numpy.clip(t, 0, 1), 0)
+    snapped = a + t[:, None] * v
+    d = points - snapped
+    return numpy.hypot(d[:, 0], d[:, 1]), snapped
+
+
 class SegmentGrid(object):
     """
     Notes:
@@ -43,7 +43,15 @@ class Point(object):
     Attributes
     ----------
     None
+
+    Notes
+    -----
+    Points are stored compactly: the coordinates are kept in a tuple and the
+    id, Z and M attributes set by the readers use slots. An instance
+    dictionary is only created when other attributes are set.
     """
+    __slots__ = ('__loc', 'id', 'Z', 'M', '__dict__')
+
     def __init__(self, loc):
         """
         Returns an instance of a Point object.
@@ -66,6 +74,31 @@ class Point(object):
         """
         self.__loc = tuple(map(float, loc))
 
+    def __getstate__(self):
+        """
+        Returns the coordinates and attributes of the Point, used by pickle
+        and copy
+
+        Examples
+        --------
+        >>> import copy
+        >>> p = Point((1, 3))
+        >>> p.id = 7
+        >>> q = copy.deepcopy(p)
+        >>> q, q.id
+        ((1.0, 3.0), 7)
+        """
+        attrs = dict(self.__dict__)
+        for attr in ('id', 'Z', 'M'):
+            if hasattr(self, attr):
+                attrs[attr] = getattr(self, attr)
+        return self.__loc, attrs
+
+    def __setstate__(self, state):
+        self.__loc, attrs = state
+        for attr, value in attrs.iteritems():
+            setattr(self, attr, value)
+
     @classmethod
     def __from_geo_interface__(cls, geo):
         return cls(geo['coordinates'])
@@ -1153,7 +1186,10 @@ class Chain(object):
         --------
         """
         def part_perimeter(part):
-            return sum([arcdist(part[i], part[i + 1]) * 1000. for i in xrange(len(part) - 1)])
+            if len(part) < 2:
+                return 0
+            pts = [v[:] for v in part]
+            return arcdist(pts[:-1], pts[1:]).sum() * 1000.
         if self._arclen is None:
             self._arclen = sum(
                 [part_perimeter(part) for part in self._vertices])
@@ -18,7 +18,7 @@ import scipy.constants
 from scipy.spatial.distance import euclidean
 from math import pi, cos, sin, asin
 
-__all__ = ['RADIUS_EARTH_KM', 'RADIUS_EARTH_MILES', 'arcdist', 'arcdist2linear', 'brute_knn', 'fast_knn', 'fast_threshold', 'linear2arcdist', 'toLngLat', 'toXYZ', 'lonlat','harcdist','geointerpolate','geogrid']
+__all__ = ['RADIUS_EARTH_KM', 'RADIUS_EARTH_MILES', 'arcdist', 'arcdist2linear', 'brute_knn', 'fast_knn', 'fast_threshold', 'linear2arcdist', 'toLngLat', 'toXYZ', 'lonlat','harcdist','harcdist_matrix','geointerpolate','geogrid']
 
 
 RADIUS_EARTH_KM = 6371.0  
@@ -50,7 +50,16 @@ def arcdist(pt0, pt1, radius=RADIUS_EARTH_KM):
     >>> d = arcdist(pt0,pt1,RADIUS_EARTH_MILES)
     >>> d == math.pi*RADIUS_EARTH_MILES
     True
+
+    Arrays of points are paired row by row (or with a single point)
+
+    >>> arcdist(numpy.array([(0, 0), (90, 0)]), (180, 0), 1.0) / math.pi
+    array([ 1. ,  0.5])
     """
+    if _is_batch(pt0, pt1):
+        d = toXYZ(numpy.atleast_2d(pt0)) - toXYZ(numpy.atleast_2d(pt1))
+        d = numpy.sqrt((d ** 2).sum(axis=-1))
+        return linear2arcdist(numpy.minimum(d, 2.0), radius)
     return linear2arcdist(euclidean(toXYZ(pt0), toXYZ(pt1)), radius)
 
 
@@ -67,8 +76,16 @@ def arcdist2linear(arc_dist, radius=RADIUS_EARTH_KM):
     True
     >>> arcdist2linear(d,RADIUS_EARTH_MILES)
     2.0
+
+    Arrays of distances are converted at once
+
+    >>> arcdist2linear(numpy.array([0, d]), RADIUS_EARTH_MILES)
+    array([ 0.,  2.])
     """
     c = 2 * math.pi * radius
+    if numpy.ndim(arc_dist):
+        arc_dist = numpy.asarray(arc_dist, dtype=float)
+        return numpy.sqrt(2 - 2 * numpy.cos(numpy.radians(arc_dist * 360.0 / c)))
     d = (2 - (2 * math.cos(math.radians((arc_dist * 360.0) / c)))) ** (0.5)
     return d
 
@@ -84,7 +101,21 @@ def linear2arcdist(linear_dist, radius=RADIUS_EARTH_KM):
     >>> d = arcdist(pt0,pt1,RADIUS_EARTH_MILES)
     >>> d == linear2arcdist(2.0, radius = RADIUS_EARTH_MILES)
     True
+
+    Arrays of distances are converted at once
+
+    >>> linear2arcdist(numpy.array([0, 2.0, numpy.inf]), RADIUS_EARTH_MILES) / d
+    array([  0.,   1.,  inf])
     """
+    if numpy.ndim(linear_dist):
+        linear_dist = numpy.asarray(linear_dist, dtype=float)
+        if (linear_dist[numpy.isfinite(linear_dist)] > 2.0).any():
+            raise ValueError("linear_dist, must not exceed the diameter of the unit sphere, 2.0")
+        with numpy.errstate(invalid='ignore'):
+            theta = numpy.degrees(numpy.arccos((2 - linear_dist ** 2) / 2.))
+        d = theta * (2 * math.pi * radius) / 360.0
+        d[numpy.isinf(linear_dist)] = numpy.inf
+        return d
     if linear_dist == float('inf'):
         return float('inf')
     elif linear_dist > 2.0:
@@ -108,7 +139,21 @@ def toXYZ(pt):
     Returns
     -------
     x, y, z
+
+    Arrays of points are converted at once, to an nx3 array
+
+    >>> xyz = toXYZ(numpy.array([(0, 0), (90, 45)]))
+    >>> numpy.allclose(xyz[1], toXYZ((90, 45)))
+    True
     """
+    if numpy.ndim(pt) > 1:
+        pt = numpy.radians(numpy.asarray(pt, dtype=float))
+        phi, theta = pt[..., 0] + pi, pt[..., 1] + (pi / 2)
+        xyz = numpy.empty(pt.shape[:-1] + (3,), float)
+        xyz[..., 0] = numpy.sin(theta) * numpy.cos(phi)
+        xyz[..., 1] = numpy.sin(theta) * numpy.sin(phi)
+        xyz[..., 2] = numpy.cos(theta)
+        return xyz
     phi, theta = map(math.radians, pt)
     phi, theta = phi + pi, theta + (pi / 2)
     x = 1 * sin(theta) * cos(phi)
@@ -174,29 +219,23 @@ def fast_knn(pts, k, return_dist=False):
 
     """
     pts = numpy.array(pts)
-    kd = scipy.spatial.KDTree(pts)
+    kd = scipy.spatial.cKDTree(pts)
     d, w = kd.query(pts, k + 1)
-    w = w[:, 1:]
-    wn = {}
-    for i in xrange(len(pts)):
-        wn[i] = w[i].tolist()
+    wn = dict(enumerate(w[:, 1:].tolist()))
     if return_dist:
-        d = d[:, 1:]
-        wd = {}
-        for i in xrange(len(pts)):
-            wd[i] = [linear2arcdist(x,
-                                    radius=RADIUS_EARTH_MILES) for x in d[i].tolist()]
+        d = linear2arcdist(d[:, 1:], radius=RADIUS_EARTH_MILES)
+        wd = dict(enumerate(d.tolist()))
         return wn, wd
     return wn
 
 
 def fast_threshold(pts, dist, radius=RADIUS_EARTH_KM):
     d = arcdist2linear(dist, radius)
-    kd = scipy.spatial.KDTree(pts)
+    kd = scipy.spatial.cKDTree(pts)
     r = kd.query_ball_tree(kd, d)
     wd = {}
-    for i in xrange(len(pts)):
-        l = r[i]
+    for i, l in enumerate(r):
+        l.sort()
         l.remove(i)
         wd[i] = l
     return wd
@@ -245,9 +284,13 @@ def haversine(x):
     -------
     >>> haversine(math.pi)     # is 180 in radians, hence sin of 90 = 1
     1.0
+    >>> haversine(numpy.array([0, math.pi]))
+    array([ 0.,  1.])
     
     """
-    
+    if numpy.ndim(x):
+        x = numpy.sin(numpy.asarray(x, dtype=float) / 2)
+        return x * x
     x = math.sin(x/2)
     return x*x
 
@@ -278,6 +321,12 @@ def radangle(p0,p1):
     >>> p1 = (-87.519295, 41.657498)
     >>> radangle(p0,p1)
     0.007460167953189258
+
+    Arrays of points (n by 2, or any shape ending with 2) are paired
+    element by element, with numpy broadcasting
+
+    >>> radangle(numpy.array([p0, p1]), p1)
+    array([ 0.00746017,  0.        ])
     
     Note
     ----
@@ -285,12 +334,30 @@ def radangle(p0,p1):
     conversion lambda function d2r
     
     """
+    if _is_batch(p0, p1):
+        return _radangle(numpy.asarray(p0, dtype=float),
+                         numpy.asarray(p1, dtype=float))
     x0, y0 = d2r(p0[0]),d2r(p0[1])
     x1, y1 = d2r(p1[0]),d2r(p1[1])
     d = 2.0 * math.asin(math.sqrt(haversine(y1 - y0) + 
                         math.cos(y0) * math.cos(y1)*haversine(x1 - x0)))
     return d
 
+
+def _radangle(p0, p1):
+    """radangle of arrays of points"""
+    x0, y0 = d2r(p0[..., 0]), d2r(p0[..., 1])
+    x1, y1 = d2r(p1[..., 0]), d2r(p1[..., 1])
+    # rounding can take the haversine of nearly antipodal points above 1
+    h = numpy.minimum(haversine(y1 - y0) +
+                      numpy.cos(y0) * numpy.cos(y1) * haversine(x1 - x0), 1.0)
+    return 2.0 * numpy.arcsin(numpy.sqrt(h))
+
+
+def _is_batch(*points):
+    """True if any of the points is an array of points"""
+    return any(numpy.ndim(p) > 1 for p in points)
+
 def harcdist(p0,p1,lonx=True,radius=RADIUS_EARTH_KM):
     """
     Alternative arc distance function, uses haversine formula
@@ -318,12 +385,26 @@ def harcdist(p0,p1,lonx=True,radius=RADIUS_EARTH_KM):
     47.52873002976876
     >>> harcdist(p0,p1,radius=None)
     0.007460167953189258
+
+    Arrays of points are paired element by element (see radangle)
+
+    >>> harcdist(numpy.array([p0, p1]), numpy.array([p1, p0]))
+    array([ 47.52873003,  47.52873003])
     
     Note
     ----
     Uses radangle function to compute radian angle
     
     """
+    if _is_batch(p0, p1):
+        p0 = numpy.asarray(p0, dtype=float)
+        p1 = numpy.asarray(p1, dtype=float)
+        if not(lonx):
+            p0, p1 = p0[..., ::-1], p1[..., ::-1]
+        d = _radangle(p0, p1)
+        if radius is not None:
+            d = d * radius
+        return d
     if not(lonx):
         p = lonlat([p0,p1])
         p0 = p[0]
@@ -334,6 +415,43 @@ def harcdist(p0,p1,lonx=True,radius=RADIUS_EARTH_KM):
         d = d*radius
     return d
 
+def harcdist_matrix(pts0, pts1=None, lonx=True, radius=RADIUS_EARTH_KM):
+    """
+    Arc distances between all the pairs of points of two blocks, with the
+    haversine formula (see harcdist)
+
+    Parameters
+    ----------
+    pts0     : n by 2 array of points in decimal degrees
+    pts1     : m by 2 array of points in decimal degrees, defaults to pts0
+    lonx     : boolean to assess the order of the coordinates,
+               for lon,lat (default) = True, for lat,lon = False
+    radius   : radius of the sphere, None for radians
+
+    Returns
+    -------
+    d        : n by m array of distances
+
+    Example
+    -------
+    >>> pts = [(-87.893517, 41.981417), (-87.519295, 41.657498), (-87.69645, 41.980906)]
+    >>> d = harcdist_matrix(pts)
+    >>> d[0, 1] == harcdist(pts[0], pts[1])
+    True
+    >>> numpy.allclose(d, d.T)
+    True
+
+    Note
+    ----
+    The blocks are held in memory; pysal.cg.distance_blocks computes the
+    arc distances of larger sets of points block by block.
+
+    """
+    pts0 = numpy.asarray(pts0, dtype=float).reshape((-1, 2))
+    pts1 = pts0 if pts1 is None else \
+        numpy.asarray(pts1, dtype=float).reshape((-1, 2))
+    return harcdist(pts0[:, None], pts1[None, :], lonx, radius)
+
 def geointerpolate(p0,p1,t,lonx=True):
     """
     Finds a point on a sphere along the great circle distance between two points 
@@ -365,8 +483,19 @@ def geointerpolate(p0,p1,t,lonx=True):
     >>> p4 = (41.657498, -87.519295)
     >>> geointerpolate(p3,p4,0.1,lonx=False)   # using lat-lon
     (41.949079912574796, -87.85592403438788)
+
+    Arrays of points and/or of proportions are interpolated at once, with
+    numpy broadcasting, into an array of points
+
+    >>> geointerpolate(p0,p1,numpy.array([0.1, 0.5]))
+    array([[-87.85592403,  41.94907991],
+           [-87.70593277,  41.81960932]])
     
     """
+    if _is_batch(p0, p1) or numpy.ndim(t):
+        return _geointerpolate(numpy.asarray(p0, dtype=float),
+                               numpy.asarray(p1, dtype=float),
+                               numpy.asarray(t, dtype=float), lonx)
     
     if not(lonx):
         p = lonlat([p0,p1])
@@ -391,8 +520,34 @@ def geointerpolate(p0,p1,t,lonx=True):
     if not(lonx):
         return newpy,newpx
     return newpx,newpy
+
+
+def _geointerpolate(p0, p1, t, lonx):
+    """geointerpolate of arrays of points and proportions"""
+    if not(lonx):
+        p0, p1 = p0[..., ::-1], p1[..., ::-1]
+    d = _radangle(p0, p1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        k = 1.0 / numpy.sin(d)
+    t = t * d
+    A = numpy.sin(d - t) * k
+    B = numpy.sin(t) * k
+
+    x0, y0 = d2r(p0[..., 0]), d2r(p0[..., 1])
+    x1, y1 = d2r(p1[..., 0]), d2r(p1[..., 1])
+
+    x = A * numpy.cos(y0) * numpy.cos(x0) + B * numpy.cos(y1) * numpy.cos(x1)
+    y = A * numpy.cos(y0) * numpy.sin(x0) + B * numpy.cos(y1) * numpy.sin(x1)
+    z = A * numpy.sin(y0) + B * numpy.sin(y1)
+
+    points = numpy.empty(numpy.shape(x) + (2,), float)
+    points[..., 0] = r2d(numpy.arctan2(y, x))
+    points[..., 1] = r2d(numpy.arctan2(z, numpy.sqrt(x * x + y * y)))
+    if not(lonx):
+        return points[..., ::-1].copy()
+    return points
  
-def geogrid(pup,pdown,k,lonx=True):
+def geogrid(pup,pdown,k,lonx=True,as_array=False):
     """
     Computes a k+1 by k+1 set of grid points for a bounding box in lat-lon
     uses geointerpolate
@@ -404,6 +559,7 @@ def geogrid(pup,pdown,k,lonx=True):
     k       : number of grid cells (grid points will be one more)
     lonx    : boolean to assess the order of the coordinates, 
               for lon,lat (default) = True, for lat,lon = False
+    as_array: boolean, if True the grid is returned as a (k+1)**2 by 2 array
     
     Returns
     -------
@@ -423,29 +579,26 @@ def geogrid(pup,pdown,k,lonx=True):
         corners = [pup,pdown]
     else:
         corners = lonlat([pup,pdown])
-    tpoints = [float(i)/k for i in range(k)[1:]]
-    leftcorners = [corners[0],(corners[0][0],corners[1][1])]
-    rightcorners = [(corners[1][0],corners[0][1]),corners[1]]
-    leftside = [leftcorners[0]]
-    rightside = [rightcorners[0]]
-    for t in tpoints:
-        newpl = geointerpolate(leftcorners[0],leftcorners[1],t)
-        leftside.append(newpl)
-        newpr = geointerpolate(rightcorners[0],rightcorners[1],t)
-        rightside.append(newpr)
-    leftside.append(leftcorners[1])
-    rightside.append(rightcorners[1])
-    
-    grid = []
-    for i in range(len(leftside)):
-        grid.append(leftside[i])
-        for t in tpoints:
-            newp = geointerpolate(leftside[i],rightside[i],t)
-            grid.append(newp)
-        grid.append(rightside[i])
+    tpoints = numpy.arange(1, k) / float(k)
+    leftcorners = numpy.array([corners[0],(corners[0][0],corners[1][1])], float)
+    rightcorners = numpy.array([(corners[1][0],corners[0][1]),corners[1]], float)
+    leftside = numpy.vstack((leftcorners[:1],
+                             _geointerpolate(leftcorners[0], leftcorners[1],
+                                             tpoints, True),
+                             leftcorners[1:]))
+    rightside = numpy.vstack((rightcorners[:1],
+                              _geointerpolate(rightcorners[0], rightcorners[1],
+                                              tpoints, True),
+                              rightcorners[1:]))
+    inner = _geointerpolate(leftside[:, None], rightside[:, None],
+                            tpoints[None, :], True)
+    grid = numpy.concatenate((leftside[:, None], inner, rightside[:, None]),
+                             axis=1).reshape((-1, 2))
     if not(lonx):
-        grid = lonlat(grid)
-    return grid
+        grid = grid[:, ::-1]
+    if as_array:
+        return grid.copy()
+    return map(tuple, grid.tolist())
     
        
 
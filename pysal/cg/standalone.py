@@ -12,12 +12,15 @@ import copy
 from shapes import *
 from itertools import islice
 import scipy.spatial
+import scipy.sparse
+import sphere
 from pysal.common import *
 
 EPSILON_SCALER = 3
+BLOCK_BYTES = 32 * 1024 ** 2  # temporary arrays of a block of distances
 
 
-__all__ = ['bbcommon', 'get_bounding_box', 'get_angle_between', 'is_collinear', 'get_segments_intersect', 'get_segment_point_intersect', 'get_polygon_point_intersect', 'get_rectangle_point_intersect', 'get_ray_segment_intersect', 'get_rectangle_rectangle_intersection', 'get_polygon_point_dist', 'get_points_dist', 'get_segment_point_dist', 'get_point_at_angle_and_dist', 'convex_hull', 'is_clockwise', 'point_touches_rectangle', 'get_shared_segments', 'distance_matrix']
+__all__ = ['bbcommon', 'get_bounding_box', 'get_angle_between', 'is_collinear', 'get_segments_intersect', 'get_segment_point_intersect', 'get_polygon_point_intersect', 'get_rectangle_point_intersect', 'get_ray_segment_intersect', 'get_rectangle_rectangle_intersection', 'get_polygon_point_dist', 'get_points_dist', 'get_segment_point_dist', 'get_point_at_angle_and_dist', 'convex_hull', 'is_clockwise', 'point_touches_rectangle', 'get_shared_segments', 'distance_matrix', 'distance_blocks']
 
 
 def bbcommon(bb, bbother):
@@ -842,11 +845,16 @@ def get_shared_segments(poly1, poly2, bool_ret=False):
     return common
 
 
-def distance_matrix(X, p=2.0, threshold=5e7):
+def distance_matrix(X, p=2.0, threshold=5e7, max_distance=None,
+                    distance_metric='Euclidean', radius=1.0, out=None):
     """
     Distance Matrices
 
-    XXX Needs optimization/integration with other weights in pysal
+    The distances are computed by blocks of rows (see distance_blocks), so
+    the temporary arrays stay within threshold bytes whatever the number
+    of observations. The full matrix can be written to a preallocated
+    (e.g. memory mapped) array, or only the distances up to max_distance
+    kept in a sparse matrix.
 
     Parameters
     ----------
@@ -859,8 +867,20 @@ def distance_matrix(X, p=2.0, threshold=5e7):
                     2: Euclidean distance
                     1: Manhattan distance
     threshold  : positive integer
-                    If (n**2)*32 > threshold use scipy.spatial.distance_matrix instead
-                    of working in ram, this is roughly the ammount of ram (in bytes) that will be used.
+                    roughly the ammount of ram (in bytes) used by the
+                    temporary arrays of each block of rows.
+    max_distance : float
+                    if given, returns a sparse (COO) matrix with the
+                    distances up to max_distance only (pairs at distance 0,
+                    including the diagonal, are stored explicitly).
+    distance_metric : string
+                    'Euclidean', or 'Arc' for the great circle distances
+                    between (lng, lat) points in degrees.
+    radius     : float
+                    radius of the sphere for arc distances.
+    out        : array
+                    n by n array, such as a numpy.memmap, in which the
+                    distances are written, instead of a new array.
 
     Examples
     --------
@@ -886,7 +906,14 @@ def distance_matrix(X, p=2.0, threshold=5e7):
              1.41421356,  1.        ,  0.        ,  1.        ],
            [ 2.82842712,  2.23606798,  2.        ,  2.23606798,  1.41421356,
              1.        ,  2.        ,  1.        ,  0.        ]])
-    >>>
+    >>> sd = distance_matrix(data, max_distance=1.0)
+    >>> sd.nnz
+    33
+    >>> np.allclose(sd.toarray(), np.where(d <= 1, d, 0))
+    True
+    >>> distance_matrix(np.array([[0, 0], [90, 0]]), distance_metric='Arc')
+    array([[ 0.        ,  1.57079633],
+           [ 1.57079633,  0.        ]])
     """
     if X.ndim == 1:
         X.shape = (X.shape[0], 1)
@@ -894,20 +921,109 @@ def distance_matrix(X, p=2.0, threshold=5e7):
         raise TypeError("wtf?")
     n, k = X.shape
 
-    if (n ** 2) * 32 > threshold:
-        return scipy.spatial.distance_matrix(X, X, p)
-    else:
-        M = np.ones((n, n))
-        D = np.zeros((n, n))
-        for col in range(k):
-            x = X[:, col]
-            xM = x * M
-            dx = xM - xM.T
-            if p % 2 != 0:
-                dx = np.abs(dx)
-            dx2 = dx ** p
-            D += dx2
-        D = D ** (1.0 / p)
-        return D
+    blocks = distance_blocks(X, p=p, max_distance=max_distance,
+                             distance_metric=distance_metric, radius=radius,
+                             block_bytes=threshold)
+    if max_distance is not None:
+        blocks = [block for start, block in blocks]
+        if not blocks:
+            return scipy.sparse.coo_matrix((n, n))
+        return scipy.sparse.vstack(blocks, format='coo')
+    if out is None:
+        out = np.empty((n, n))
+    for start, block in blocks:
+        out[start:start + len(block)] = block
+    return out
+
+
+def distance_blocks(X, Y=None, p=2.0, max_distance=None,
+                    distance_metric='Euclidean', radius=1.0,
+                    block_bytes=BLOCK_BYTES):
+    """
+    Yields the distances between the rows of X and the rows of Y by
+    blocks of rows of X, never holding more than a block in memory
 
+    Parameters
+    ----------
+    X               : array
+                      n by k array of points
+    Y               : array
+                      m by k array of points, defaults to X
+    p               : float
+                      Minkowski p-norm distance metric parameter,
+                      1<=p<=infinity
+    max_distance    : float
+                      if given, the blocks are sparse COO matrices with the
+                      distances up to max_distance only (pairs at distance
+                      0 are stored explicitly)
+    distance_metric : string
+                      'Euclidean' (Minkowski p), or 'Arc' for the great
+                      circle distances between (lng, lat) points in degrees
+    radius          : float
+                      radius of the sphere for arc distances
+    block_bytes     : int
+                      approximate size in bytes of the temporary arrays of
+                      a block
+
+    Returns
+    -------
+    blocks          : generator
+                      of (start, block) tuples, block holding the
+                      distances from rows start:start + len(block) of X to
+                      all the rows of Y, as a dense array or a COO matrix
 
+    Examples
+    --------
+    >>> X = np.array([[0, 0], [3, 4], [6, 8]])
+    >>> for start, block in distance_blocks(X, block_bytes=1):
+    ...     print start, block
+    0 [[  0.   5.  10.]]
+    1 [[ 5.  0.  5.]]
+    2 [[ 10.   5.   0.]]
+    >>> start, block = distance_blocks(X, p=1, max_distance=7).next()
+    >>> block.toarray()
+    array([[ 0.,  7.,  0.],
+           [ 7.,  0.,  7.],
+           [ 0.,  7.,  0.]])
+    """
+    X = np.asarray(X, dtype=float)
+    X = X.reshape((len(X), -1))
+    Y = X if Y is None else np.asarray(Y, dtype=float).reshape((-1, X.shape[1]))
+    if distance_metric == 'Arc':
+        X, Y, p = sphere.toXYZ(X), sphere.toXYZ(Y), 2.0
+    elif distance_metric != 'Euclidean':
+        raise ValueError("distance_metric must be 'Euclidean' or 'Arc'")
+    if p < 1:
+        raise ValueError("p must be at least 1")
+    # the block, a difference and its power are held at once
+    rows = max(int(block_bytes // (24 * max(len(Y), 1))), 1)
+    for start in xrange(0, len(X), rows):
+        D = _minkowski(X[start:start + rows], Y, p)
+        if distance_metric == 'Arc':
+            D = sphere.linear2arcdist(np.minimum(D, 2.0), radius)
+        if max_distance is None:
+            yield start, D
+        else:
+            i, j = np.nonzero(D <= max_distance)
+            yield start, scipy.sparse.coo_matrix((D[i, j], (i, j)),
+                                                 shape=D.shape)
+
+
+def _minkowski(A, B, p):
+    """Minkowski p distances between the rows of A and the rows of B"""
+    D = np.zeros((len(A), len(B)))
+    for col in xrange(A.shape[1]):
+        dx = np.abs(A[:, col, None] - B[None, :, col])
+        if p == np.inf:
+            np.maximum(D, dx, D)
+        elif p == 1:
+            D += dx
+        elif p == 2:
+            D += dx * dx
+        else:
+            D += dx ** p
+    if p == 2:
+        np.sqrt(D, D)
+    elif p not in (1, np.inf):
+        D **= 1.0 / p
+    return D
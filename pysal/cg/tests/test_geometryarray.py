@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+import pysal
+from pysal.cg import GeometryArray, Point, Chain, Polygon
+
+
+class test_GeometryArray(unittest.TestCase):
+    def setUp(self):
+        path = pysal.examples.get_path('NAT.shp')
+        self.ga = GeometryArray.from_arrays(pysal.open(path).read_arrays())
+        self.polygons = pysal.open(path).read()
+
+    def test_polygons(self):
+        ga, polygons = self.ga, self.polygons
+        self.assertEqual(len(ga), len(polygons))
+        np.testing.assert_allclose(ga.area, [p.area for p in polygons])
+        np.testing.assert_allclose(ga.centroid,
+                                   [p.centroid for p in polygons])
+        np.testing.assert_allclose(ga.perimeter,
+                                   [p.perimeter for p in polygons])
+        np.testing.assert_allclose(ga.bounds, [p.bbox for p in polygons])
+        self.assert_((ga.signed_area < 0).all())
+
+    def test_round_trip(self):
+        shapes = self.ga.to_shapes()
+        for a, b in zip(shapes, self.polygons):
+            self.assertEqual(a.vertices, b.vertices)
+            self.assertEqual(a.holes, b.holes)
+        ga = GeometryArray.from_shapes(self.polygons)
+        np.testing.assert_allclose(ga.bounds, self.ga.bounds)
+        np.testing.assert_allclose(ga.centroid, self.ga.centroid)
+
+    def test_holes(self):
+        p = Polygon([Point((0, 0)), Point((0, 10)), Point((10, 10)),
+                     Point((10, 0))],
+                    [Point((2, 2)), Point((4, 2)), Point((4, 4)),
+                     Point((2, 4))])
+        ga = GeometryArray.from_shapes([None, p])
+        self.assertEqual(list(ga.area), [0.0, 96.0])
+        self.assertAlmostEqual(ga.perimeter[1], p.perimeter)
+        np.testing.assert_allclose(ga.centroid[1], p.centroid)
+        self.assert_(np.isnan(ga.bounds[0]).all())
+        self.assertEqual(ga[0], None)
+        self.assertEqual(ga[1].area, 96.0)
+        ga = GeometryArray.from_shapes([None, None])
+        self.assertEqual(list(ga.area), [0.0, 0.0])
+        self.assertEqual(list(ga.signed_area), [0.0, 0.0])
+        self.assertEqual(list(ga.perimeter), [0.0, 0.0])
+        self.assertEqual(ga.centroid.shape, (2, 2))
+
+    def test_chains(self):
+        c = Chain([[Point((0, 0)), Point((3, 4))],
+                   [Point((10, 10)), Point((11, 10)), Point((11, 11))]])
+        ga = GeometryArray.from_shapes([c])
+        self.assertEqual(list(ga.perimeter), [c.len])
+        self.assertEqual(ga[0].vertices, [v[:] for v in c.vertices])
+        self.failUnlessRaises(TypeError, getattr, ga, 'area')
+        self.failUnlessRaises(TypeError, GeometryArray.from_shapes,
+                              [c, Point((0, 0))])
+
+
+if __name__ == '__main__':
+    unittest.main()
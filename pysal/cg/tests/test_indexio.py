@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pysal
+from pysal.cg import (Point, Rectangle, Grid, PolygonLocator, Arc_KDTree,
+                      save_index, load_index)
+
+
+class IndexIO_Tester(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'index.idx')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_arc_kdtree(self):
+        np.random.seed(10)
+        pts = np.column_stack((np.random.uniform(-180, 180, 200),
+                               np.random.uniform(-90, 90, 200)))
+        tree = Arc_KDTree(pts, radius=10)
+        save_index(tree, self.path)
+        loaded = load_index(self.path)
+        self.assert_(isinstance(loaded, Arc_KDTree))
+        self.assertEqual(loaded.radius, 10)
+        d0, i0 = tree.query(pts[:20], k=3)
+        d1, i1 = loaded.query(pts[:20], k=3)
+        np.testing.assert_array_equal(i0, i1)
+        np.testing.assert_allclose(d0, d1)
+
+    def test_grid(self):
+        grid = Grid(Rectangle(0, 0, 10, 10), 2)
+        grid.add('a', Point((1, 1)))
+        grid.add({'b': 1}, Point((5, 6)))
+        save_index(grid, self.path)
+        loaded = load_index(self.path, mmap=False)
+        self.assertEqual(loaded.nearest(Point((0, 0))), 'a')
+        self.assertEqual(loaded.proximity(Point((5, 5)), 2), [{'b': 1}])
+        grid = Grid(Rectangle(0, 0, 10, 10), 2)
+        grid.add('a', Point((1, 1)))
+        grid.add(('x', 2), Point((5, 6)))
+        save_index(grid, self.path)
+        loaded = load_index(self.path)
+        self.assertEqual(loaded.proximity(Point((5, 5)), 2), [('x', 2)])
+
+    def test_polygon_locator(self):
+        shp = pysal.examples.get_path('columbus.shp')
+        locator = PolygonLocator(pysal.open(shp).read())
+        save_index(locator, self.path, source=shp)
+        loaded = load_index(self.path, source=shp)
+        np.random.seed(3)
+        pts = np.column_stack((np.random.uniform(6, 12, 100),
+                               np.random.uniform(10, 15, 100)))
+        np.testing.assert_array_equal(loaded.contains_points(pts),
+                                      locator.contains_points(pts))
+        inside = loaded.inside(Rectangle(8, 12, 9, 13))
+        self.assertEqual(len(inside), len(locator.inside(Rectangle(8, 12, 9, 13))))
+        region = loaded.region(Rectangle(8, 12, 9, 13))
+        expected = locator.region(Rectangle(8, 12, 9, 13))
+        self.assertEqual([p.vertices for p in region],
+                         [p.vertices for p in expected])
+
+    def test_stale(self):
+        for ext in ('shp', 'shx'):
+            shutil.copy(pysal.examples.get_path('columbus.' + ext),
+                        os.path.join(self.dir, 'columbus.' + ext))
+        shp = os.path.join(self.dir, 'columbus.shp')
+        save_index(PolygonLocator(pysal.open(shp).read()), self.path,
+                   source=shp)
+        os.utime(shp, (0, 0))
+        self.assertNotEqual(load_index(self.path, source=shp), None)
+        f = open(shp, 'r+b')
+        f.seek(200)
+        f.write('x')
+        f.close()
+        self.assertEqual(load_index(self.path, source=shp), None)
+        other = pysal.examples.get_path('NAT.shp')
+        self.assertEqual(load_index(self.path, source=other), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from pysal.cg import sphere
+from pysal.cg.kdtree import Arc_KDTree
+
+
+class test_Arc_KDTree(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(12345)
+        self.pts = np.column_stack((rng.uniform(-180, 180, 100),
+                                    rng.uniform(-90, 90, 100)))
+        self.kd = Arc_KDTree(self.pts, radius=sphere.RADIUS_EARTH_KM)
+        self.dmat = np.array([[sphere.arcdist(p, q) for q in self.pts]
+                              for p in self.pts])
+
+    def test_query(self):
+        d, i = self.kd.query(self.pts, k=4)
+        expected = np.sort(self.dmat, axis=1)[:, :4]
+        np.testing.assert_allclose(d, expected, atol=1e-6)
+        np.testing.assert_allclose(
+            self.dmat[np.arange(100)[:, None], i], expected, atol=1e-6)
+
+    def test_query_ball_point(self):
+        res = self.kd.query_ball_point(self.pts[:10], 2000.0)
+        for row, ids in zip(self.dmat[:10], res):
+            self.assertEqual(ids, list(np.flatnonzero(row <= 2000.0)))
+
+    def test_sparse_distance_matrix(self):
+        D = self.kd.sparse_distance_matrix(self.kd, 2000.0).tocoo()
+        self.assertEqual(D.shape, (100, 100))
+        np.testing.assert_allclose(D.data, self.dmat[D.row, D.col],
+                                   atol=1e-6)
+        off = D.row != D.col
+        self.assertEqual(off.sum(), ((self.dmat <= 2000.0).sum() - 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
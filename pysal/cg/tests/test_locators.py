@@ -54,6 +54,30 @@ class PolygonLocator_Tester(unittest.TestCase):
         res = self.pl2.overlapping(qr)
         self.assertEqual(len(res), 4)
 
+    def test_contains_points(self):
+        import numpy as np
+        import pysal
+        polys = pysal.open(pysal.examples.get_path('columbus.shp')).read()
+        pl = PolygonLocator(polys)
+        rng = np.random.RandomState(12345)
+        pts = np.column_stack((rng.uniform(5, 12, 2000),
+                               rng.uniform(10, 15, 2000)))
+        # vertices and a point outside every polygon
+        pts = np.vstack((pts, [p.vertices[0][:] for p in polys], [(0, 0)]))
+        ids = pl.contains_points(pts, chunksize=500)
+        expected = []
+        for pt in pts:
+            found = [i for i, p in enumerate(polys) if p.contains_point(pt)]
+            expected.append(found[0] if found else -1)
+        self.assertEqual(ids.tolist(), expected)
+        self.assertEqual(ids[-1], -1)
+        self.assertEqual(pl.contains_points(pts, cores=2, chunksize=500).tolist(),
+                         expected)
+        self.assertEqual(len(pl.contains_points(np.zeros((0, 2)))), 0)
+        # the third polygon of pl2 spans 20 <= x <= 30
+        self.assertEqual(self.pl2.contains_points([(25, 15), (25, 25)]).tolist(),
+                         [2, -1])
+
 suite = unittest.TestSuite()
 test_classes = [PolygonLocator_Tester]
 for i in test_classes:
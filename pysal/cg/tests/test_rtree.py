@@ -1,7 +1,10 @@
 
 """pyrtree Unittest."""
-from pysal.cg import RTree, Rect
+from pysal.cg import RTree, Rect, PackedRTree
+import os
+import tempfile
 import unittest
+import numpy as np
 
 
 class Pyrtree_Tester(unittest.TestCase):
@@ -57,8 +60,58 @@ class Pyrtree_Tester(unittest.TestCase):
         self.assertEqual(len(res), 4)
 
 
+class PackedRTree_Tester(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(12345)
+        xy = rng.rand(500, 2) * 100
+        self.bboxes = np.hstack((xy, xy + rng.rand(500, 2) * 5))
+        self.bboxes[7] = np.nan
+        self.tree = PackedRTree(self.bboxes, node_size=4)
+        self.rects = np.hstack((xy[:50] - 3, xy[:50] + 3))
+
+    def brute_force(self, r):
+        b = self.bboxes
+        return np.flatnonzero((b[:, 0] <= r[2]) & (b[:, 2] >= r[0]) &
+                              (b[:, 1] <= r[3]) & (b[:, 3] >= r[1]))
+
+    def test_query_rects(self):
+        self.assertEqual(len(self.tree), 499)
+        offsets, ids = self.tree.query_rects(self.rects)
+        for i, r in enumerate(self.rects):
+            self.assertEqual(list(ids[offsets[i]:offsets[i + 1]]),
+                             list(self.brute_force(r)))
+        self.assertEqual(list(self.tree.query_point((50, 50))),
+                         list(self.brute_force([50, 50, 50, 50])))
+
+    def test_nearest(self):
+        points = np.array([[-10, -10], [50, 50], [120, 30]], float)
+        ids, dists = self.tree.nearest(points)
+        b = self.bboxes
+        for i, (x, y) in enumerate(points):
+            dx = np.maximum(np.maximum(b[:, 0] - x, x - b[:, 2]), 0)
+            dy = np.maximum(np.maximum(b[:, 1] - y, y - b[:, 3]), 0)
+            d = np.sqrt(dx * dx + dy * dy)
+            d[7] = np.inf
+            self.assertEqual(ids[i], np.argmin(d))
+            self.assertAlmostEqual(dists[i], d.min())
+        ids, dists = PackedRTree(np.zeros((0, 4))).nearest(points)
+        self.assertEqual(list(ids), [-1, -1, -1])
+
+    def test_save(self):
+        fd, path = tempfile.mkstemp(suffix='.npz')
+        os.close(fd)
+        self.tree.save(path)
+        tree = PackedRTree.load(path)
+        os.remove(path)
+        self.assertEqual(tree.n, 500)
+        offsets, ids = tree.query_rects(self.rects)
+        expected = self.tree.query_rects(self.rects)
+        self.assertEqual(list(offsets), list(expected[0]))
+        self.assertEqual(list(ids), list(expected[1]))
+
+
 suite = unittest.TestSuite()
-test_classes = [Pyrtree_Tester]
+test_classes = [Pyrtree_Tester, PackedRTree_Tester]
 for i in test_classes:
     a = unittest.TestLoader().loadTestsFromTestCase(i)
     suite.addTest(a)
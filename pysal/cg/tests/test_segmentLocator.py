@@ -1,7 +1,9 @@
 """Segment Locator Unittest."""
 from pysal.cg import *
 from pysal.cg.segmentLocator import *
+from pysal.cg.segmentLocator import BruteSegmentLocator
 import unittest
+import numpy as np
 
 
 class SegmentGrid_Tester(unittest.TestCase):
@@ -37,8 +39,35 @@ class SegmentGrid_Tester(unittest.TestCase):
                                                               100000.0))))  # Top Edge
 
 
+class PackedSegmentLocator_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(10)
+        starts = np.random.random((200, 2))
+        self.segments = np.hstack((starts, starts + np.random.normal(
+            0, 0.05, (200, 2))))
+        self.locator = PackedSegmentLocator(self.segments)
+
+    def test_snap(self):
+        points = np.random.random((100, 2)) * 1.2 - 0.1
+        ids, dists, coords = self.locator.snap(points)
+        brute = BruteSegmentLocator(
+            [LineSegment(Point(s[:2]), Point(s[2:])) for s in self.segments])
+        for pt, i, d, c in zip(points, ids, dists, coords):
+            self.assertEquals(i, brute.nearest(Point(pt)))
+            seg = LineSegment(Point(self.segments[i, :2]),
+                              Point(self.segments[i, 2:]))
+            self.assertAlmostEquals(d, get_segment_point_dist(seg, pt)[0])
+            self.assertAlmostEquals(d, np.hypot(*(pt - c)))
+
+    def test_snap_empty(self):
+        ids, dists, coords = self.locator.snap([(np.nan, 0.5)])
+        self.assertEquals((ids[0], dists[0]), (-1, np.inf))
+        self.assert_(np.isnan(coords).all())
+        self.assertEquals(PackedSegmentLocator([]).nearest((0, 0)), None)
+
+
 suite = unittest.TestSuite()
-test_classes = [SegmentGrid_Tester]
+test_classes = [SegmentGrid_Tester, PackedSegmentLocator_Tester]
 for i in test_classes:
     a = unittest.TestLoader().loadTestsFromTestCase(i)
     suite.addTest(a)
@@ -25,6 +25,20 @@ class test_Point(unittest.TestCase):
             self.assertEquals(str(p), str((float(l[0]), float(
                 l[1]))))  # Recast to floats like point does
 
+    def test_pickle(self):
+        """
+        Tests that points without an instance dictionary keep their
+        coordinates and attributes through pickle.
+        """
+        import pickle
+        p = Point((1, 2))
+        self.assertFalse(hasattr(p, 'id'))
+        p.id, p.Z, p.label = 5, 3.0, 'a'
+        for protocol in range(3):
+            q = pickle.loads(pickle.dumps(p, protocol))
+            self.assertEquals(q, p)
+            self.assertEquals((q.id, q.Z, q.label), (5, 3.0, 'a'))
+
 
 class test_LineSegment(unittest.TestCase):
 
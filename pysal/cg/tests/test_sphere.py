@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from pysal.cg import sphere
+
+
+class Sphere_Tester(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(5)
+        self.p0 = np.column_stack((np.random.uniform(-180, 180, 50),
+                                   np.random.uniform(-90, 90, 50)))
+        self.p1 = np.column_stack((np.random.uniform(-180, 180, 50),
+                                   np.random.uniform(-90, 90, 50)))
+        self.pairs = zip(map(tuple, self.p0), map(tuple, self.p1))
+
+    def test_arcdist(self):
+        np.testing.assert_allclose(
+            sphere.arcdist(self.p0, self.p1),
+            [sphere.arcdist(a, b) for a, b in self.pairs])
+        np.testing.assert_allclose(
+            sphere.arcdist(self.p0, self.p1),
+            sphere.harcdist(self.p0, self.p1))
+
+    def test_harcdist(self):
+        np.testing.assert_allclose(
+            sphere.harcdist(self.p0, self.p1, radius=None),
+            [sphere.harcdist(a, b, radius=None) for a, b in self.pairs])
+        np.testing.assert_allclose(
+            sphere.harcdist(self.p0[:, ::-1], self.p1[:, ::-1], lonx=False),
+            [sphere.harcdist(a, b) for a, b in self.pairs])
+        d = sphere.harcdist_matrix(self.p0, self.p1)
+        self.assertEqual(d.shape, (50, 50))
+        np.testing.assert_allclose(np.diag(d),
+                                   sphere.harcdist(self.p0, self.p1))
+        self.assertAlmostEqual(d[3, 7], sphere.harcdist(self.pairs[3][0],
+                                                        self.pairs[7][1]))
+
+    def test_geointerpolate(self):
+        points = sphere.geointerpolate(self.p0, self.p1, 0.25)
+        np.testing.assert_allclose(
+            points, [sphere.geointerpolate(a, b, 0.25) for a, b in self.pairs])
+        points = sphere.geointerpolate(self.pairs[0][1][::-1],
+                                       self.pairs[0][0][::-1],
+                                       np.array([0.1, 0.9]), lonx=False)
+        np.testing.assert_allclose(
+            points[:, ::-1], [sphere.geointerpolate(self.pairs[0][1],
+                                                    self.pairs[0][0], t)
+                              for t in (0.1, 0.9)])
+
+    def test_geogrid(self):
+        pup = (42.023768, -87.946389)
+        pdown = (41.644415, -87.524102)
+        grid = sphere.geogrid(pup, pdown, 4, lonx=False, as_array=True)
+        self.assertEqual(grid.shape, (25, 2))
+        np.testing.assert_allclose(grid,
+                                   sphere.geogrid(pup, pdown, 4, lonx=False))
+        np.testing.assert_allclose(grid[[0, -1]], [pup, pdown])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
+import os
+import tempfile
 import numpy as np
 import math
+import scipy.spatial
+import pysal
 
 from pysal.cg.shapes import *
 from pysal.cg.standalone import *
@@ -597,5 +601,34 @@ class TestDistanceMatrix(unittest.TestCase):
                 d = ((x - X) ** 2 + (y - Y) ** 2) ** (0.5)
                 self.assertEqual(dist[i, j], d)
 
+    def test_distance_matrix_blocks(self):
+        np.random.seed(0)
+        points = np.random.random((50, 3))
+        for p in (1, 1.5, 2, np.inf):
+            expected = scipy.spatial.distance_matrix(points, points, p)
+            np.testing.assert_allclose(
+                distance_matrix(points, p, threshold=1000), expected)
+        sparse = distance_matrix(points, threshold=1000, max_distance=0.3)
+        expected = scipy.spatial.distance_matrix(points, points)
+        expected[expected > 0.3] = 0
+        np.testing.assert_allclose(sparse.toarray(), expected)
+        self.assertEqual(sparse.nnz, (expected > 0).sum() + 50)
+
+    def test_distance_matrix_out(self):
+        points = np.random.random((20, 2)) * 100
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        out = np.memmap(path, dtype=float, mode='w+', shape=(20, 20))
+        dist = distance_matrix(points, distance_metric='Arc', out=out,
+                               threshold=100)
+        self.assert_(dist is out)
+        del dist, out
+        arcs = np.memmap(path, dtype=float, mode='r', shape=(20, 20))
+        kd = pysal.cg.KDTree(points, distance_metric='Arc')
+        d, i = kd.query(points[0], 20)
+        np.testing.assert_allclose(arcs[0, i], d)
+        del arcs
+        os.remove(path)
+
 if __name__ == '__main__':
     unittest.main()
@@ -15,6 +15,7 @@ import os.path
 import struct
 from warnings import warn
 import pysal
+import IOCache
 
 
 class FileIO_MetaCls(type):
@@ -308,6 +309,38 @@ class FileIO(object):  # should be a type?
                     break
             return result
 
+    def iter_chunks(self, chunksize=10000):
+        """ Iterates over the objects from the current position in blocks of
+        at most chunksize objects, advancing the position.
+        By default each block is the list returned by read(chunksize),
+        handlers that can decode many records at once override this to
+        yield arrays.
+        """
+        self._complain_ifclosed(self.closed)
+        while 1:
+            chunk = self.read(chunksize)
+            if not chunk:
+                break
+            yield chunk
+
+    def write_chunk(self, objs):
+        """ Writes a sequence of objects, as write does for each of them.
+        Handlers may override this to write the whole block at once.
+        """
+        self._complain_ifclosed(self.closed)
+        for obj in objs:
+            self.write(obj)
+
+    def _cached(self, key, builder, share=None):
+        """ Returns builder(), shared through the process level cache of
+        pysal.core.IOCache when it is enabled.
+        key is a tuple identifying the result within the file, the path of
+        the file and the handler class are added to it.
+        """
+        return IOCache.cache.fetch(self.dataPath,
+                                   (self.__class__.__name__,) + tuple(key),
+                                   builder, share)
+
     def __read(self):
         """ Gets one row from the file handler, and if necessary casts it's objects """
         row = self._read()
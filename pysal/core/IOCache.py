@@ -0,0 +1,287 @@
+"""
+IOCache: opt-in, process level cache of data parsed from files.
+
+When enabled, columns (by_col), geometry arrays (read_arrays) and weights
+read through pysal.open, and contiguity weights built from shapefiles, are
+kept in memory and shared by later calls on the same unchanged file. Entries
+are keyed by the absolute path, modification time and size of the file (and
+of the other files the value is built from, like the DBF holding the ids of
+weights), the handler class and the request, and the least recently used
+entries are evicted when the estimated size of the cache exceeds max_bytes.
+
+Cached numpy arrays are made read-only, lists and dictionaries are copied
+on each hit, and weights are returned as new W/WSP objects built from copies
+of the cached neighbors and weights, so callers can not alter what others
+receive by mutating, or transforming, their result.
+
+>>> import pysal
+>>> from pysal.core import IOCache
+>>> IOCache.enable()
+>>> db = pysal.open(pysal.examples.get_path('columbus.dbf'))
+>>> hoval = db.by_col('HOVAL')
+>>> hoval = pysal.open(pysal.examples.get_path('columbus.dbf')).by_col('HOVAL')
+>>> IOCache.stats()['hits'], IOCache.stats()['misses']
+(1, 1)
+>>> IOCache.disable()
+"""
+
+__all__ = ['IOCache', 'enable', 'disable', 'clear', 'stats']
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
+
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+SAMPLE_SIZE = 100
+
+
+class IOCache(object):
+    """
+    LRU cache of parsed file contents, bounded by the estimated size in
+    bytes of the cached values
+
+    Parameters
+    ----------
+    max_bytes   : int
+                  Maximum estimated size of the cached values
+
+    Attributes
+    ----------
+    enabled     : boolean
+                  fetch only caches when True
+    hits        : int
+                  Number of requests served from the cache
+    misses      : int
+                  Number of requests that parsed the file
+    evictions   : int
+                  Number of entries dropped to respect max_bytes, or
+                  because their file changed
+    nbytes      : int
+                  Estimated size of the cached values
+
+    Examples
+    --------
+    >>> import pysal
+    >>> cache = IOCache(max_bytes=1024)
+    >>> cache.enabled = True
+    >>> path = pysal.examples.get_path('columbus.dbf')
+    >>> cache.fetch(path, ('a',), lambda: np.arange(100))[:3]
+    array([0, 1, 2])
+    >>> cache.fetch(path, ('b',), lambda: np.arange(100))[:3]
+    array([0, 1, 2])
+    >>> cache.hits, cache.misses, cache.evictions, cache.nbytes
+    (0, 2, 1, 800)
+
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.enabled = False
+        self._entries = OrderedDict()  # {key: (value, nbytes)}
+        self._stamps = {}  # {path: (mtime, size)}
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.nbytes = 0
+
+    def fetch(self, path, key, builder, share=None, depends=()):
+        """
+        Returns builder(), from the cache if it was already built for the
+        current version of the file at path (and of the files in depends)
+
+        Parameters
+        ----------
+        path    : string
+                  file the value is parsed from
+        key     : tuple
+                  hashable description of the value within the file
+        builder : callable
+                  parses the value
+        share   : callable
+                  returns the value handed to the caller from the cached
+                  value, defaults to share_value
+        depends : sequence of strings
+                  other files the value is parsed from
+        """
+        if share is None:
+            share = share_value
+        if not self.enabled:
+            return builder()
+        paths = [os.path.abspath(p) for p in [path] + list(depends)]
+        stamps = []
+        for p in paths:
+            try:
+                st = os.stat(p)
+            except OSError:
+                return builder()
+            stamps.append((st.st_mtime, st.st_size))
+        files = tuple(zip(paths, stamps))
+        key = (files,) + tuple(key)
+        with self._lock:
+            for p, stamp in files:
+                if self._stamps.get(p, stamp) != stamp:
+                    self._drop(lambda k: p in [f for f, s in k[0]])
+                self._stamps[p] = stamp
+            if key in self._entries:
+                entry = self._entries.pop(key)
+                self._entries[key] = entry
+                self.hits += 1
+                return share(entry[0])
+            self.misses += 1
+        value = freeze(builder())
+        nbytes = sizeof(value)
+        with self._lock:
+            if nbytes <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (value, nbytes)
+                self.nbytes += nbytes
+                while self.nbytes > self.max_bytes:
+                    self._evict(iter(self._entries).next())
+        return share(value)
+
+    def clear(self):
+        """Drops all the entries and resets the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._stamps.clear()
+            self.hits = self.misses = self.evictions = self.nbytes = 0
+
+    def stats(self):
+        """Returns a dictionary with the counters and size of the cache"""
+        with self._lock:
+            return {'enabled': self.enabled, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'nbytes': self.nbytes,
+                    'max_bytes': self.max_bytes}
+
+    def _drop(self, selector):
+        for key in [k for k in self._entries if selector(k)]:
+            self._evict(key)
+
+    def _evict(self, key):
+        value, nbytes = self._entries.pop(key)
+        self.nbytes -= nbytes
+        self.evictions += 1
+
+
+def freeze(value):
+    """
+    Makes the numpy arrays of value (an array, or a dictionary, list or
+    tuple of them) read-only
+    """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+        mask = np.ma.getmask(value)
+        if mask is not np.ma.nomask:
+            mask.flags.writeable = False
+    elif isinstance(value, dict):
+        for v in value.itervalues():
+            if isinstance(v, np.ndarray):
+                freeze(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value[:SAMPLE_SIZE]:
+            if isinstance(v, np.ndarray):
+                freeze(v)
+    return value
+
+
+def share_value(value):
+    """
+    Default share function of IOCache.fetch: copies lists and dictionaries
+    (not their items), returns anything else as is
+    """
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def share_weights(w):
+    """
+    Share function of IOCache.fetch for weights: returns a new W (or WSP)
+    with copies of the neighbors, original weights, id_order (and sparse
+    matrix) of w, so that transforming or mutating the copy leaves the
+    cached w untouched.
+    """
+    from pysal.weights import W, WSP
+    if isinstance(w, WSP):
+        return WSP(w.sparse.copy(), id_order=w.id_order and list(w.id_order))
+    id_order = list(w.id_order) if w._id_order_set else None
+    neighbors = dict((k, list(v)) for k, v in w.neighbors.iteritems())
+    weights = dict((k, list(v)) for k, v in
+                   w.transformations['O'].iteritems())
+    copy = W(neighbors, weights, id_order, silent_island_warning=True)
+    copy.silent_island_warning = w.silent_island_warning
+    for attr in ('_shpName', '_varName'):
+        if hasattr(w, attr):
+            setattr(copy, attr, getattr(w, attr))
+    return copy
+
+
+def sizeof(value):
+    """
+    Estimates the size in bytes of value. Large lists and dictionaries are
+    estimated from a sample of their items.
+    """
+    if isinstance(value, np.ndarray):
+        size = value.nbytes
+        mask = np.ma.getmask(value)
+        if mask is not np.ma.nomask:
+            size += mask.nbytes
+        return size
+    if sparse.issparse(value):
+        value = value.tocsr()
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if hasattr(value, 'sparse') and hasattr(value, 'id_order'):
+        if hasattr(value, 'neighbors'):
+            return sizeof(value.neighbors) + sizeof(value.transformations['O'])
+        return sizeof(value.sparse) + sizeof(value.id_order or [])
+    if isinstance(value, dict):
+        items = value.items()
+        return sys.getsizeof(value) + _sample_size(
+            items, lambda kv: sizeof(kv[0]) + sizeof(kv[1]))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + _sample_size(value, sizeof)
+    return sys.getsizeof(value)
+
+
+def _sample_size(items, size):
+    n = len(items)
+    if not n:
+        return 0
+    step = max(n // SAMPLE_SIZE, 1)
+    sample = items[::step]
+    return sum(size(item) for item in sample) * n // len(sample)
+
+
+cache = IOCache()
+
+
+def enable(max_bytes=None):
+    """
+    Enables the process level cache, optionally setting its maximum size
+    in bytes (256MB by default)
+    """
+    if max_bytes is not None:
+        cache.max_bytes = max_bytes
+    cache.enabled = True
+
+
+def disable():
+    """Disables the process level cache and drops its entries"""
+    cache.enabled = False
+    cache.clear()
+
+
+def clear():
+    """Drops the entries and resets the counters of the process level cache"""
+    cache.clear()
+
+
+def stats():
+    """
+    Returns the counters ('hits', 'misses', 'evictions'), number of entries
+    and estimated size ('nbytes', 'max_bytes') of the process level cache
+    """
+    return cache.stats()
@@ -1,5 +1,6 @@
 import pysal.core.Tables as Tables
 import csv
+import numpy as np
 
 __author__ = "Charles R Schmidt <schmidtc@gmail.com>"
 __all__ = ['csvWrapper']
@@ -12,6 +13,7 @@ class csvWrapper(Tables.DataTable):
     FORMATS = ['csv']
     READ_MODES = ['r','Ur','rU','U']
     MODES = READ_MODES[:]
+    SAMPLE_SIZE = 1000  # rows used to infer the header and column types
 
     def __init__(self, *args, **kwargs):
         """
@@ -40,16 +42,170 @@ class csvWrapper(Tables.DataTable):
     def _open(self):
         self.fileObj = open(self.dataPath, self.mode)
         if self.mode in self.READ_MODES:
-            self.dataObj = csv.reader(self.fileObj)
-            data = list(self.dataObj)
-            if self._determineHeader(data):
-                self.header = data.pop(0)
-            else:
-                self.header = ['field_%d' % i for i in range(len(data[0]))]
-            self._spec = self._determineSpec(data)
-            self.data = data
+            text = self.fileObj.read()
             self.fileObj.close()
-            self.__len = len(data)
+            if '"' in text:
+                # quoted fields may contain commas or newlines
+                self.dataObj = csv.reader(text.splitlines(True))
+                self._data = list(self.dataObj)
+                lines = None
+            else:
+                lines = [line for line in text.splitlines() if line]
+                self._data = None
+            self._lines = lines
+            sample = self._rows(0, self.SAMPLE_SIZE + 1)
+            if self._determineHeader(sample):
+                self.header = sample.pop(0)
+                self._skip = 1
+            else:
+                self.header = ['field_%d' % i for i in range(len(sample[0]))]
+                self._skip = 0
+            self._spec = self._determineSpec(sample)
+            self._inferred = self._spec[:]
+            if self._data is not None:
+                self._data = self._data[self._skip:]
+                self.__len = len(self._data)
+            else:
+                self.__len = len(lines) - self._skip
+
+    def _rows(self, start, stop):
+        """ Returns the rows start:stop of the file (header included) as
+        lists of strings """
+        if self._data is not None:
+            return [row[:] for row in self._data[start:stop]]
+        return [line.split(',') for line in self._lines[start:stop]]
+
+    @property
+    def data(self):
+        """ All the rows as lists of strings, split on first use """
+        if self._data is None:
+            self._data = self._rows(self._skip, None)
+            self._lines = None
+        return self._data
+
+    def _columns(self, keys):
+        """
+        Returns the raw values of the columns in keys as arrays of strings,
+        splitting each line only up to the last requested column
+        """
+        idx = [self.header.index(key) for key in keys]
+        if self._data is not None:
+            rows = self._data
+            return [np.array([row[j] for row in rows], dtype=str) for j in idx]
+        last = max(idx) + 1
+        rows = [line.split(',', last) for line in self._lines[self._skip:]]
+        return [np.array([row[j] for row in rows], dtype=str) for j in idx]
+
+    def _get_col(self, key):
+        """
+        Returns the column vector. Columns typed as int or float are
+        converted in bulk.
+        """
+        if key not in self.header:
+            raise AttributeError('Field: % s does not exist in header' % key)
+        typ = self._spec[self.header.index(key)] if self._spec else None
+        if typ is int or typ is float:
+            values = self._column_arrays([key])
+            if values is not None:
+                return values[0].tolist()
+        return Tables.DataTable._get_col(self, key)
+
+    def _column_arrays(self, keys):
+        """
+        Converts the columns in keys to int64/float64 arrays according to
+        the spec; returns None if a column is not numeric or if a value can
+        not be converted (which _cast handles value by value). Columns whose
+        type was inferred from the sample are widened when a later value
+        does not fit.
+        """
+        while 1:
+            types = [self._spec[self.header.index(key)] if self._spec
+                     else None for key in keys]
+            if not all(typ is int or typ is float for typ in types):
+                return None
+            arrays = []
+            for key, raw, typ in zip(keys, self._columns(keys), types):
+                try:
+                    arrays.append(raw.astype(np.int64 if typ is int
+                                             else np.float64))
+                except (ValueError, OverflowError):
+                    if not self._widen(self.header.index(key)):
+                        return None
+                    break
+            else:
+                return arrays
+
+    def _widen(self, j):
+        """
+        Infers the type of column j from all its values, after a value did
+        not fit the type inferred from the first SAMPLE_SIZE rows. Returns
+        False if the type is kept (it was set by cast or is still right).
+        """
+        if self._spec[j] is not self._inferred[j]:
+            return False
+        values = self._columns([self.header[j]])[0]
+        typ = self._determineSpec([[val] for val in values])[0]
+        if typ is self._spec[j]:
+            # e.g. values overflowing int64, they are cast one by one
+            self._inferred[j] = None
+            return False
+        self._spec[j] = self._inferred[j] = typ
+        return True
+
+    def _cast(self, row):
+        if self._spec and row:
+            try:
+                return [f(v) for f, v in zip(self._spec, row)]
+            except ValueError:
+                for j, (f, v) in enumerate(zip(self._spec, row)):
+                    if f is int or f is float:
+                        try:
+                            f(v)
+                        except ValueError:
+                            self._widen(j)
+        return Tables.DataTable._cast(self, row)
+
+    def by_col_array(self, variable_names):
+        """
+        Return columns of table as a numpy array, see
+        pysal.core.Tables.DataTable.by_col_array
+
+        Numeric columns are parsed directly into arrays without reading the
+        columns after the last one requested.
+
+        Examples
+        --------
+        >>> import pysal
+        >>> f = pysal.open(pysal.examples.get_path('usjoin.csv'), 'r')
+        >>> y = f.by_col_array(['1929', '2009'])
+        >>> y[:2]
+        array([[  323, 32274],
+               [  600, 32077]])
+        """
+        for key in variable_names:
+            if key not in self.header:
+                raise AttributeError('Field: % s does not exist in header' % key)
+        cols = self._column_arrays(variable_names)
+        if cols is None:
+            return Tables.DataTable.by_col_array(self, variable_names)
+        return np.column_stack(cols)
+
+    def iter_chunks(self, chunksize=10000, variable_names=None):
+        """
+        Iterates over the rows from the current position in blocks of at
+        most chunksize rows, see pysal.core.Tables.DataTable.iter_chunks
+
+        The CSV file is read into memory when it is opened, so unlike the
+        DBF and shapefile handlers the blocks do not bound the memory used.
+
+        Examples
+        --------
+        >>> import pysal
+        >>> f = pysal.open(pysal.examples.get_path('stl_hom.csv'), 'r')
+        >>> [len(c['NAME']) for c in f.iter_chunks(30, ['NAME'])]
+        [30, 30, 18]
+        """
+        return Tables.DataTable.iter_chunks(self, chunksize, variable_names)
 
     def _determineHeader(self, data):
         #head = [val.strip().replace('-','').replace('.','').isdigit() for val in data[0]]
@@ -1,6 +1,8 @@
 import pysal.core.FileIO as FileIO
+from pysal.core.IOCache import share_weights
 from pysal.weights import W, WSP
 from scipy import sparse
+from itertools import chain, imap, izip
 import numpy as np
 
 __author__ = 'Charles R Schmidt <schmidtc@gmail.com>'
@@ -30,7 +32,12 @@ class GalIO(FileIO.FileIO):
         """
         self._sparse = sparse
         self._complain_ifclosed(self.closed)
-        return self._read()
+        if self.pos > 0:
+            raise StopIteration
+        w = self._cached(('read', sparse, self.data_type), self._read,
+                         share_weights)
+        self.pos = 1
+        return w
 
     def seek(self, pos):
         if pos == 0:
@@ -81,67 +88,64 @@ class GalIO(FileIO.FileIO):
         >>> wsp.sparse.nnz
         462
 
+        Rows of the sparse matrix follow the order of the ids in the file
+
+        >>> wsp.id_order[:3] == w.id_order[:3]
+        True
+        >>> (wsp.sparse != w.sparse).nnz
+        0
+
         """
+        if self.pos > 0:
+            raise StopIteration
+        ids, neighbors = self._readrecords()
+        self.pos += 1
+        typ = self.data_type
         if self._sparse:
-            if self.pos > 0:
-                raise StopIteration
-
-            header = self.file.readline().strip().split()
-            header_n = len(header)
-            n = int(header[0])
-            if header_n > 1:
-                n = int(header[1])
-            ids = []
-            idsappend = ids.append
-            row = []
-            extend = row.extend    # avoid dot in loops
-            col = []
-            append = col.append
-            counter = 0
-            typ = self.data_type
-            for i in xrange(n):
-                id, n_neighbors = self.file.readline().strip().split()
-                id = typ(id)
-                n_neighbors = int(n_neighbors)
-                neighbors_i = map(typ, self.file.readline().strip().split())
-                nn = len(neighbors_i)
-                extend([id] * nn)
-                counter += nn
-                for id_neigh in neighbors_i:
-                    append(id_neigh)
-                idsappend(id)
-            self.pos += 1
-            row = np.array(row)
-            col = np.array(col)
-            data = np.ones(counter)
-            ids = np.unique(row)
-            row = np.array([np.where(ids == j)[0] for j in row]).flatten()
-            col = np.array([np.where(ids == j)[0] for j in col]).flatten()
-            spmat = sparse.csr_matrix((data, (row, col)), shape=(n, n))
-            return WSP(spmat)
-
-        else:
-            if self.pos > 0:
-                raise StopIteration
-            neighbors = {}
-            ids = []
-            # handle case where more than n is specified in first line
-            header = self.file.readline().strip().split()
-            header_n = len(header)
-            n = int(header[0])
-            if header_n > 1:
-                n = int(header[1])
-            w = {}
-            typ = self.data_type
-            for i in range(n):
-                id, n_neighbors = self.file.readline().strip().split()
-                id = typ(id)
-                n_neighbors = int(n_neighbors)
-                neighbors_i = map(typ, self.file.readline().strip().split())
-                neighbors[id] = neighbors_i
-                ids.append(id)
-            self.pos += 1
-            return W(neighbors, id_order=ids)
+            counts = np.fromiter(imap(len, neighbors), int, len(neighbors))
+            tokens = chain.from_iterable(neighbors)
+            index = dict(izip(ids, xrange(len(ids))))
+            try:
+                col = np.fromiter(imap(index.__getitem__, tokens), int,
+                                  counts.sum())
+            except KeyError:
+                # ids only match once cast, e.g. "01" and "1" as int
+                index = dict(izip(imap(typ, ids), xrange(len(ids))))
+                tokens = imap(typ, chain.from_iterable(neighbors))
+                try:
+                    col = np.fromiter(imap(index.__getitem__, tokens), int,
+                                      counts.sum())
+                except KeyError, e:
+                    raise ValueError("Neighbor %s is not an id of the GAL file" % e)
+            indptr = np.zeros(len(ids) + 1, int)
+            np.cumsum(counts, out=indptr[1:])
+            data = np.ones(len(col))
+            spmat = sparse.csr_matrix((data, col, indptr),
+                                      shape=(len(ids), len(ids)))
+            return WSP(spmat, id_order=map(typ, ids))
+        if typ is not str:
+            ids = map(typ, ids)
+            neighbors = [map(typ, neighbors_i) for neighbors_i in neighbors]
+        return W(dict(izip(ids, neighbors)), id_order=ids)
+
+    def _readrecords(self):
+        """
+        Reads the whole file at once and splits it into the ids, in file
+        order, and the list of neighbor tokens of each id. Tokens are not
+        cast to data_type.
+        """
+        lines = self.file.read().split('\n')
+        # handle case where more than n is specified in first line
+        header = lines[0].split()
+        n = int(header[0])
+        if len(header) > 1:
+            n = int(header[1])
+        if len(lines) < 2 * n + 1:
+            raise ValueError("Expected %d records in the GAL file, found %d" %
+                             (n, (len(lines) - 1) // 2))
+        ids = [record.split()[0] for record in lines[1:2 * n + 1:2]]
+        neighbors = [line.split() for line in lines[2:2 * n + 2:2]]
+        return ids, neighbors
 
     def write(self, obj):
         """
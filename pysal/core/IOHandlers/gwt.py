@@ -1,12 +1,20 @@
 import pysal
 import os.path
 import pysal.core.FileIO as FileIO
-from pysal.weights import W
+from pysal.core.IOCache import share_weights
+from pysal.weights import W, WSP
+from itertools import izip
+from scipy import sparse
 from warnings import warn
+import numpy as np
 
 __author__ = "Charles R Schmidt <schmidtc@gmail.com>"
 __all__ = ["GwtIO"]
 
+# attributes set by _read from the header of the file (and the DBF of the
+# ids), restored when the weights come from the IOCache
+HEADER_ATTRIBUTES = ('flag', 'n', 'shp', 'id_var', '_shpName', '_varName')
+
 
 class unique_filter(object):
     """
@@ -59,9 +67,37 @@ class GwtIO(FileIO.FileIO):
         return self._shpName
     shpName = property(fget=_get_shpName, fset=_set_shpName)
 
-    def read(self, n=-1):
+    def read(self, n=-1, sparse=False):
+        """
+
+        sparse: boolean
+               If true return a pysal WSP object, built without the
+               neighbor and weight dictionaries of W
+               If false return pysal w object
+        """
+        self._sparse = sparse
         self._complain_ifclosed(self.closed)
-        return self._read()
+        if self.pos > 0:
+            raise StopIteration
+        w, header = self._cached(('read', sparse), self._read_with_header,
+                                 self._share_read)
+        self.__dict__.update(header)
+        self.pos = 1
+        return w
+
+    def _read_with_header(self):
+        """
+        Returns the weights read by _read and the header attributes it set
+        on the handler, which are restored on cache hits
+        """
+        w = self._read()
+        header = dict((k, self.__dict__[k]) for k in HEADER_ATTRIBUTES
+                      if k in self.__dict__)
+        return w, header
+
+    def _share_read(self, value):
+        w, header = value
+        return share_weights(w), header
 
     def seek(self, pos):
         if pos == 0:
@@ -77,26 +113,63 @@ class GwtIO(FileIO.FileIO):
         So, for code reusability, this part is separated out from
         _read function by Myunghwa Hwang.
         """
-        data = [row.strip().split() for row in self.file.readlines()]
-        ids = filter(unique_filter(), [x[0] for x in data])
-        ids = map(id_type, ids)
-        WN = {}
-        for id in ids:  # note: fromkeys is no good here, all keys end up sharing the say dict value
-            WN[id] = {}
-        for i, j, v in data:
-            i = id_type(i)
-            j = id_type(j)
-            WN[i][j] = float(v)
+        ids, n, i, j, values = self._readarrays(id_type)
         weights = {}
         neighbors = {}
-        for i in WN:
-            weights[i] = WN[i].values()
-            neighbors[i] = WN[i].keys()
+        if n:
+            order = np.argsort(i, kind='mergesort')
+            bounds = np.cumsum(np.bincount(i, minlength=n))[:-1]
+            id_array = np.empty(len(ids), object)
+            id_array[:] = ids
+            neighbors = dict(izip(ids, [neighbors_i.tolist() for neighbors_i
+                                        in np.split(id_array[j[order]], bounds)]))
+            weights = dict(izip(ids, [weights_i.tolist() for weights_i
+                                      in np.split(values[order], bounds)]))
         if ret_ids:
-            return weights, neighbors, ids
+            return weights, neighbors, ids[:n]
         else:
             return weights, neighbors
 
+    def _readarrays(self, id_type):
+        """
+        Tokenizes the main body of gwt-like weights files in bulk.
+
+        Returns the list of distinct ids, cast to id_type, with the origins
+        first in order of appearance followed by ids that only appear as
+        destinations; the number of origins; and arrays with the origin and
+        destination positions in that list and the weight of each link. As
+        in the dictionaries of _readlines, the last of repeated links wins.
+        """
+        tokens = self.file.read().split()
+        if len(tokens) % 3:
+            raise ValueError("Expected origin, destination and weight on each line")
+        m = len(tokens) // 3
+        values = np.array(tokens[2::3], dtype=float)
+        labels, first, codes = np.unique(np.array(tokens[0::3] + tokens[1::3]),
+                                         return_index=True,
+                                         return_inverse=True)
+        order = np.argsort(first, kind='mergesort')
+        n = int((first < m).sum())
+        rank = np.empty(len(order), int)
+        rank[order] = np.arange(len(order))
+        i, j = rank[codes[:m]], rank[codes[m:]]
+        ids = map(id_type, labels[order].tolist())
+        position = {}
+        remap = np.array([position.setdefault(id, len(position)) for id in ids],
+                         int)
+        if len(position) < len(ids):
+            # distinct tokens with the same id once cast, e.g. "2" and "2.0"
+            n = len(set(remap[:n]))
+            i, j = remap[i], remap[j]
+            ids = sorted(position, key=position.get)
+        if m:
+            key = i * len(ids) + j
+            last = np.unique(key[::-1], return_index=True)[1]
+            if len(last) < m:
+                keep = np.sort(m - 1 - last)
+                i, j, values = i[keep], j[keep], values[keep]
+        return ids, n, i, j, values
+
     def _read(self):
         """Reads .gwt file
         Returns a pysal.weights.weights.W object
@@ -124,6 +197,15 @@ class GwtIO(FileIO.FileIO):
         >>> f[1]
         {2: 14.1421356}
 
+        Read the weights as a sparse matrix, without building the neighbor
+        and weight dictionaries
+
+        >>> wsp = pysal.open(pysal.examples.get_path('juvenile.gwt'),'r').read(sparse=True)
+        >>> wsp.n
+        168
+        >>> (wsp.sparse != f.sparse).nnz
+        0
+
 
         """
         if self.pos > 0:
@@ -152,6 +234,9 @@ class GwtIO(FileIO.FileIO):
         self.n = n
         self.shp = shp
         self.id_var = id_var
+        if getattr(self, '_sparse', False):
+            self.pos += 1
+            return self._read_sparse(id_type, id_order)
         if id_order is None:
             weights, neighbors, id_order = self._readlines(id_type, True)
         else:
@@ -166,6 +251,24 @@ class GwtIO(FileIO.FileIO):
         #warn("Weights have been converted to binary. To retrieve original values use w.transform='o'", RuntimeWarning)
         return w
 
+    def _read_sparse(self, id_type, id_order=None):
+        """
+        Builds a WSP directly from the arrays of _readarrays. Rows follow
+        id_order when given, otherwise the order of appearance of the ids.
+        """
+        ids, n, i, j, values = self._readarrays(id_type)
+        if id_order is not None:
+            position = dict(izip(id_order, xrange(len(id_order))))
+            try:
+                remap = np.array([position[id] for id in ids], int)
+            except KeyError:
+                warn("IDs in the GWT are missing from the DBF, proceeding with the order of the GWT.", RuntimeWarning)
+            else:
+                ids = list(id_order)
+                i, j = remap[i], remap[j]
+        spmat = sparse.csr_matrix((values, (i, j)), shape=(len(ids), len(ids)))
+        return WSP(spmat, id_order=ids)
+
     def _writelines(self, obj):
         """
         Writes  the main body of gwt-like weights files.
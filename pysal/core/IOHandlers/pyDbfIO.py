@@ -2,7 +2,9 @@ import pysal.core.Tables
 import datetime
 import struct
 import itertools
+import mmap
 from warnings import warn
+import numpy as np
 import pysal
 
 __author__ = "Charles R Schmidt <schmidtc@gmail.com>"
@@ -151,6 +153,153 @@ class DBF(pysal.core.Tables.DataTable):
         self.seek(prevPos)
         return col
 
+    def read_arrays(self, variable_names=None, structured=False):
+        """
+        Reads whole columns at once into typed numpy arrays
+
+        The file is memory-mapped and viewed as a fixed-width byte array of
+        records, and each requested column is converted in vectorized form:
+        'N' fields without decimals to int64, 'N' with decimals and 'F' to
+        float64, 'D' to datetime64[D], 'L' to bool and 'C' to strings.
+        Values that _get_col reports as missing are masked.
+
+        Parameters
+        ----------
+
+        variable_names  : list of strings
+                          Names of the fields to read (defaults to all)
+        structured      : boolean
+                          If True, returns a masked structured array with one
+                          field per variable instead of a dictionary
+
+        Returns
+        -------
+
+        implicit        : dict or masked structured array
+                          If structured is False, a dictionary of arrays keyed
+                          by field name. Columns with missing values are
+                          masked arrays.
+
+        Examples
+        --------
+
+        >>> import pysal
+        >>> dbf = pysal.open(pysal.examples.get_path('NAT.dbf'), 'r')
+        >>> cols = dbf.read_arrays(['STATE_NAME', 'HR80', 'FIPSNO'])
+        >>> cols['HR80'][:3]
+        array([  8.85582713,  17.20874204,   3.4507747 ])
+        >>> cols['FIPSNO'].dtype
+        dtype('int64')
+        >>> list(cols['STATE_NAME'][:2])
+        ['Minnesota', 'Washington']
+        >>> rec = dbf.read_arrays(['HR80', 'FIPSNO'], structured=True)
+        >>> rec.dtype.names
+        ('HR80', 'FIPSNO')
+        """
+        variable_names = self._check_columns(variable_names)
+        return self._cached(('read_arrays', tuple(variable_names), structured),
+                            lambda: self._read_arrays(variable_names,
+                                                      structured))
+
+    def _read_arrays(self, variable_names, structured):
+        """
+        Reads the columns of read_arrays from the file
+        """
+        n = self.n_records
+        columns = self._read_columns(0, n, variable_names)
+        self.seek(self.pos)
+        if structured:
+            dtype = [(key, values.dtype) for key, (values, missing) in
+                     itertools.izip(variable_names, columns)]
+            data = np.empty(n, dtype)
+            mask = np.zeros(n, [(key, bool) for key in variable_names])
+            for key, (values, missing) in itertools.izip(variable_names, columns):
+                data[key] = values
+                mask[key] = missing
+            return np.ma.array(data, mask=mask)
+        return _column_dict(variable_names, columns)
+
+    def iter_chunks(self, chunksize=10000, variable_names=None):
+        """
+        Iterates over the records from the current position in blocks of at
+        most chunksize records, see pysal.core.Tables.DataTable.iter_chunks.
+        Each block is decoded from the memory-mapped file as in read_arrays,
+        so memory use only depends on chunksize.
+
+        Examples
+        --------
+
+        >>> import pysal
+        >>> dbf = pysal.open(pysal.examples.get_path('NAT.dbf'), 'r')
+        >>> chunks = list(dbf.iter_chunks(1000, ['FIPSNO']))
+        >>> [len(c['FIPSNO']) for c in chunks]
+        [1000, 1000, 1000, 85]
+        >>> chunks[1]['FIPSNO'][0] == dbf.by_col('FIPSNO')[1000]
+        True
+        """
+        variable_names = self._check_columns(variable_names)
+        while self.pos < self.n_records:
+            start = self.pos
+            stop = min(start + chunksize, self.n_records)
+            columns = self._read_columns(start, stop, variable_names)
+            self.seek(stop)
+            yield _column_dict(variable_names, columns)
+
+    def _check_columns(self, variable_names):
+        self._complain_ifclosed(self.closed)
+        if self.mode != 'r':
+            raise IOError("Invalid operation, Cannot read from a file opened in 'w' mode.")
+        if variable_names is None:
+            variable_names = self.header
+        for key in variable_names:
+            if key not in self._col_index:
+                raise AttributeError('Field: % s does not exist in header' % key)
+        return variable_names
+
+    def _read_columns(self, start, stop, variable_names):
+        """
+        Returns a list of (values, missing) pairs of arrays with the
+        converted values of the records start:stop of each variable
+        """
+        n = stop - start
+        specs = [self.field_spec[self._col_index[key][0]]
+                 for key in variable_names]
+        if not n:
+            return [_convert_block(np.zeros((0, size), np.uint8), typ, deci)
+                    for typ, size, deci in specs]
+        mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            records = np.frombuffer(mm, np.uint8, n * self.record_size,
+                                    self.header_size + start * self.record_size)
+            records = records.reshape((n, self.record_size))
+            columns = []
+            for key, (typ, size, deci) in itertools.izip(variable_names, specs):
+                offset = self._col_index[key][1]
+                block = records[:, offset:offset + size].copy()
+                columns.append(_convert_block(block, typ, deci))
+            del records
+        finally:
+            mm.close()
+        return columns
+
+    def by_col_array(self, variable_names):
+        """
+        Return columns of table as a numpy array, see
+        pysal.core.Tables.DataTable.by_col_array
+
+        Numeric columns without missing values are read with read_arrays;
+        other combinations fall back to the generic implementation so that
+        the casting rules are unchanged.
+        """
+        specs = [self.field_spec[self._col_index[key][0]]
+                 for key in variable_names if key in self._col_index]
+        if len(specs) == len(variable_names) and \
+                all(typ in 'NF' for typ, size, deci in specs):
+            cols = self.read_arrays(variable_names)
+            if not any(np.ma.isMaskedArray(cols[key]) for key in variable_names):
+                return np.column_stack([cols[key] for key in variable_names])
+        return pysal.core.Tables.DataTable.by_col_array(self, variable_names)
+
     def read_record(self, i):
         self.seek(i)
         rec = list(struct.unpack(
@@ -212,10 +361,48 @@ class DBF(pysal.core.Tables.DataTable):
             raise IOError("Invalid operation, Cannot write to a file opened in 'r' mode.")
         if self.FIRST_WRITE:
             self._firstWrite(obj)
+        self.f.write(self._pack_record(obj))
+        self.numrec += 1
+        self.pos += len(obj)
+
+    def write_chunk(self, data):
+        """
+        Writes a block of records with a single write to the file, see
+        pysal.core.Tables.DataTable.write_chunk
+
+        Examples
+        --------
+
+        >>> import pysal, tempfile, os
+        >>> f = tempfile.NamedTemporaryFile(suffix='.dbf'); fname = f.name; f.close()
+        >>> db = pysal.open(pysal.examples.get_path('NAT.dbf'), 'r')
+        >>> out = pysal.open(fname, 'w')
+        >>> out.header = ['FIPSNO', 'HR80']
+        >>> out.field_spec = [db.field_spec[db.header.index(k)] for k in out.header]
+        >>> for chunk in db.iter_chunks(1000, out.header):
+        ...     out.write_chunk(chunk)
+        >>> out.close()
+        >>> pysal.open(fname).by_col('HR80') == db.by_col('HR80')
+        True
+        >>> os.remove(fname)
+        """
+        self._complain_ifclosed(self.closed)
+        if self.mode != 'w':
+            raise IOError("Invalid operation, Cannot write to a file opened in 'r' mode.")
+        rows = self._chunk_rows(data)
+        if not len(rows):
+            return
+        if self.FIRST_WRITE:
+            self._firstWrite(rows[0])
+        self.f.write(''.join([self._pack_record(row) for row in rows]))
+        self.numrec += len(rows)
+        self.pos += sum(len(row) for row in rows)
+
+    def _pack_record(self, obj):
+        """ Returns the bytes of one record (including the deletion flag) """
         if len(obj) != len(self.header):
             raise TypeError("Rows must contains %d fields" % len(self.header))
-        self.numrec += 1
-        self.f.write(' ')                        # deletion flag
+        record = [' ']                           # deletion flag
         for (typ, size, deci), value in itertools.izip(self.field_spec, obj):
             if value is None:
                 if typ == 'C':
@@ -239,8 +426,8 @@ class DBF(pysal.core.Tables.DataTable):
             except:
                 print value, len(value), size
                 raise
-            self.f.write(value)
-            self.pos += 1
+            record.append(value)
+        return ''.join(record)
 
     def flush(self):
         self._complain_ifclosed(self.closed)
@@ -287,6 +474,84 @@ class DBF(pysal.core.Tables.DataTable):
         if self.f.tell() != POS and not self.FIRST_WRITE:
             self.f.seek(POS)
 
+
+def _column_dict(variable_names, columns):
+    """
+    Dictionary of the arrays of each variable, masked if there are missing
+    values
+    """
+    result = {}
+    for key, (values, missing) in itertools.izip(variable_names, columns):
+        if missing.any():
+            values = np.ma.array(values, mask=missing)
+        result[key] = values
+    return result
+
+
+def _convert_block(block, typ, deci):
+    """
+    Converts a nxsize uint8 array with the raw values of a field into a pair
+    of arrays (values, missing) following the rules of DBF._get_col
+    """
+    n, size = block.shape
+    raw = block.view('S%d' % size).reshape(n) if size else np.zeros(n, 'S1')
+    if typ == 'C':
+        return np.char.rstrip(raw), np.zeros(n, bool)
+    block[block == 0] = 32     # NULs are treated as blanks
+    blank = (block == 32).all(axis=1)
+    if typ == 'L':
+        first = block[:, 0].view('S1') if size else np.zeros(n, 'S1')
+        true = np.in1d(first, list('YyTt'))
+        false = np.in1d(first, list('NnFf'))
+        return true, ~(true | false)
+    elif typ == 'D':
+        values = np.zeros(n, 'datetime64[D]')
+        missing = np.ones(n, bool)
+        if size >= 8:
+            ymd = block[:, :8]
+            ok = ((ymd >= 48) & (ymd <= 57)).all(axis=1)
+            iso = np.empty((ok.sum(), 10), np.uint8)
+            iso[:, [4, 7]] = ord('-')
+            iso[:, [0, 1, 2, 3, 5, 6, 8, 9]] = ymd[ok]
+            values[ok], missing[ok] = _parse(iso.view('S10').reshape(-1),
+                                             'datetime64[D]')
+        values[missing] = np.datetime64('NaT')
+        return values, missing
+    # 'N' and 'F'
+    if typ == 'N' and not deci and size <= 18:
+        dtype, fill = np.int64, 0
+    else:
+        dtype, fill = np.float64, np.nan
+    values = np.empty(n, dtype)
+    values[blank] = fill
+    values[~blank], missing = _parse(raw[~blank], dtype)
+    if typ == 'F':
+        # as in _get_col, non-blank 'F' values must be numbers
+        if missing.any():
+            raise ValueError("could not convert string to float")
+    full = blank.copy()
+    full[~blank] = missing
+    values[full] = fill
+    return values, full
+
+
+def _parse(raw, dtype):
+    """
+    Casts an array of strings to dtype, flagging the entries that can not
+    be converted (only these are parsed one by one)
+    """
+    try:
+        return raw.astype(dtype), np.zeros(len(raw), bool)
+    except ValueError:
+        values = np.empty(len(raw), dtype)
+        missing = np.zeros(len(raw), bool)
+        for i, value in enumerate(raw):
+            try:
+                values[i] = np.array(value).astype(dtype)
+            except ValueError:
+                missing[i] = True
+        return values, missing
+
 if __name__ == '__main__':
     import pysal
     file_name = pysal.examples.get_path("10740.dbf")
@@ -5,21 +5,28 @@ PySAL ShapeFile Reader and Writer based on pure python shapefile module.
 
 __author__ = "Charles R Schmidt <schmidtc@gmail.com>"
 __credits__ = "Copyright (c) 2009 Charles R. Schmidt"
-__all__ = ['PurePyShpWrapper']
+__all__ = ['PurePyShpWrapper', 'ShapeCollection']
 
 #import pysal
 import pysal.core.FileIO  # as FileIO
 from pysal.core.util import shp_file
 import pysal.cg as cg
 from warnings import warn
+import os
+import zipfile
+import numpy as np
 import unittest
 
+BBOX_INDEX_EXT = '.bbx'
+
 STRING_TO_TYPE = {'POLYGON': cg.Polygon, 'POINT': cg.Point, 'POINTM':
                   cg.Point, 'POINTZ': cg.Point, 'ARC': cg.Chain, 'POLYGONZ': cg.Polygon}
 TYPE_TO_STRING = {cg.Polygon: 'POLYGON', cg.Point: 'POINT', cg.Chain:
                   'ARC'}  # build the reverse map
 #for key,value in STRING_TO_TYPE.iteritems():
 #    TYPE_TO_STRING[value] = key
+SHAPE_TYPE_STRINGS = dict((code, name) for name, code in
+                          shp_file.SHAPE_TYPES.iteritems())
 
 
 class PurePyShpWrapper(pysal.core.FileIO.FileIO):
@@ -137,6 +144,108 @@ class PurePyShpWrapper(pysal.core.FileIO.FileIO):
         self.dataObj.add_shape(rec)
         self.pos += 1
 
+    def read_arrays(self):
+        """
+        Reads all the shapes at once into columnar numpy arrays instead of
+        PySAL shapes. See pysal.core.util.shp_file.read_arrays for the
+        contents of the returned dictionary.
+
+        Examples
+        --------
+
+        >>> import pysal
+        >>> shp = pysal.open(pysal.examples.get_path('10740.shp'))
+        >>> arrs = shp.read_arrays()
+        >>> arrs['BBOX'].shape
+        (195, 4)
+        >>> arrs['Vertex Offsets'][-1] == len(arrs['Vertices'])
+        True
+        """
+        self._complain_ifclosed(self.closed)
+        return self._cached(('read_arrays',), self.dataObj.read_arrays)
+
+    def write_chunk(self, data):
+        """
+        Writes a block of shapes. data can be a list of PySAL shapes or a
+        dictionary of columnar arrays as yielded by iter_chunks, which is
+        packed and written in bulk (see pysal.core.util.shp_file.add_arrays).
+
+        Examples
+        --------
+
+        >>> import tempfile, os
+        >>> f = tempfile.NamedTemporaryFile(suffix='.shp'); fname = f.name; f.close()
+        >>> import pysal
+        >>> i = pysal.open(pysal.examples.get_path('10740.shp'),'r')
+        >>> o = pysal.open(fname,'w')
+        >>> for chunk in i.iter_chunks(100):
+        ...     o.write_chunk(chunk)
+        >>> o.close()
+        >>> open(pysal.examples.get_path('10740.shp'),'rb').read() == open(fname,'rb').read()
+        True
+        >>> os.remove(fname); os.remove(fname.replace('.shp','.shx'))
+        """
+        if not isinstance(data, dict):
+            return pysal.core.FileIO.FileIO.write_chunk(self, data)
+        self._complain_ifclosed(self.closed)
+        shape_type = SHAPE_TYPE_STRINGS[data['Shape Type']]
+        if self.dataObj is None:
+            self.type = shape_type
+            self.dataObj = shp_file(self.dataPath, 'w', self.type)
+            self.write = self.__writer
+        elif shape_type != self.type:
+            raise TypeError("This file only supports %s type shapes" %
+                            self.type)
+        self.dataObj.add_arrays(data)
+        if 'Part Offsets' in data:
+            self.pos += len(data['Part Offsets']) - 1
+        else:
+            self.pos += len(data['Vertices'])
+
+    def iter_chunks(self, chunksize=10000):
+        """
+        Iterates over the shapes from the current position in blocks of at
+        most chunksize records. Each block is a dictionary of columnar numpy
+        arrays as returned by read_arrays, with offsets relative to the
+        block.
+
+        Examples
+        --------
+
+        >>> import pysal
+        >>> shp = pysal.open(pysal.examples.get_path('NAT.shp'))
+        >>> chunks = list(shp.iter_chunks(1000))
+        >>> [len(c['BBOX']) for c in chunks]
+        [1000, 1000, 1000, 85]
+        >>> sum(len(c['Vertices']) for c in chunks) == len(shp.read_arrays()['Vertices'])
+        True
+        """
+        self._complain_ifclosed(self.closed)
+        n = len(self)
+        while self.pos < n:
+            start = self.pos
+            stop = min(start + chunksize, n)
+            chunk = self.dataObj.read_arrays(start, stop)
+            self.seek(stop)
+            yield chunk
+
+    def collection(self):
+        """
+        Returns a ShapeCollection, a lazily loaded view of the shapes in
+        the file with a persisted bounding box index.
+
+        Examples
+        --------
+
+        >>> import pysal
+        >>> shp = pysal.open(pysal.examples.get_path('columbus.shp'))
+        >>> shapes = shp.collection()
+        >>> len(shapes)
+        49
+        """
+        self._complain_ifclosed(self.closed)
+        return ShapeCollection(self)
+
     def _read(self):
         try:
             rec = self.dataObj.get_shape(self.pos)
@@ -187,3 +296,147 @@ class PurePyShpWrapper(pysal.core.FileIO.FileIO):
         self.dataObj.close()
         pysal.core.FileIO.FileIO.close(self)
 
+
+class ShapeCollection(object):
+    """
+    Lazily loaded, random access collection of the shapes of a shapefile
+
+    Shapes are only read when they are requested and are kept once loaded.
+    The bounding boxes of all the records are stored in a sidecar file next
+    to the shapefile (same name with a '.bbx' extension), which is built
+    from the record headers the first time it is needed and reused while
+    the shapefile does not change. Bounding box queries are answered from
+    this index and only load the matching shapes.
+
+    Parameters
+    ----------
+
+    shpfile     : PurePyShpWrapper
+                  Shapefile opened in 'r' mode
+
+    Attributes
+    ----------
+
+    bboxes      : array
+                  nx4 array with the bounding box (left, lower, right,
+                  upper) of each shape
+
+    Examples
+    --------
+
+    >>> import os, shutil, tempfile, pysal
+    >>> d = tempfile.mkdtemp()
+    >>> for ext in ('shp', 'shx'):
+    ...     shutil.copy(pysal.examples.get_path('columbus.' + ext), d)
+    >>> shp = pysal.open(os.path.join(d, 'columbus.shp'))
+    >>> shapes = shp.collection()
+    >>> ids = shapes.query([8.0, 13.0, 8.5, 13.5])
+    >>> [int(i) for i in ids]
+    [6, 7, 11, 12]
+    >>> [s.id for s in shapes.intersects([8.0, 13.0, 8.5, 13.5])]
+    [7, 8, 12, 13]
+    >>> shapes[0].id
+    1
+    >>> os.path.exists(shapes.index_path)
+    True
+    >>> shp.close()
+    >>> shutil.rmtree(d)
+    """
+
+    def __init__(self, shpfile):
+        self.shpfile = shpfile
+        self.index_path = os.path.splitext(shpfile.dataPath)[0] + \
+            BBOX_INDEX_EXT
+        self._shapes = {}
+        self._bboxes = None
+
+    def __len__(self):
+        return len(self.shpfile)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('shape index out of range')
+        if i not in self._shapes:
+            self._shapes[i] = self.shpfile.get(i)
+        return self._shapes[i]
+
+    @property
+    def bboxes(self):
+        if self._bboxes is None:
+            self._bboxes = self._load_index()
+            if self._bboxes is None:
+                self._bboxes = self.shpfile.dataObj.read_bboxes()
+                self._save_index(self._bboxes)
+        return self._bboxes
+
+    def _stamp(self):
+        st = os.stat(self.shpfile.dataObj.fileName + '.shp')
+        return np.array([st.st_size, st.st_mtime], float)
+
+    def _load_index(self):
+        """
+        Returns the bounding boxes stored in the sidecar file, or None if it
+        does not exist or is out of date
+        """
+        try:
+            f = open(self.index_path, 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                data = np.load(f)
+                stamp, bboxes = data['stamp'], data['bboxes']
+            except (IOError, ValueError, KeyError, zipfile.BadZipfile):
+                return None
+        finally:
+            f.close()
+        if np.all(stamp == self._stamp()) and bboxes.shape == (len(self), 4):
+            return bboxes
+        return None
+
+    def _save_index(self, bboxes):
+        """
+        Writes the sidecar file. The index is only kept in memory if the
+        location is not writable.
+        """
+        try:
+            f = open(self.index_path, 'wb')
+        except IOError:
+            return
+        try:
+            np.savez(f, stamp=self._stamp(), bboxes=bboxes)
+        finally:
+            f.close()
+
+    def query(self, bbox):
+        """
+        Returns the offsets of the shapes whose bounding box intersects bbox
+
+        Parameters
+        ----------
+
+        bbox        : list or Rectangle
+                      [left, lower, right, upper] of the query region, or an
+                      object with left, lower, right and upper attributes
+        """
+        if hasattr(bbox, 'left'):
+            bbox = [bbox.left, bbox.lower, bbox.right, bbox.upper]
+        left, lower, right, upper = bbox
+        b = self.bboxes
+        hits = (b[:, 0] <= right) & (b[:, 2] >= left) & \
+               (b[:, 1] <= upper) & (b[:, 3] >= lower)
+        return np.flatnonzero(hits)
+
+    def intersects(self, bbox):
+        """
+        Returns the shapes whose bounding box intersects bbox, loading only
+        those shapes. See query.
+        """
+        return [self[i] for i in self.query(bbox)]
@@ -57,5 +57,69 @@ class test_csvWrapper(unittest.TestCase):
         self.assertEquals(chunk[3], ['Maries', 'Missouri'])
         self.assertEquals(chunk[4], ['White', 'Illinois'])
 
+    def test_by_col_array(self):
+        y = self.obj.by_col_array(['HR7984', 'PO7984'])
+        self.assertEquals(y.shape, (78, 2))
+        self.assertEquals(list(y[:, 0]), self.obj.by_col('HR7984'))
+        self.assertEquals(list(y[:, 1]), self.obj.by_col('PO7984'))
+
+    def test_sample_spec(self):
+        f = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        fname = f.name
+        f.write('id,x,name\n')
+        for i in range(20):
+            f.write('%d,%d.5,n%d\n' % (i, i, i))
+        f.write('x,y,z\n')
+        f.close()
+        csvWrapper = pysal.core.IOHandlers.csvWrapper.csvWrapper
+        sample_size = csvWrapper.SAMPLE_SIZE
+        csvWrapper.SAMPLE_SIZE = 10
+        try:
+            db = pysal.open(fname, 'r')
+        finally:
+            csvWrapper.SAMPLE_SIZE = sample_size
+        self.assertEquals(db._spec, [int, float, str])
+        self.assertEquals(len(db), 21)
+        # the types are widened when the values of the last row are cast
+        self.assertEquals(db.by_col_array(['id'])[-1, 0], 'x')
+        self.assertEquals(db._spec, [str, str, str])
+        db.seek(20)
+        self.assertEquals(db.read()[-1], ['x', 'y', 'z'])
+        self.assertEquals(db.by_col('x')[-2:], ['19.5', 'y'])
+        db.close()
+        os.remove(fname)
+
+    def test_widen(self):
+        f = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        fname = f.name
+        f.write('id,x\n')
+        for i in range(1100):
+            f.write('%d,%s\n' % (i, '2.5' if i == 1048 else i))
+        f.close()
+        db = pysal.open(fname, 'r')
+        self.assertEquals(db._spec, [int, int])
+        x = db.by_col('x')
+        self.assertEquals(x[1048], 2.5)
+        self.assertEquals(x[1047], 1047)
+        self.assertEquals(db._spec, [int, float])
+        db.close()
+        db = pysal.open(fname, 'r')
+        y = db.by_col_array(['id', 'x'])
+        self.assertEquals(y[1048].tolist(), [1048, 2.5])
+        db.close()
+        db = pysal.open(fname, 'r')
+        self.assertEquals(db.read()[1048], [1048, 2.5])
+        db.close()
+        os.remove(fname)
+
+    def test_iter_chunks(self):
+        self.obj.seek(0)
+        chunks = list(self.obj.iter_chunks(30, ['NAME', 'HR7984']))
+        self.assertEquals([len(c['NAME']) for c in chunks], [30, 30, 18])
+        self.assertEquals(self.obj.tell(), 78)
+        hr = sum([list(c['HR7984']) for c in chunks], [])
+        self.assertEquals(hr, self.obj.by_col('HR7984'))
+        self.assertEquals(chunks[2]['NAME'][0], self.obj.by_col('NAME')[60])
+
 if __name__ == '__main__':
     unittest.main()
@@ -27,6 +27,20 @@ class test_GalIO(unittest.TestCase):
         self.assertEqual(w.s0, 462.0)
         self.assertEqual(w.s1, 924.0)
 
+    def test_read_sparse(self):
+        w = self.obj.read()
+        self.obj.seek(0)
+        wsp = self.obj.read(sparse=True)
+        self.assertEqual(wsp.n, 100)
+        self.assertEqual(wsp.id_order, w.id_order)
+        self.assertEqual((wsp.sparse != w.sparse).nnz, 0)
+
+    def test_data_type(self):
+        self.obj.data_type = int
+        w = self.obj.read()
+        self.assertEqual(w.id_order[:2], [37009, 37005])
+        self.assertEqual(sorted(w[37009]), [37005, 37189, 37193])
+
     def test_seek(self):
         self.test_read()
         self.failUnlessRaises(StopIteration, self.obj.read)
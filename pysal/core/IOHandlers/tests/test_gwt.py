@@ -23,6 +23,34 @@ class test_GwtIO(unittest.TestCase):
         w.transform = 'B'
         self.assertEqual([1.0], w[1].values())
 
+    def test_read_sparse(self):
+        w = self.obj.read()
+        self.obj.seek(0)
+        wsp = self.obj.read(sparse=True)
+        self.assertEqual(wsp.n, 168)
+        self.assertEqual(wsp.id_order, w.id_order)
+        self.assertEqual((wsp.sparse != w.sparse).nnz, 0)
+
+    def test_read_repeated_links(self):
+        f = tempfile.NamedTemporaryFile(
+            suffix='.gwt', dir=pysal.examples.get_path(''))
+        fname = f.name
+        f.close()
+        o = open(fname, 'w')
+        o.write('0 3 Unknown Unknown\nb a 1.5\na b 2\nb a 0.5\nc a 1\n')
+        o.close()
+        with warnings.catch_warnings(record=True) as warn:
+            warnings.simplefilter("always")
+            w = pysal.open(fname, 'r').read()
+            wsp = pysal.open(fname, 'r').read(sparse=True)
+        self.assertEqual(w.id_order, ['b', 'a', 'c'])
+        self.assertEqual(w['b'], {'a': 0.5})
+        self.assertEqual(w['c'], {'a': 1.0})
+        self.assertEqual(wsp.id_order, ['b', 'a', 'c'])
+        self.assertEqual(wsp.sparse.toarray().tolist(),
+                         [[0, 0.5, 0], [2, 0, 0], [0, 1, 0]])
+        os.remove(fname)
+
     def test_seek(self):
         self.test_read()
         self.failUnlessRaises(StopIteration, self.obj.read)
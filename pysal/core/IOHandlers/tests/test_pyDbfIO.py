@@ -111,5 +111,65 @@ class test_DBF(unittest.TestCase):
 
         os.remove(fname)
 
+    def test_read_arrays(self):
+        import datetime
+        import numpy as np
+        f = tempfile.NamedTemporaryFile(suffix='.dbf')
+        fname = f.name
+        f.close()
+        db = pysal.core.IOHandlers.pyDbfIO.DBF(fname, 'w')
+        db.header = ["recID", "date", "strID", "aFloat", "flag"]
+        db.field_spec = [('N', 10, 0), ('D', 8, 0), ('C', 10, 0),
+                         ('N', 8, 3), ('L', 1, 0)]
+        records = [[1, datetime.date(2001, 2, 3), 'a', 0.5, 'T'],
+                   [None, None, '', None, None],
+                   [3, datetime.date(1999, 12, 31), 'ccc', -2.25, 'F']]
+        for rec in records:
+            db.write(rec)
+        db.close()
+        db = pysal.core.IOHandlers.pyDbfIO.DBF(fname, 'r')
+        cols = db.read_arrays()
+        self.assertEquals(cols['recID'].dtype, np.int64)
+        self.assertEquals(list(cols['recID'].mask), [False, True, False])
+        self.assertEquals(cols['recID'][2], 3)
+        self.assertEquals(cols['aFloat'][2], -2.25)
+        self.assertEquals(cols['date'][0], np.datetime64('2001-02-03'))
+        self.assertTrue(cols['date'].mask[1])
+        self.assertEquals(list(cols['strID']), ['a', '', 'ccc'])
+        self.assertEquals(list(cols['flag'].mask), [False, True, False])
+        self.assertEquals(list(cols['flag'].data[[0, 2]]), [True, False])
+        rec = db.read_arrays(['aFloat', 'recID'], structured=True)
+        self.assertEquals(rec.dtype.names, ('aFloat', 'recID'))
+        self.assertEquals(list(rec.mask['recID']), [False, True, False])
+        db.close()
+        os.remove(fname)
+
+    def test_chunks(self):
+        f = tempfile.NamedTemporaryFile(suffix='.dbf')
+        fname = f.name
+        f.close()
+        self.dbObj.seek(0)
+        rows = self.dbObj.read()
+        out = pysal.core.IOHandlers.pyDbfIO.DBF(fname, 'w')
+        out.header = self.dbObj.header
+        out.field_spec = self.dbObj.field_spec
+        self.dbObj.seek(0)
+        for chunk in self.dbObj.iter_chunks(50):
+            self.assertTrue(len(chunk['GIST_ID']) <= 50)
+            out.write_chunk(chunk)
+        out.write_chunk([[None, None, None, None, None]])
+        out.close()
+        copy = pysal.core.IOHandlers.pyDbfIO.DBF(fname, 'r')
+        self.assertEquals(copy.read(), rows + [[None, '', '', '', '']])
+        copy.close()
+        os.remove(fname)
+
+    def test_by_col_array(self):
+        db = pysal.open(pysal.examples.get_path('NAT.dbf'), 'r')
+        hr = db.by_col_array(['HR80', 'FIPSNO'])
+        self.assertEquals(hr.shape, (3085, 2))
+        self.assertEquals(list(hr[:, 1]), db.by_col('FIPSNO'))
+        self.assertEquals(list(hr[:, 0]), db.by_col('HR80'))
+
 if __name__ == '__main__':
     unittest.main()
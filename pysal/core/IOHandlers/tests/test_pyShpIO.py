@@ -81,5 +81,44 @@ class test_PurePyShpWrapper(unittest.TestCase):
         os.remove(self.shpcopy)
         os.remove(self.shxcopy)
 
+    def test_collection(self):
+        import shutil
+        for ext in ('.shp', '.shx'):
+            shutil.copyfile(self.test_file.replace('.shp', ext),
+                            self.shpcopy.replace('.shp', ext))
+        shp = pysal.open(self.shpcopy)
+        shapes = shp.collection()
+        self.assertFalse(os.path.exists(shapes.index_path))
+        query = shapes[57].bounding_box
+        ids = shapes.query(query)
+        self.assertTrue(57 in ids)
+        self.assertTrue(os.path.exists(shapes.index_path))
+        self.shpObj.seek(0)
+        expected = [i for i, s in enumerate(self.shpObj)
+                    if s.bounding_box.left <= query.right and
+                    s.bounding_box.right >= query.left and
+                    s.bounding_box.lower <= query.upper and
+                    s.bounding_box.upper >= query.lower]
+        self.assertEquals(list(ids), expected)
+        found = shapes.intersects(query)
+        self.assertEquals([s.id - 1 for s in found], expected)
+        self.assertEquals(found[0].vertices,
+                          self.shpObj.get(expected[0]).vertices)
+        # the sidecar index is reused
+        shapes2 = pysal.open(self.shpcopy).collection()
+        self.assertTrue(shapes2._load_index() is not None)
+        self.assertEquals(list(shapes2.query(query)), expected)
+        # a truncated sidecar is rebuilt
+        f = open(shapes.index_path, 'r+b')
+        f.truncate(100)
+        f.close()
+        shapes3 = pysal.open(self.shpcopy).collection()
+        self.assertTrue(shapes3._load_index() is None)
+        self.assertEquals(list(shapes3.query(query)), expected)
+        self.assertTrue(shapes3._load_index() is not None)
+        shp.close()
+        for ext in ('.shp', '.shx', '.bbx'):
+            os.remove(self.shpcopy.replace('.shp', ext))
+
 if __name__ == '__main__':
     unittest.main()
@@ -26,6 +26,18 @@ class test_WKTReader(unittest.TestCase):
         self.assertEqual((-91.195784694307383, 39.990883050220845),
                          polys[1].centroid)
 
+    def test_read_arrays(self):
+        arrs = self.obj.read_arrays()
+        polys = self.obj.read()
+        self.assertEqual(arrs['Shape Type'], 5)
+        self.assertEqual(len(arrs['Part Offsets']) - 1, len(polys))
+        self.assertEqual(len(arrs['Vertices']),
+                         sum(len(poly.vertices) for poly in polys))
+        for i, poly in enumerate(polys):
+            bbox = poly.bounding_box
+            self.assertEqual(arrs['BBOX'][i].tolist(),
+                             [bbox.left, bbox.lower, bbox.right, bbox.upper])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,5 @@
 import pysal.core.FileIO as FileIO
-from pysal.core.util import WKTParser
+from pysal.core.util import WKTParser, wkt_arrays
 from pysal import cg
 import re
 
@@ -76,6 +76,33 @@ class WKTReader(FileIO.FileIO):
             self.seek(0)
             return None
 
+    def read_arrays(self):
+        """
+        Returns all the geometries of the file as a dictionary of columnar
+        arrays in the format of pysal.core.util.shp_file.read_arrays,
+        without building PySAL shapes. See pysal.core.util.wkt_arrays.
+
+        Examples
+        --------
+        >>> import pysal
+        >>> f = pysal.open(pysal.examples.get_path('stl_hom.wkt'), 'r')
+        >>> arrs = f.read_arrays()
+        >>> len(arrs['Part Offsets']) - 1
+        78
+        >>> bbox = f.read()[1].bounding_box
+        >>> list(arrs['BBOX'][1]) == [bbox.left, bbox.lower, bbox.right, bbox.upper]
+        True
+        """
+        FileIO.FileIO._complain_ifclosed(self.closed)
+        return self._cached(('read_arrays',), self._read_arrays)
+
+    def _read_arrays(self):
+        pos = self.dataObj.tell()
+        self.dataObj.seek(0)
+        lines = self.dataObj.read().splitlines()
+        self.dataObj.seek(pos)
+        return wkt_arrays([line for line in lines if line.strip()])
+
     def seek(self, n):
         FileIO.FileIO.seek(self, n)
         pos = self.pos
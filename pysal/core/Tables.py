@@ -16,13 +16,13 @@ class DataTable(FileIO.FileIO):
             return "keys: " + self.p.header.__repr__()
 
         def __getitem__(self, key):
-            return self.p._get_col(key)
+            return self.p._cached(('by_col', key, tuple(self.p._spec)),
+                                  lambda: self.p._get_col(key))
 
         def __setitem__(self, key, val):
             self.p.cast(key, val)
 
-        def __call__(self, key):
-            return self.p._get_col(key)
+        __call__ = __getitem__
 
     def __init__(self, *args, **kwargs):
         FileIO.FileIO.__init__(self, *args, **kwargs)
@@ -109,9 +109,73 @@ class DataTable(FileIO.FileIO):
 
 
         """
-        lst = [self._get_col(variable) for variable in variable_names]
+        lst = [self.by_col(variable) for variable in variable_names]
         return np.array(lst).T
 
+    def iter_chunks(self, chunksize=10000, variable_names=None):
+        """
+        Iterates over the rows from the current position in blocks of at
+        most chunksize rows
+
+        Parameters
+        ----------
+
+        chunksize       : int
+                          Maximum number of rows in each block
+        variable_names  : list of strings
+                          Columns to return (defaults to the header)
+
+        Returns
+        -------
+        implicit        : generator
+                          Yields one dictionary per block, mapping each
+                          variable name to a numpy array with its values in
+                          the rows of the block
+
+        Examples
+        --------
+
+        >>> import pysal as ps
+        >>> dbf = ps.open(ps.examples.get_path('NAT.dbf'))
+        >>> sizes = [len(c['HR80']) for c in dbf.iter_chunks(1000, ['HR80'])]
+        >>> sizes
+        [1000, 1000, 1000, 85]
+        """
+        self._complain_ifclosed(self.closed)
+        if variable_names is None:
+            variable_names = self.header
+        idx = [self.header.index(name) for name in variable_names]
+        while 1:
+            rows = self.read(chunksize)
+            if not rows:
+                break
+            yield dict((name, np.array([row[i] for row in rows]))
+                       for name, i in zip(variable_names, idx))
+
+    def write_chunk(self, data):
+        """
+        Writes a block of rows
+
+        Parameters
+        ----------
+
+        data            : dict, array or list
+                          Dictionary of columns keyed by the names in the
+                          header (as yielded by iter_chunks), nxk array or
+                          list of rows
+        """
+        self._complain_ifclosed(self.closed)
+        FileIO.FileIO.write_chunk(self, self._chunk_rows(data))
+
+    def _chunk_rows(self, data):
+        """ Converts the block passed to write_chunk into a list of rows """
+        if isinstance(data, dict):
+            cols = [np.ma.asarray(data[name]).tolist() for name in self.header]
+            return zip(*cols)
+        if isinstance(data, np.ndarray):
+            return data.tolist()
+        return data
+
     def __getitem__(self, key):
         """ DataTables fully support slicing in 2D,
             To provide slicing,  handlers must provide __len__
@@ -0,0 +1,119 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pysal
+from pysal.core import IOCache
+
+
+class test_IOCache(unittest.TestCase):
+    def setUp(self):
+        IOCache.enable()
+
+    def tearDown(self):
+        IOCache.disable()
+
+    def test_by_col(self):
+        path = pysal.examples.get_path('columbus.dbf')
+        hoval = pysal.open(path).by_col('HOVAL')
+        hoval.append(0)
+        self.assertEqual(pysal.open(path).by_col['HOVAL'], hoval[:-1])
+        stats = IOCache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        pysal.open(path).by_col('CRIME')
+        self.assertEqual(IOCache.stats()['misses'], 2)
+
+    def test_read_arrays(self):
+        path = pysal.examples.get_path('columbus.shp')
+        arrs = pysal.open(path).read_arrays()
+        self.failUnlessRaises(ValueError, arrs['Vertices'].__setitem__, 0, 1)
+        again = pysal.open(path).read_arrays()
+        self.assert_(again['Vertices'] is arrs['Vertices'])
+        self.assertEqual(IOCache.stats()['hits'], 1)
+
+    def test_weights(self):
+        path = pysal.examples.get_path('columbus.shp')
+        w = pysal.queen_from_shapefile(path)
+        w.transform = 'r'
+        w2 = pysal.queen_from_shapefile(path)
+        self.assertEqual(w2.transform, 'O')
+        self.assertEqual(w2.weights[0], [1.0, 1.0])
+        self.assertEqual(w2.neighbors, w.neighbors)
+        w2.neighbors[0].append(99)
+        w3 = pysal.queen_from_shapefile(path)
+        self.assertEqual(w3.neighbors[0], [1, 2])
+        f = pysal.open(pysal.examples.get_path('sids2.gal'))
+        self.assertEqual(f.read().n, 100)
+        self.failUnlessRaises(StopIteration, f.read)
+        f.seek(0)
+        self.assertEqual(f.read().n, 100)
+        self.assertEqual(IOCache.stats()['hits'], 3)
+
+    def test_gwt_header(self):
+        path = pysal.examples.get_path('juvenile.gwt')
+        for i in range(2):
+            f = pysal.open(path)
+            w = f.read()
+            self.assertEqual((f.n, f.shp, f.id_var, f.shpName),
+                             ('168', 'juvenile', 'ID', 'juvenile'))
+        self.assertEqual(IOCache.stats()['hits'], 1)
+
+    def test_modified_file(self):
+        d = tempfile.mkdtemp()
+        path = os.path.join(d, 'stl.gal')
+        shutil.copy(pysal.examples.get_path('stl.gal'), path)
+        self.assertEqual(pysal.open(path).read().n, 78)
+        o = open(path, 'w')
+        o.write('2\n1 1\n2\n2 1\n1\n')
+        o.close()
+        os.utime(path, (0, 0))
+        self.assertEqual(pysal.open(path).read().n, 2)
+        stats = IOCache.stats()
+        self.assertEqual((stats['misses'], stats['entries'],
+                          stats['evictions']), (2, 1, 1))
+        shutil.rmtree(d)
+
+    def test_modified_dbf(self):
+        d = tempfile.mkdtemp()
+        for ext in ('shp', 'shx', 'dbf'):
+            shutil.copy(pysal.examples.get_path('columbus.' + ext), d)
+        path = os.path.join(d, 'columbus.shp')
+        w = pysal.queen_from_shapefile(path, 'POLYID')
+        self.assertEqual(w.id_order[:2], [1, 2])
+        pysal.queen_from_shapefile(path, 'POLYID')
+        self.assertEqual(IOCache.stats()['hits'], 1)
+        # renumber the ids in the dbf, the shapefile is unchanged
+        db = pysal.open(os.path.join(d, 'columbus.dbf'))
+        header, spec, rows = db.header, db.field_spec, db.read()
+        db.close()
+        col = header.index('POLYID')
+        db = pysal.open(os.path.join(d, 'columbus.dbf'), 'w')
+        db.header, db.field_spec = header, spec
+        for row in rows:
+            row[col] += 100
+            db.write(row)
+        db.close()
+        os.utime(os.path.join(d, 'columbus.dbf'), (0, 0))
+        w = pysal.queen_from_shapefile(path, 'POLYID')
+        self.assertEqual(w.id_order[:2], [101, 102])
+        self.assertEqual(IOCache.stats()['hits'], 1)
+        shutil.rmtree(d)
+
+    def test_eviction(self):
+        cache = IOCache.IOCache(max_bytes=2000)
+        cache.enabled = True
+        path = pysal.examples.get_path('columbus.dbf')
+        for key in ['a', 'b', 'a', 'c', 'a', 'b']:
+            cache.fetch(path, (key,), lambda: np.zeros(100))
+        # 'a' is the most recently used when 'c' is added, 'b' is evicted
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (2, 4, 2))
+        self.assertEqual(cache.nbytes, 1600)
+        cache.enabled = False
+        self.assertEqual(cache.fetch(path, ('d',), lambda: 1), 1)
+        self.assertEqual(cache.misses, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
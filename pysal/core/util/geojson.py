@@ -0,0 +1,113 @@
+"""
+Bulk parsing of GeoJSON geometries into columnar arrays
+"""
+import json
+from itertools import chain
+import numpy as np
+from wkt import _geometry_arrays
+
+__all__ = ['geojson_arrays']
+
+# shapefile shape type of each GeoJSON geometry type and the nesting depth
+# of its parts in 'coordinates' (0 for a single position)
+GEOJSON_SHAPE_TYPES = {'Point': (1, 0), 'MultiPoint': (8, 1),
+                       'LineString': (3, 1), 'MultiLineString': (3, 2),
+                       'Polygon': (5, 2), 'MultiPolygon': (5, 3)}
+
+
+def geojson_arrays(source):
+    """
+    Parses the geometries of a GeoJSON FeatureCollection into columnar arrays
+
+    The parts of all the geometries are gathered first and their positions
+    are converted to a numpy array in a single call, instead of building a
+    PySAL shape per feature.
+
+    Parameters
+    ----------
+    source  : string, file or dict
+              path or open file of a GeoJSON document, or the decoded
+              document: a FeatureCollection, a Feature or a geometry. The
+              geometries must be of a single kind: points, lines or polygons
+
+    Returns
+    -------
+    arrays  : dict
+              the geometries in the format of shp_file.read_arrays, one
+              record per feature. Parts are rings for polygons, lines for
+              lines and the points of a record for multipoints; vertices
+              keep the order of the GeoJSON. Features with a null geometry
+              or no coordinates are null records. The third and fourth
+              values of a position, if present, are stored as 'Z' and 'M'
+              with a Z shape type. shp_file.add_arrays does not write
+              multipoints.
+
+    Examples
+    --------
+    >>> import pysal
+    >>> arrs = geojson_arrays(pysal.examples.get_path('columbus.json'))
+    >>> shp = pysal.open(pysal.examples.get_path('columbus.shp'))
+    >>> len(arrs['Part Offsets']) - 1 == len(shp)
+    True
+    >>> bbox = shp.get(0).bounding_box
+    >>> np.allclose(arrs['BBOX'][0], [bbox.left, bbox.lower, bbox.right, bbox.upper])
+    True
+    >>> geojson_arrays({'type': 'MultiPoint', 'coordinates': [[1, 2], [3, 4]]})['Vertices']
+    array([[ 1.,  2.],
+           [ 3.,  4.]])
+    """
+    if isinstance(source, basestring):
+        f = open(source, 'r')
+        try:
+            source = json.load(f)
+        finally:
+            f.close()
+    elif hasattr(source, 'read'):
+        source = json.load(source)
+    if source.get('type') == 'FeatureCollection':
+        geometries = [feature.get('geometry') for feature in source['features']]
+    elif source.get('type') == 'Feature':
+        geometries = [source.get('geometry')]
+    else:
+        geometries = [source]
+    types, numParts, parts = [], [], []
+    for geometry in geometries:
+        if geometry is None:
+            types.append(0)
+            numParts.append(0)
+            continue
+        geoType = geometry.get('type')
+        try:
+            shapeType, depth = GEOJSON_SHAPE_TYPES[geoType]
+        except KeyError:
+            raise NotImplementedError("Unsupported GeoJSON Type: %s" % geoType)
+        coords = geometry.get('coordinates') or []
+        if depth == 0:
+            geoParts = [[coords]] if coords else []
+        elif depth == 1:
+            geoParts = [coords] if coords else []
+        elif depth == 2:
+            geoParts = [part for part in coords if part]
+        else:
+            geoParts = [part for part in chain.from_iterable(coords) if part]
+        types.append(shapeType if geoParts else 0)
+        numParts.append(len(geoParts))
+        parts.extend(geoParts)
+    numPoints = map(len, parts)
+    positions = list(chain.from_iterable(parts))
+    try:
+        coords = np.array(positions, float).reshape((len(positions), -1))
+    except ValueError:
+        if not positions:
+            coords = np.empty((0, 2), float)
+        else:
+            # positions with different dimensions
+            dim = max(map(len, positions))
+            coords = np.array([list(p) + [np.nan] * (dim - len(p))
+                               for p in positions], float)
+    if coords.shape[1] < 2 or coords.shape[1] > 4:
+        raise ValueError("Positions with 2 to 4 values expected")
+    xyzm = np.empty((len(positions), 4), float)
+    xyzm.fill(np.nan)
+    xyzm[:, :coords.shape[1]] = coords
+    return _geometry_arrays(types, numParts, numPoints, xyzm)
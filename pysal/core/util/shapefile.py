@@ -18,7 +18,9 @@ from struct import calcsize, unpack, pack
 from cStringIO import StringIO
 from itertools import izip, islice
 import array
+import mmap
 import sys
+import numpy as np
 if sys.byteorder == 'little':
     SYS_BYTE_ORDER = '<'
 else:
@@ -343,6 +345,57 @@ class shp_file:
         return self.shape.unpack(StringIO(self.fileObj.read(bytes)))
         #return self.shape.unpack(self.fileObj.read(bytes))
 
+    def read_arrays(self, start=0, stop=None):
+        """Returns the records start:stop (the whole file by default) as a
+        dictionary of columnar numpy arrays
+
+        The SHP and SHX files are memory-mapped and all records are decoded
+        at once with vectorized gathers, without building a dict per record.
+
+        Returns:
+            {'Shape Type': int,
+             'BBOX': nx4 float64 array -- Xmin, Ymin, Xmax, Ymax of each record,
+             'Part Offsets': (n+1) int64 array -- parts of record i are
+                 Part Offsets[i]:Part Offsets[i+1],
+             'Vertex Offsets': (nparts+1) int64 array -- vertices of part j are
+                 Vertex Offsets[j]:Vertex Offsets[j+1],
+             'Vertices': Nx2 float64 array -- X, Y of all the vertices}
+            Z types also include the 'Z' and 'M' arrays (one value per vertex).
+            Points are stored as single vertex parts. Null records have no
+            parts and a nan BBOX.
+
+        Example:
+        >>> import pysal
+        >>> shp = shp_file(pysal.examples.get_path('Polygon.shp'))
+        >>> arrs = shp.read_arrays()
+        >>> rec = shp.get_shape(1)
+        >>> start, end = arrs['Part Offsets'][1:3]
+        >>> vstart, vend = arrs['Vertex Offsets'][start], arrs['Vertex Offsets'][end]
+        >>> map(tuple, arrs['Vertices'][vstart:vend]) == rec['Vertices']
+        True
+        >>> list(arrs['BBOX'][1]) == [rec['BBOX Xmin'], rec['BBOX Ymin'], rec['BBOX Xmax'], rec['BBOX Ymax']]
+        True
+        """
+        self.__isreadable()
+        return _read_arrays(self.fileObj, self.fileName + '.shx',
+                            self.shapeType, self.shape.HASZ, start, stop)
+
+    def read_bboxes(self):
+        """Returns a nx4 float64 array with the bounding box (Xmin, Ymin,
+        Xmax, Ymax) of each record, decoding only the record headers. Null
+        records have a nan bounding box.
+
+        Example:
+        >>> import pysal
+        >>> shp = shp_file(pysal.examples.get_path('Line.shp'))
+        >>> rec = shp.get_shape(0)
+        >>> list(shp.read_bboxes()[0]) == [rec['BBOX Xmin'], rec['BBOX Ymin'], rec['BBOX Xmax'], rec['BBOX Ymax']]
+        True
+        """
+        self.__isreadable()
+        return _read_bboxes(self.fileObj, self.fileName + '.shx',
+                            self.shapeType)
+
     def __update_bbox(self, s):
         h = self.header
         if s.get('Shape Type') == 1:
@@ -381,6 +434,110 @@ class shp_file:
         self.fileObj.write(pack('>ii', rec_id, con_len / 2))
         self.fileObj.write(rec)
 
+    def add_arrays(self, arrays, chunksize=100000):
+        """Adds many records at once from columnar numpy arrays
+
+        add_arrays(arrays dict)
+
+        Arguments:
+        arrays -- dict -- records in the format returned by read_arrays.
+            'Part Offsets', 'Vertex Offsets' and 'Vertices' are required
+            ('Part Offsets' is optional for points, one point per record).
+            'BBOX' is computed from the vertices if missing, and 'Z' and
+            'M' default to zeros for Z types. Records without vertices are
+            written as null shapes. Only points, lines and polygons, with
+            or without Z, are supported, and 'Shape Type', if given, must
+            match the type of the file.
+        chunksize -- int -- number of records packed and written per block
+
+        The record lengths, bounding boxes and SHX entries are computed for
+        all the records at once and the records are packed into one buffer
+        per block of chunksize records.
+
+        Example:
+        >>> import pysal,os
+        >>> shp = shp_file('test','w','POLYGON')
+        >>> arrs = shp_file(pysal.examples.get_path('10740.shp')).read_arrays()
+        >>> shp.add_arrays(arrs)
+        >>> shp.close()
+        >>> open('test.shp','rb').read() == open(pysal.examples.get_path('10740.shp'),'rb').read()
+        True
+        >>> open('test.shx','rb').read() == open(pysal.examples.get_path('10740.shx'),'rb').read()
+        True
+        >>> os.remove('test.shx')
+        >>> os.remove('test.shp')
+        """
+        self.__iswritable()
+        shapeType = self.header['Shape Type']
+        if shapeType not in (1, 3, 5, 11, 13, 15):
+            raise NotImplementedError(
+                "add_arrays does not support shape type %d" % shapeType)
+        if arrays.get('Shape Type', shapeType) not in (0, shapeType):
+            raise TypeError("Records of shape type %d can not be added to "
+                            "a file of shape type %d" %
+                            (arrays['Shape Type'], shapeType))
+        hasZ = self.shape.HASZ
+        vertices = np.asarray(arrays['Vertices'], dtype=float).reshape((-1, 2))
+        point = shapeType in (1, 11, 21)
+        if point and 'Part Offsets' not in arrays:
+            partOffsets = np.arange(len(vertices) + 1)
+            vertexOffsets = partOffsets
+        else:
+            partOffsets = np.asarray(arrays['Part Offsets'], dtype=np.int64)
+            vertexOffsets = np.asarray(arrays['Vertex Offsets'],
+                                       dtype=np.int64)
+        n = len(partOffsets) - 1
+        numParts = np.diff(partOffsets)
+        vStart = vertexOffsets[partOffsets[:-1]]
+        numPoints = vertexOffsets[partOffsets[1:]] - vStart
+        null = numPoints == 0
+        nv = len(vertices)
+        z = np.asarray(arrays.get('Z', np.zeros(nv)), dtype=float)
+        m = np.asarray(arrays.get('M', np.zeros(nv)), dtype=float)
+        if 'BBOX' in arrays:
+            bbox = np.array(arrays['BBOX'], dtype=float).reshape((n, 4))
+        else:
+            bbox = np.zeros((n, 4), float)
+            if not null.all():
+                idx = vStart[~null]
+                block = vertices[:vertexOffsets[partOffsets[-1]]]
+                bbox[~null, :2] = np.minimum.reduceat(block, idx)
+                bbox[~null, 2:] = np.maximum.reduceat(block, idx)
+        if point:
+            sizes = np.where(null, 4, 36 if hasZ else 20)
+        else:
+            sizes = 44 + 4 * numParts + 16 * numPoints
+            if hasZ:
+                sizes += 32 + 16 * numPoints
+            sizes[null] = 4
+        rec_ids, pos = self._shx.add_records(sizes)
+        for first in range(0, n, chunksize):
+            last = min(first + chunksize, n)
+            recs = slice(first, last)
+            buf = _pack_records(shapeType, hasZ, pos[recs] - pos[first],
+                                rec_ids[recs], sizes[recs], null[recs],
+                                bbox[recs], partOffsets[first:last + 1],
+                                vertexOffsets, vertices, z, m)
+            self.__seek(int(pos[first]))
+            self.fileObj.write(buf.tostring())
+        self.__file_Length += int((sizes + 8).sum())
+        # header bounding box
+        h = self.header
+        if not null.all():
+            valid = bbox[~null]
+            h['BBOX Xmin'] = noneMin(h['BBOX Xmin'], valid[:, 0].min())
+            h['BBOX Ymin'] = noneMin(h['BBOX Ymin'], valid[:, 1].min())
+            h['BBOX Xmax'] = noneMax(h['BBOX Xmax'], valid[:, 2].max())
+            h['BBOX Ymax'] = noneMax(h['BBOX Ymax'], valid[:, 3].max())
+            if hasZ and nv:
+                h['BBOX Zmin'] = noneMin(h['BBOX Zmin'], z.min())
+                h['BBOX Zmax'] = noneMax(h['BBOX Zmax'], z.max())
+                h['BBOX Mmin'] = noneMin(h['BBOX Mmin'], m.min())
+                h['BBOX Mmax'] = noneMax(h['BBOX Mmax'], m.max())
+        if not hasZ:
+            h['BBOX Zmin'] = h['BBOX Zmax'] = 0.0
+            h['BBOX Mmin'] = h['BBOX Mmax'] = 0.0
+
     def close(self):
         self._shx.close(self.header)
         if self.__mode == 'w':
@@ -390,6 +547,224 @@ class shp_file:
         self.fileObj.close()
 
 
+def _mmap(fileObj):
+    """Read-only memory map of an open file (None if it is empty)"""
+    fileObj.seek(0, 2)
+    if not fileObj.tell():
+        return None
+    return mmap.mmap(fileObj.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _gather(buf, dtype, byte_offsets):
+    """Values of type dtype stored at the (even) byte_offsets of buf
+
+    Shapefile records start at 16-bit word boundaries, so buf is viewed as
+    overlapping items starting every 2 bytes and indexed in one step.
+    """
+    dtype = np.dtype(dtype)
+    if buf is None or len(buf) < dtype.itemsize:
+        return np.zeros(0, dtype)
+    windows = np.ndarray(((len(buf) - dtype.itemsize) // 2 + 1,), dtype,
+                         buffer=buf, strides=(2,))
+    return windows[np.asarray(byte_offsets, dtype=np.int64) // 2]
+
+
+def _ranges(starts, counts, step):
+    """Byte offsets starts[i] + step * k for k in range(counts[i]), for all i"""
+    total = counts.sum()
+    rec = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    k = np.arange(total) - first[rec]
+    return starts[rec] + step * k, rec
+
+
+def _record_starts(shxName, first=0, last=None):
+    """Byte offsets of the content of the records first:last (after the 8
+    byte record header) in the SHP file, read from the SHX index. Only the
+    index entries of those records are read."""
+    shx = open(shxName, 'rb')
+    try:
+        shx.seek(0, 2)
+        numRecords = max(shx.tell() - 100, 0) // 8
+        first, last, step = slice(first, last).indices(numRecords)
+        count = max(last - first, 0)
+        shx.seek(100 + 8 * first)
+        index = np.fromstring(shx.read(8 * count), '>i4')
+    finally:
+        shx.close()
+    return index.astype(np.int64)[::2] * 2 + 8
+
+
+def _read_bboxes(shpObj, shxName, shapeType):
+    """Bounding boxes of all the records of a SHP file
+
+    See shp_file.read_bboxes
+    """
+    start = _record_starts(shxName)
+    buf = _mmap(shpObj)
+    try:
+        bbox = np.empty((len(start), 4), float)
+        # null records are only 4 bytes long, see _read_arrays
+        null = _gather(buf, '<i4', start) == 0
+        bbox[null] = np.nan
+        valid = ~null
+        start = start[valid]
+        if shapeType in (1, 11, 21):
+            bbox[valid, 0] = bbox[valid, 2] = _gather(buf, '<f8', start + 4)
+            bbox[valid, 1] = bbox[valid, 3] = _gather(buf, '<f8', start + 12)
+        else:
+            for i in range(4):
+                bbox[valid, i] = _gather(buf, '<f8', start + 4 + 8 * i)
+        return bbox
+    finally:
+        if buf is not None:
+            buf.close()
+
+
+def _read_arrays(shpObj, shxName, shapeType, hasZ, first=0, last=None):
+    """Decodes the records first:last of a SHP file into columnar arrays
+
+    See shp_file.read_arrays
+    """
+    start = _record_starts(shxName, first, last)
+    n = len(start)
+    buf = _mmap(shpObj)
+    try:
+        types = _gather(buf, '<i4', start)
+        null = types == 0
+        result = {'Shape Type': shapeType}
+        # null records are only 4 bytes long, their other fields are not
+        # read as they may lie past the end of the file
+        valid = ~null
+        start_valid = start[valid]
+        if shapeType in (1, 11, 21):
+            xy = np.empty((n, 2), float)
+            xy[null] = np.nan
+            xy[valid, 0] = _gather(buf, '<f8', start_valid + 4)
+            xy[valid, 1] = _gather(buf, '<f8', start_valid + 12)
+            result['Vertices'] = xy[valid]
+            result['BBOX'] = np.hstack((xy, xy))
+            result['Part Offsets'] = np.concatenate(
+                ([0], np.cumsum(valid))).astype(np.int64)
+            result['Vertex Offsets'] = np.arange(valid.sum() + 1,
+                                                 dtype=np.int64)
+            if hasZ:
+                result['Z'] = _gather(buf, '<f8', start_valid + 20)
+                result['M'] = _gather(buf, '<f8', start_valid + 28)
+            return result
+        bbox = np.empty((n, 4), float)
+        bbox[null] = np.nan
+        for i in range(4):
+            bbox[valid, i] = _gather(buf, '<f8', start_valid + 4 + 8 * i)
+        numParts = np.zeros(n, np.int64)
+        numPoints = np.zeros(n, np.int64)
+        numParts[valid] = _gather(buf, '<i4', start_valid + 36)
+        numPoints[valid] = _gather(buf, '<i4', start_valid + 40)
+        # records with vertices but no parts index hold a single part
+        noParts = (numParts == 0) & (numPoints > 0)
+        partsStart = start + 44
+        ptsStart = partsStart + 4 * numParts
+        vertexBase = np.cumsum(numPoints) - numPoints
+        offsets, rec = _ranges(partsStart, numParts, 4)
+        partsIndex = _gather(buf, '<i4', offsets).astype(np.int64)
+        numParts[noParts] = 1
+        partOffsets = np.concatenate(([0], np.cumsum(numParts)))
+        vertexOffsets = np.empty(partOffsets[-1] + 1, np.int64)
+        vertexOffsets[-1] = numPoints.sum()
+        fromIndex = np.ones(partOffsets[-1], bool)
+        fromIndex[partOffsets[:-1][noParts]] = False
+        vertexOffsets[:-1][fromIndex] = partsIndex + vertexBase[rec]
+        vertexOffsets[:-1][~fromIndex] = vertexBase[noParts]
+        offsets, rec = _ranges(ptsStart, numPoints, 16)
+        vertices = np.empty((len(offsets), 2), float)
+        vertices[:, 0] = _gather(buf, '<f8', offsets)
+        vertices[:, 1] = _gather(buf, '<f8', offsets + 8)
+        result['BBOX'] = bbox
+        result['Part Offsets'] = partOffsets.astype(np.int64)
+        result['Vertex Offsets'] = vertexOffsets
+        result['Vertices'] = vertices
+        if hasZ:
+            # Zmin, Zmax, Zarray, Mmin, Mmax, Marray follow the vertices
+            zStart = ptsStart + 16 * numPoints + 16
+            mStart = zStart + 8 * numPoints + 16
+            result['Z'] = _gather(buf, '<f8', _ranges(zStart, numPoints, 8)[0])
+            result['M'] = _gather(buf, '<f8', _ranges(mStart, numPoints, 8)[0])
+        return result
+    finally:
+        if buf is not None:
+            buf.close()
+
+
+def _scatter(buf, dtype, byte_offsets, values):
+    """Stores values as dtype at the (even) byte_offsets of the uint8 array
+    buf, the counterpart of _gather"""
+    dtype = np.dtype(dtype)
+    if not len(byte_offsets):
+        return
+    windows = np.ndarray(((len(buf) - dtype.itemsize) // 2 + 1,), dtype,
+                         buffer=buf, strides=(2,))
+    windows[np.asarray(byte_offsets, dtype=np.int64) // 2] = values
+
+
+def _pack_records(shapeType, hasZ, offsets, rec_ids, sizes, null, bbox,
+                  partOffsets, vertexOffsets, vertices, z, m):
+    """Packs a block of records (record headers included) into a uint8
+    array. offsets are the positions of the records in the block and
+    partOffsets the parts of the records of the block.
+
+    See shp_file.add_arrays
+    """
+    buf = np.zeros(int((sizes + 8).sum()), np.uint8)
+    _scatter(buf, '>i4', offsets, rec_ids)
+    _scatter(buf, '>i4', offsets + 4, sizes // 2)
+    start = offsets + 8
+    _scatter(buf, '<i4', start, np.where(null, 0, shapeType))
+    valid = ~null
+    start = start[valid]
+    if shapeType in (1, 11, 21):
+        pts = vertexOffsets[partOffsets[:-1][valid]]
+        _scatter(buf, '<f8', start + 4, vertices[pts, 0])
+        _scatter(buf, '<f8', start + 12, vertices[pts, 1])
+        if hasZ:
+            _scatter(buf, '<f8', start + 20, z[pts])
+            _scatter(buf, '<f8', start + 28, m[pts])
+        return buf
+    for i in range(4):
+        _scatter(buf, '<f8', start + 4 + 8 * i, bbox[valid, i])
+    parts = partOffsets - partOffsets[0]
+    numParts = np.diff(parts)[valid]
+    vStart = vertexOffsets[partOffsets[:-1]][valid]
+    numPoints = vertexOffsets[partOffsets[1:]][valid] - vStart
+    _scatter(buf, '<i4', start + 36, numParts)
+    _scatter(buf, '<i4', start + 40, numPoints)
+    # parts index, relative to the first vertex of each record
+    pos, rec = _ranges(start + 44, numParts, 4)
+    firstPart = partOffsets[:-1][valid]
+    part = firstPart[rec] + np.arange(len(rec)) - \
+        (np.cumsum(numParts) - numParts)[rec]
+    _scatter(buf, '<i4', pos, vertexOffsets[part] - vStart[rec])
+    # vertices
+    ptsStart = start + 44 + 4 * numParts
+    pos, rec = _ranges(ptsStart, numPoints, 16)
+    vert = vStart[rec] + (pos - ptsStart[rec]) // 16
+    _scatter(buf, '<f8', pos, vertices[vert, 0])
+    _scatter(buf, '<f8', pos + 8, vertices[vert, 1])
+    if hasZ:
+        zStart = ptsStart + 16 * numPoints
+        mStart = zStart + 16 + 8 * numPoints
+        for rangeStart, values in ((zStart, z), (mStart, m)):
+            if len(vStart):
+                block = values[:vStart[-1] + numPoints[-1]]
+                _scatter(buf, '<f8', rangeStart,
+                         np.minimum.reduceat(block, vStart))
+                _scatter(buf, '<f8', rangeStart + 8,
+                         np.maximum.reduceat(block, vStart))
+            pos, rec = _ranges(rangeStart + 16, numPoints, 8)
+            _scatter(buf, '<f8', pos, values[vStart[rec] +
+                                             (pos - rangeStart[rec] - 16) // 8])
+    return buf
+
+
 class shx_file:
     """
     Reads and Writes the SHX compenent of a ShapeFile
@@ -473,6 +848,7 @@ class shx_file:
         self.index = []
         self.__offset = 100  # length of header
         self.__next_rid = 1  # record IDs start at 1
+        self.__flushed = 0  # entries of index already written to the file
 
     def add_record(self, size):
         """ Add a record to the shx index.
@@ -511,18 +887,67 @@ class shx_file:
         self.__next_rid += 1
         return rec_id, pos
 
+    def add_records(self, sizes):
+        """ Add many records to the shx index at once.
+
+        add_records(sizes array) --> (RecordIDs array, positions array)
+
+        Arguments:
+        sizes -- array -- the lengths of the records in bytes NOT including the 8byte record header
+
+        Returns:
+        rec_ids -- array -- the sequential record IDs, 1-based.
+        pos -- array -- the offsets of the records in the SHP file.
+
+        Note: the entries are written directly to the file instead of being kept in index.
+
+        Example:
+        >>> import pysal,os
+        >>> shx = shx_file(pysal.examples.get_path('Point'))
+        >>> shx2 = shx_file('test','w')
+        >>> rec_ids, pos = shx2.add_records([size for off, size in shx.index])
+        >>> list(rec_ids) == range(1, 10) and list(pos) == [off for off, size in shx.index]
+        True
+        >>> shx2.close(shx._header)
+        >>> open('test.shx','rb').read() == open(pysal.examples.get_path('Point.shx'),'rb').read()
+        True
+        >>> os.remove('test.shx')
+        """
+        self.__iswritable()
+        self.__flush_index()
+        sizes = np.asarray(sizes, dtype=np.int64)
+        n = len(sizes)
+        pos = self.__offset + np.cumsum(sizes + 8) - (sizes + 8)
+        rec_ids = self.__next_rid + np.arange(n)
+        entries = np.empty((n, 2), '>i4')
+        entries[:, 0] = pos / 2
+        entries[:, 1] = sizes / 2
+        self.fileObj.seek(100 + 8 * self.numRecords)
+        self.fileObj.write(entries.tostring())
+        self.__offset += int((sizes + 8).sum())
+        self.numRecords += n
+        self.__next_rid += n
+        return rec_ids, pos
+
+    def __flush_index(self):
+        """ Writes the entries added with add_record since the last flush """
+        pending = self.index[self.__flushed:]
+        if pending:
+            self.fileObj.seek(100 + 8 * (self.numRecords - len(pending)))
+            values = []
+            for off, size in pending:
+                values.extend([off / 2, size / 2])
+            self.fileObj.write(pack('>%di' % len(values), *values))
+            self.__flushed = len(self.index)
+
     def close(self, header):
         if self.__mode == 'w':
             self.__iswritable()
             header['File Length'] = (
                 self.numRecords * calcsize('>ii') + 100) / 2
+            self.__flush_index()
             self.fileObj.seek(0)
             self.fileObj.write(_packDict(HEADERSTRUCT, header))
-            fmt = '>%di' % (2 * self.numRecords)
-            values = []
-            for off, size in self.index:
-                values.extend([off / 2, size / 2])
-            self.fileObj.write(pack(fmt, *values))
         self.fileObj.close()
 
 
@@ -0,0 +1,55 @@
+import unittest
+import json
+import numpy as np
+import pysal
+from pysal.core.util import geojson_arrays
+
+
+class test_geojson_arrays(unittest.TestCase):
+    def test_columbus(self):
+        path = pysal.examples.get_path('columbus.json')
+        arrs = geojson_arrays(path)
+        shp = pysal.core.util.shp_file(pysal.examples.get_path('columbus.shp'))
+        shp_arrs = shp.read_arrays()
+        shp.close()
+        self.assertEqual(arrs['Shape Type'], 5)
+        for key in ['Part Offsets', 'Vertex Offsets']:
+            self.assertEqual(arrs[key].tolist(), shp_arrs[key].tolist())
+        np.testing.assert_allclose(arrs['Vertices'], shp_arrs['Vertices'])
+        np.testing.assert_allclose(arrs['BBOX'], shp_arrs['BBOX'])
+        # decoded documents and open files are accepted too
+        doc = json.load(open(path))
+        self.assertEqual(geojson_arrays(doc)['Vertices'].tolist(),
+                         arrs['Vertices'].tolist())
+        self.assertEqual(geojson_arrays(open(path))['Vertices'].tolist(),
+                         arrs['Vertices'].tolist())
+
+    def test_features(self):
+        doc = {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'geometry': {
+                'type': 'MultiLineString',
+                'coordinates': [[[0, 0, 1], [1, 1, 2]], [[2, 2, 3], [3, 4, 4]]]}},
+            {'type': 'Feature', 'geometry': None},
+            {'type': 'Feature', 'geometry': {
+                'type': 'LineString', 'coordinates': [[5, 5, 6], [6, 6, 7]]}}]}
+        arrs = geojson_arrays(doc)
+        self.assertEqual(arrs['Shape Type'], 13)
+        self.assertEqual(arrs['Part Offsets'].tolist(), [0, 2, 2, 3])
+        self.assertEqual(arrs['Vertex Offsets'].tolist(), [0, 2, 4, 6])
+        self.assertEqual(arrs['Z'].tolist(), [1, 2, 3, 4, 6, 7])
+        self.assertEqual(arrs['BBOX'][0].tolist(), [0, 0, 3, 4])
+        self.assert_(np.isnan(arrs['BBOX'][1]).all())
+
+    def test_errors(self):
+        self.failUnlessRaises(NotImplementedError, geojson_arrays,
+                              {'type': 'GeometryCollection', 'geometries': []})
+        doc = {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Point',
+                                             'coordinates': [0, 0]}},
+            {'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates':
+                                             [[[0, 0], [0, 1], [1, 1], [0, 0]]]}}]}
+        self.failUnlessRaises(TypeError, geojson_arrays, doc)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -97,6 +97,93 @@ class test_shp_file(unittest.TestCase):
                     0.11697145363360706, 'Shape Type': 1}
         self.assertEqual(expected, shp.next())
 
+    def test_read_arrays(self):
+        shp = shp_file(pysal.examples.get_path('us48.shp'))
+        arrs = shp.read_arrays()
+        self.assertEqual(len(arrs['Part Offsets']), len(shp) + 1)
+        vo = arrs['Vertex Offsets']
+        self.assertEqual(vo[-1], len(arrs['Vertices']))
+        for i, rec in enumerate(shp):
+            p0, p1 = arrs['Part Offsets'][i:i + 2]
+            self.assertEqual(p1 - p0, rec['NumParts'])
+            self.assertEqual(list(vo[p0:p1] - vo[p0]), rec['Parts Index'])
+            self.assertEqual(map(tuple, arrs['Vertices'][vo[p0]:vo[p1]]),
+                             rec['Vertices'])
+            self.assertEqual(list(arrs['BBOX'][i]),
+                             [rec['BBOX Xmin'], rec['BBOX Ymin'],
+                              rec['BBOX Xmax'], rec['BBOX Ymax']])
+        shp = shp_file(pysal.examples.get_path('Point.shp'))
+        arrs = shp.read_arrays()
+        self.assertEqual(map(tuple, arrs['Vertices']),
+                         [(pt['X'], pt['Y']) for pt in shp])
+
+    def test_add_arrays(self):
+        import numpy as np
+        arrs = {'Shape Type': 13,
+                'Part Offsets': np.array([0, 2, 2, 3]),
+                'Vertex Offsets': np.array([0, 2, 5, 7]),
+                'Vertices': np.arange(14, dtype=float).reshape((7, 2)),
+                'Z': np.arange(7, dtype=float),
+                'M': -np.arange(7, dtype=float)}
+        shp = shp_file('test_arrays', 'w', 'ARCZ')
+        shp.add_arrays(arrs, chunksize=2)
+        shp.close()
+        shp = shp_file('test_arrays')
+        recs = [shp.get_shape(0), None, shp.get_shape(2)]
+        self.assertEqual(recs[0]['Parts Index'], [0, 2])
+        self.assertEqual(recs[0]['Vertices'], [(0, 1), (2, 3), (4, 5),
+                                                (6, 7), (8, 9)])
+        self.assertEqual(recs[0]['Zarray'], [0, 1, 2, 3, 4])
+        self.assertEqual((recs[0]['Mmin'], recs[0]['Mmax']), (-4, 0))
+        self.assertEqual(recs[0]['BBOX Xmax'], 8)
+        self.assertEqual(recs[2]['Vertices'], [(10, 11), (12, 13)])
+        self.assertEqual(recs[2]['Zarray'], [5, 6])
+        self.assertEqual(shp.header['BBOX Zmax'], 6)
+        back = shp.read_arrays()
+        self.assertEqual(list(back['Part Offsets']), [0, 2, 2, 3])
+        self.assertTrue(np.isnan(back['BBOX'][1]).all())
+        self.assertTrue(np.array_equal(back['Vertices'], arrs['Vertices']))
+        shp.close()
+        os.remove('test_arrays.shp')
+        os.remove('test_arrays.shx')
+
+    def test_trailing_null(self):
+        import numpy as np
+        polys = {'Part Offsets': np.array([0, 1, 1]),
+                 'Vertex Offsets': np.array([0, 4]),
+                 'Vertices': np.array([[0, 0], [0, 1], [1, 1], [0, 0.]])}
+        points = {'Part Offsets': np.array([0, 1, 1]),
+                  'Vertex Offsets': np.array([0, 1]),
+                  'Vertices': np.array([[2, 3.]])}
+        for shapeType, arrs in (('POLYGON', polys), ('POINT', points)):
+            shp = shp_file('test_arrays', 'w', shapeType)
+            shp.add_arrays(arrs)
+            shp.close()
+            shp = shp_file('test_arrays')
+            back = shp.read_arrays()
+            self.assertEqual(list(back['Part Offsets']), [0, 1, 1])
+            self.assertTrue(np.array_equal(back['Vertices'],
+                                           arrs['Vertices']))
+            self.assertTrue(np.isnan(back['BBOX'][1]).all())
+            self.assertEqual(len(shp.read_arrays(1)['Vertices']), 0)
+            bboxes = shp.read_bboxes()
+            self.assertEqual(list(bboxes[0]), list(back['BBOX'][0]))
+            self.assertTrue(np.isnan(bboxes[1]).all())
+            shp.close()
+        os.remove('test_arrays.shp')
+        os.remove('test_arrays.shx')
+
+    def test_add_arrays_types(self):
+        arrs = pysal.core.util.wkt_arrays(['MULTIPOINT((1 2),(3 4))'])
+        # files without records can not be closed, they are just removed
+        shp = shp_file('test_arrays', 'w', 'POINT')
+        self.assertRaises(TypeError, shp.add_arrays, arrs)
+        shp = shp_file('test_arrays', 'w', 'MULTIPOINT')
+        self.assertRaises(NotImplementedError, shp.add_arrays, arrs)
+        del shp
+        os.remove('test_arrays.shp')
+        os.remove('test_arrays.shx')
+
     def test_type(self):
         shp = shp_file(pysal.examples.get_path('Point.shp'))
         self.assertEqual("POINT", shp.type())
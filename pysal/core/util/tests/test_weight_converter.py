@@ -2,6 +2,8 @@ import unittest
 import pysal
 from pysal.core.util.weight_converter import WeightConverter
 from pysal.core.util.weight_converter import weight_convert
+from pysal.core.util.weight_converter import weight_convert_batch
+from pysal.core.util.weight_converter import _stream_gal
 import tempfile
 import os
 import warnings
@@ -133,5 +135,54 @@ class test_WeightConverter(unittest.TestCase):
                     self.assertEqual(wnew.n, wold.n)
                 os.remove(outFile)
 
+    def test_weight_convert_batch(self):
+        jobs, expected = [], []
+        for f, ext in [('sids2.gal', 'gwt'), ('sids2.gal', 'gal'),
+                       ('juvenile.gwt', 'mtx'), ('missing.gal', 'gwt')]:
+            temp_f = tempfile.NamedTemporaryFile(
+                suffix='.%s' % ext, dir=self.base_dir)
+            jobs.append((self.base_dir + f, temp_f.name))
+            temp_f.close()
+        with warnings.catch_warnings(record=True) as warn:
+            warnings.simplefilter("always")
+            reports = weight_convert_batch(jobs, cores=2)
+            # streamed GAL output matches the output of the W writers
+            for job in jobs[:2]:
+                w = pysal.open(job[0]).read()
+                temp_f = tempfile.NamedTemporaryFile(
+                    suffix=job[1][-4:], dir=self.base_dir)
+                temp_fname = temp_f.name
+                temp_f.close()
+                o = pysal.open(temp_fname, 'w')
+                o.write(w)
+                o.close()
+                expected.append(open(temp_fname).read())
+                os.remove(temp_fname)
+        self.assertEqual([r['inPath'] for r in reports],
+                         [job[0] for job in jobs])
+        self.assertEqual([r['n'] for r in reports], [100, 100, 168, None])
+        self.assertEqual(reports[0]['links'], 462)
+        self.assertEqual([r['error'] is None for r in reports],
+                         [True, True, True, False])
+        for job, text in zip(jobs[:2], expected):
+            self.assertEqual(open(job[1]).read(), text)
+        for job in jobs[:3]:
+            os.remove(job[1])
+
+    def test_stream_gal(self):
+        fd, out = tempfile.mkstemp(suffix='.gwt')
+        os.close(fd)
+        self.assertEqual(_stream_gal(self.base_dir + 'sids2.gal', out, 'gwt'),
+                         (100, 462))
+        self.assertEqual(pysal.open(out).read().n, 100)
+        fd, bad = tempfile.mkstemp(suffix='.gal')
+        os.close(fd)
+        o = open(bad, 'w')
+        o.write('3\n1 1\n2\n2\n')
+        o.close()
+        self.assertRaises(ValueError, _stream_gal, bad, out, 'gwt')
+        self.assertFalse(os.path.exists(out))
+        os.remove(bad)
+
 if __name__ == '__main__':
     unittest.main()
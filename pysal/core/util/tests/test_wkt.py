@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import pysal
 
 
@@ -48,5 +49,51 @@ class test_WKTParser(unittest.TestCase):
             self.assertEquals(self.parser.fromWKT(wkt), None)
         self.assertEquals(self.parser.__call__, self.parser.fromWKT)
 
+
+class test_wkt_arrays(unittest.TestCase):
+    def test_polygons(self):
+        arrs = pysal.core.util.wkt_arrays(
+            ['POLYGON((1 1,5 1,5 5,1 5,1 1),(2 2, 3 2, 3 3, 2 3,2 2))',
+             'MULTIPOLYGON EMPTY',
+             'MULTIPOLYGON(((1 1,5 1,5 5,1 5,1 1),(2 2, 3 2, 3 3, 2 3,2 2)),((3 3,6 2,6 4,3 3)))'])
+        self.assertEquals(arrs['Shape Type'], 5)
+        self.assertEquals(arrs['Part Offsets'].tolist(), [0, 2, 2, 5])
+        self.assertEquals(arrs['Vertex Offsets'].tolist(),
+                          [0, 5, 10, 15, 20, 24])
+        self.assert_(np.isnan(arrs['BBOX'][1]).all())
+        self.assertEquals(arrs['BBOX'][2].tolist(), [1, 1, 6, 5])
+        parser = pysal.core.util.WKTParser()
+        poly = parser(self.wkt_polygon)
+        self.assertEquals(sorted(map(tuple, arrs['Vertices'][:10])),
+                          sorted(pt[:] for part in poly.parts for pt in part))
+
+    def test_points(self):
+        arrs = pysal.core.util.wkt_arrays(['POINT ZM (1 1 5 60)',
+                                           'POINT M (1 1 80)',
+                                           'MULTIPOINT((3.5 5.6),(4.8 10.5))'])
+        self.assertEquals(arrs['Shape Type'], 18)
+        self.assertEquals(arrs['Vertex Offsets'].tolist(), [0, 1, 2, 4])
+        self.assertEquals(arrs['Z'].tolist(), [5, 0, 0, 0])
+        self.assertEquals(arrs['M'][:2].tolist(), [60, 80])
+        self.assert_(np.isnan(arrs['M'][2:]).all())
+
+    def test_measures(self):
+        arrs = pysal.core.util.wkt_arrays(['POINT M (1 1 80)',
+                                           'POINT (2 2)'])
+        self.assertEquals(arrs['Shape Type'], 21)
+        self.assertFalse('Z' in arrs)
+        self.assertEquals(arrs['M'][0], 80)
+        self.assert_(np.isnan(arrs['M'][1]))
+
+    def test_errors(self):
+        wkt_arrays = pysal.core.util.wkt_arrays
+        self.failUnlessRaises(NotImplementedError, wkt_arrays,
+                              ['GEOMETRYCOLLECTION(POINT(4 6),LINESTRING(4 6,7 10))'])
+        self.failUnlessRaises(TypeError, wkt_arrays,
+                              ['POINT(6 10)', 'LINESTRING(3 4,10 50,20 25)'])
+        self.failUnlessRaises(ValueError, wkt_arrays, ['LINESTRING(3 4,10 x)'])
+
+    wkt_polygon = 'POLYGON((1 1,5 1,5 5,1 5,1 1),(2 2, 3 2, 3 3, 2 3,2 2))'
+
 if __name__ == '__main__':
     unittest.main()
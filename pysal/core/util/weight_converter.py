@@ -1,8 +1,10 @@
 import os
+import time
+import multiprocessing as mp
 import pysal
 
 __author__ = "Myunghwa Hwang <mhwang4@gmail.com>"
-__all__ = ["weight_convert"]
+__all__ = ["weight_convert", "weight_convert_batch"]
 
 
 class WeightConverter(object):
@@ -237,7 +239,150 @@ def weight_convert(inPath, outPath, inDataFormat=None, outDataFormat=None, useId
 
     """
 
+    _convert(inPath, outPath, inDataFormat, outDataFormat, useIdIndex,
+             matrix_form)
+
+
+def _convert(inPath, outPath, inDataFormat=None, outDataFormat=None,
+             useIdIndex=True, matrix_form=True):
+    """
+    Converts one weights file and returns (n, number of links). GAL inputs
+    written as GAL or GWT are streamed record by record; other combinations
+    go through a W object.
+    """
+    inFormat = pysal.core.FileIO.FileIO.getType(inPath, 'r', inDataFormat)
+    outFormat = pysal.core.FileIO.FileIO.getType(outPath, 'w', outDataFormat)
+    if inFormat == 'gal' and outFormat in ('gal', 'gwt'):
+        try:
+            return _stream_gal(inPath, outPath, outFormat)
+        except (ValueError, IndexError):
+            pass    # malformed for streaming, let the reader handle it
     converter = WeightConverter(inPath, dataFormat=inDataFormat)
     converter.write(outPath, dataFormat=outDataFormat,
                     useIdIndex=useIdIndex, matrix_form=matrix_form)
+    return converter.w.n, converter.w.nonzero
+
+
+def _stream_gal(inPath, outPath, outFormat):
+    """
+    Copies a GAL file into a GAL or GWT file one record at a time, producing
+    the same output as reading the W and writing it with the GAL or GWT
+    handler. Each record is written as soon as it is parsed; the output is
+    removed if the input can not be parsed. Returns (n, number of links).
+    """
+    f = open(inPath, 'r')
+    o = open(outPath, 'w')
+    try:
+        header = f.readline().strip().split()
+        n = int(header[1]) if len(header) > 1 else int(header[0])
+        if outFormat == 'gal':
+            o.write('%d\n' % n)
+        else:
+            o.write('%s %i %s %s\n' % ('0', n, 'Unknown', 'Unknown'))
+        links = 0
+        for i in xrange(n):
+            id, n_neighbors = f.readline().strip().split()
+            neighbors = f.readline().strip().split()
+            links += len(neighbors)
+            if outFormat == 'gal':
+                o.write('%s %d\n' % (id, len(neighbors)))
+                o.write(' '.join(neighbors) + '\n')
+            else:
+                str_id = "_".join(id.split())
+                o.writelines(['%s %s %6G\n' % (str_id, neighbor, 1.0)
+                              for neighbor in neighbors])
+    except:
+        o.close()
+        os.remove(outPath)
+        raise
+    finally:
+        f.close()
+        o.close()
+    return n, links
+
+
+def _convert_job(job):
+    """
+    Converts one job of weight_convert_batch and returns its report
+    """
+    job, kwargs = job
+    inPath, outPath = job[:2]
+    inDataFormat = job[2] if len(job) > 2 else None
+    outDataFormat = job[3] if len(job) > 3 else None
+    report = {'inPath': inPath, 'outPath': outPath, 'n': None, 'links': None,
+              'seconds': None, 'links_per_second': None, 'error': None}
+    t0 = time.time()
+    try:
+        n, links = _convert(inPath, outPath, inDataFormat, outDataFormat,
+                            **kwargs)
+    except Exception, e:
+        report['error'] = '%s: %s' % (e.__class__.__name__, e)
+    else:
+        seconds = time.time() - t0
+        report.update(n=n, links=links, seconds=seconds,
+                      links_per_second=links / seconds if seconds else None)
+    return report
+
+
+def weight_convert_batch(jobs, cores=None, useIdIndex=True, matrix_form=True):
+    """
+    Converts many weights files, in parallel
 
+    Parameters
+    ----------
+    jobs: list
+          one tuple per file with (inPath, outPath) and, optionally, the
+          input and output data formats: (inPath, outPath, inDataFormat,
+          outDataFormat)
+    cores: integer
+           number of processes to use. Defaults to the number of CPUs; 1
+           converts the files sequentially in the current process
+    useIdIndex: boolean
+                True or False
+                Applies only to ArcGIS DBF/SWM/Text formats
+    matrix_form: boolean
+                 True or False
+                 STATA Text format
+
+    Returns
+    -------
+    reports: list
+             one dictionary per job, in the order of jobs, with the keys
+             'inPath', 'outPath', 'n' (observations), 'links' (non-zero
+             weights), 'seconds', 'links_per_second' and 'error' (None if
+             the conversion succeeded, else a description of the problem;
+             a failed file does not stop the batch)
+
+    Notes
+    -----
+    GAL files converted to GAL or GWT are streamed from the input to the
+    output without building a W object.
+
+    Examples
+    --------
+    >>> import tempfile, os, pysal
+    >>> d = tempfile.mkdtemp()
+    >>> jobs = [(pysal.examples.get_path('sids2.gal'), os.path.join(d, 'sids2.gwt')),
+    ...         (pysal.examples.get_path('stl.gal'), os.path.join(d, 'stl.dat'))]
+    >>> reports = weight_convert_batch(jobs, cores=2)
+    >>> [(r['n'], r['links'], r['error']) for r in reports]
+    [(100, 462, None), (78, 398, None)]
+    >>> pysal.open(os.path.join(d, 'sids2.gwt')).read().n
+    100
+    >>> for r in reports:
+    ...     os.remove(r['outPath'])
+    >>> os.rmdir(d)
+
+    """
+    kwargs = {'useIdIndex': useIdIndex, 'matrix_form': matrix_form}
+    tasks = [(tuple(job), kwargs) for job in jobs]
+    if cores is None:
+        cores = mp.cpu_count()
+    if cores == 1 or len(tasks) < 2:
+        return map(_convert_job, tasks)
+    pool = mp.Pool(min(cores, len(tasks)))
+    try:
+        return pool.map(_convert_job, tasks)
+    finally:
+        pool.close()
+        pool.join()
@@ -1,8 +1,9 @@
 from pysal import cg
 import re
+import numpy as np
 
 __author__ = "Charles R Schmidt <schmidtc@gmail.com>"
-__all__ = ['WKTParser']
+__all__ = ['WKTParser', 'wkt_arrays']
 #####################################################################
 ## ToDo: Add Well-Known-Binary support...
 ##       * WKB spec:
@@ -106,6 +107,159 @@ class WKTParser:
         else:
             return None
     __call__ = fromWKT
+
+
+# shapefile shape type of each WKT type (null shapes for EMPTY)
+WKT_SHAPE_TYPES = {'point': 1, 'multipoint': 8, 'linestring': 3,
+                   'multilinestring': 3, 'polygon': 5, 'multipolygon': 5}
+# columns of X, Y, Z, M in the coordinates of a vertex, by dimension
+VERTEX_LAYOUTS = {(2, None): (0, 1, None, None), (3, None): (0, 1, 2, None),
+                  (3, 'z'): (0, 1, 2, None), (3, 'm'): (0, 1, None, 2),
+                  (4, None): (0, 1, 2, 3), (4, 'zm'): (0, 1, 2, 3)}
+_wktRe = re.compile('^\s*([a-z]+?)\s*(zm|z|m)?\s*(empty|\((.*)\))\s*$',
+                    re.I | re.S)
+
+
+def wkt_arrays(wkts):
+    """
+    Parses a sequence of WKT strings into columnar arrays
+
+    Each geometry is split into parts with string operations and the
+    coordinates of all the geometries are converted to floats in a single
+    call, so no Python object is created per vertex.
+
+    Parameters
+    ----------
+    wkts    : iterable
+              WKT strings of POINT, MULTIPOINT, LINESTRING, MULTILINESTRING,
+              POLYGON or MULTIPOLYGON geometries (Z, M and ZM included) of a
+              single kind: points, lines or polygons
+
+    Returns
+    -------
+    arrays  : dict
+              the geometries in the format of shp_file.read_arrays. Parts
+              are rings for polygons, lines for lines and the points of a
+              record for multipoints; vertices keep the order of the WKT.
+              EMPTY geometries are null records. Geometries with Z values
+              have a Z shape type (e.g. 15) and 'Z' and 'M' arrays, M-only
+              geometries an M shape type (e.g. 25) and an 'M' array.
+              shp_file.add_arrays only writes points, lines and polygons
+              with or without Z, not multipoints or M-only types.
+
+    Examples
+    --------
+    >>> arrs = wkt_arrays(['POLYGON((1 1,5 1,5 5,1 5,1 1),(2 2, 3 2, 3 3, 2 3,2 2))',
+    ...                    'MULTIPOLYGON(((0 0,0 1,1 1,0 0)),((3 3,6 2,6 4,3 3)))',
+    ...                    'POLYGON EMPTY'])
+    >>> arrs['Shape Type']
+    5
+    >>> arrs['Part Offsets']
+    array([0, 2, 4, 4])
+    >>> arrs['Vertex Offsets']
+    array([ 0,  5, 10, 14, 18])
+    >>> arrs['BBOX'][1]
+    array([ 0.,  0.,  6.,  4.])
+    >>> arrs['Vertices'][10:14]
+    array([[ 0.,  0.],
+           [ 0.,  1.],
+           [ 1.,  1.],
+           [ 0.,  0.]])
+    >>> wkt_arrays(['POINT Z (1 2 3)', 'POINT (4 5)'])['Z']
+    array([ 3.,  0.])
+    >>> wkt_arrays(['LINESTRING M (1 2 3, 4 5 6)'])['Shape Type']
+    23
+    """
+    types, numParts, numPoints, dims, layouts, texts = [], [], [], [], [], []
+    for wkt in wkts:
+        matches = _wktRe.match(wkt)
+        if not matches:
+            raise ValueError("Invalid WKT: %s" % wkt[:80])
+        geoType, tag, empty, geoStr = matches.groups()
+        geoType = geoType.lower()
+        if geoType not in WKT_SHAPE_TYPES:
+            raise NotImplementedError("Unsupported WKT Type: %s" % geoType)
+        parts = []
+        if geoStr is not None:
+            geoStr = geoStr.replace('(', '')
+            if geoType in ('point', 'multipoint'):
+                parts = [geoStr.replace(')', '').strip()]
+            else:
+                parts = [part.strip(' ,\t\r\n') for part in geoStr.split(')')]
+            parts = [part for part in parts if part]
+        if not parts:
+            types.append(0)
+            numParts.append(0)
+            continue
+        dim = len(parts[0].split(',', 1)[0].split())
+        try:
+            layouts.append(VERTEX_LAYOUTS[dim, tag and tag.lower()])
+        except KeyError:
+            raise ValueError("Invalid WKT coordinates: %s" % wkt[:80])
+        counts = [part.count(',') + 1 for part in parts]
+        types.append(WKT_SHAPE_TYPES[geoType])
+        numParts.append(len(parts))
+        numPoints.extend(counts)
+        dims.append((dim, sum(counts)))
+        texts.extend(parts)
+    flat = np.fromstring(' '.join(texts).replace(',', ' '), sep=' ')
+    dims = np.array(dims, int).reshape((-1, 2))
+    vertexDims = np.repeat(dims[:, 0], dims[:, 1])
+    if len(flat) != vertexDims.sum():
+        raise ValueError("Invalid WKT coordinates, expected %d values, parsed %d" %
+                         (vertexDims.sum(), len(flat)))
+    starts = np.cumsum(vertexDims) - vertexDims
+    xyzm = np.empty((len(starts), 4), float)
+    xyzm.fill(np.nan)
+    geometry = np.repeat(np.arange(len(layouts)), dims[:, 1])
+    for layout in set(layouts):
+        rows = np.array([l == layout for l in layouts], bool)[geometry]
+        for j, column in enumerate(layout):
+            if column is not None:
+                xyzm[rows, j] = flat[starts[rows] + column]
+    return _geometry_arrays(types, numParts, numPoints, xyzm)
+
+
+def _geometry_arrays(types, numParts, numPoints, xyzm):
+    """
+    Assembles the shp_file.read_arrays dictionary of parsed geometries from
+    the shape type and number of parts of each record (0 for null records),
+    the number of vertices of each part and a Nx4 array with the X, Y, Z
+    and M of the vertices (nan where missing)
+    """
+    kinds = set([1 if t == 8 else t for t in types if t])
+    if len(kinds) > 1:
+        raise TypeError("Geometries of one kind expected (points, lines or polygons)")
+    shapeType = kinds.pop() if kinds else 0
+    if 8 in types:
+        shapeType = 8
+    types = np.asarray(types, int)
+    numParts = np.asarray(numParts, np.int64)
+    numPoints = np.asarray(numPoints, np.int64)
+    partOffsets = np.concatenate(([0], np.cumsum(numParts))).astype(np.int64)
+    vertexOffsets = np.concatenate(([0], np.cumsum(numPoints))).astype(np.int64)
+    vertices = np.ascontiguousarray(xyzm[:, :2])
+    bbox = np.empty((len(types), 4), float)
+    bbox.fill(np.nan)
+    valid = types > 0
+    if valid.any():
+        vStart = vertexOffsets[partOffsets[:-1][valid]]
+        bbox[valid, :2] = np.minimum.reduceat(vertices, vStart)
+        bbox[valid, 2:] = np.maximum.reduceat(vertices, vStart)
+    arrays = {'Shape Type': shapeType, 'BBOX': bbox,
+              'Part Offsets': partOffsets, 'Vertex Offsets': vertexOffsets,
+              'Vertices': vertices}
+    if shapeType and not np.isnan(xyzm[:, 2]).all():
+        arrays['Shape Type'] = shapeType + 10
+        arrays['Z'] = np.where(np.isnan(xyzm[:, 2]), 0.0, xyzm[:, 2])
+        arrays['M'] = xyzm[:, 3].copy()
+    elif shapeType and not np.isnan(xyzm[:, 3]).all():
+        # measures without Z values
+        arrays['Shape Type'] = shapeType + 20
+        arrays['M'] = xyzm[:, 3].copy()
+    return arrays
+
+
 if __name__ == '__main__':
     p = 'POLYGON((1 1,5 1,5 5,1 5,1 1),(2 2, 3 2, 3 3, 2 3,2 2))'
     pt = 'POINT(6 10)'
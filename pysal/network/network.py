@@ -7,6 +7,7 @@ import copy
 import numpy as np
 import pysal as ps
 from pysal.weights.util import get_ids
+from pysal.cg.segmentLocator import PackedSegmentLocator
 
 from analysis import NetworkG, NetworkK, NetworkF
 import util
@@ -396,87 +397,23 @@ class Network:
 
         pointpattern.snapped_coordinates = {}
 
-        for pt_index, point in pointpattern.points.iteritems():
-            x0 = point['coordinates'][0]
-            y0 = point['coordinates'][1]
-
-            d = {}
-            vectors = {}
-            c = 0
-
-            #Components of this for loop can be pre computed and cached, like denom to distance =
-            for edge in self.edges:
-                xi = self.node_coords[edge[0]][0]
-                yi = self.node_coords[edge[0]][1]
-                xi1 = self.node_coords[edge[1]][0]
-                yi1 = self.node_coords[edge[1]][1]
-
-                num = ((yi1 - yi)*(x0-xi)-(xi1-xi)*(y0-yi))
-                denom = ((yi1-yi)**2 + (xi1-xi)**2)
-                k = num / float(denom)
-                distance = abs(num) / math.sqrt(((yi1-yi)**2 + (xi1-xi)**2))
-                vectors[c] = (xi, xi1, yi, yi1,k,edge)
-                d[distance] = c
-                c += 1
-
-            min_dist = SortedEdges(sorted(d.items()))
-
-            for dist, vector_id in min_dist.iteritems():
-                value = vectors[vector_id]
-                xi = value[0]
-                xi1 = value[1]
-                yi = value[2]
-                yi1 = value[3]
-                k = value[4]
-                edge = value[5]
-
-                #Okabe Method
-                x = x0 - k * (yi1 - yi)
-                y = y0 + k * (xi1 - xi)
-
-                #Compute the distance from the new point to the nodes
-                d1, d2 = self.compute_distance_to_nodes(x, y, edge)
-
-                if xi <= x <= xi1 or xi1 <= x <= xi and yi <= y <= yi1 or yi1 <=y <= yi:
-                    #print "{} intersections edge {} at {}".format(pt_index, edge, (x,y))
-                    #We are assuming undirected - this should never be true.
-                    if edge not in obs_to_edge.keys():
-                        obs_to_edge[edge] = {pt_index: (x,y)}
-                    else:
-                        obs_to_edge[edge][pt_index] =  (x,y)
-                    dist_to_node[pt_index] = {edge[0]:d1, edge[1]:d2}
-                    pointpattern.snapped_coordinates[pt_index] = (x,y)
-
-                    break
-                else:
-                    #either pi or pi+1 are the nearest point on that edge.
-                    #If this point is closer than the next distance, we can break, the
-                    # observation intersects the node with the shorter
-                    # distance.
-                    pi = (xi, yi)
-                    pi1 = (xi1, yi1)
-                    p0 = (x0,y0)
-                    #Maybe this call to ps.cg should go as well - as per the call in the class above
-                    dist_pi = ps.cg.standalone.get_points_dist(p0, pi)
-                    dist_pi1 = ps.cg.standalone.get_points_dist(p0, pi1)
-
-                    if dist_pi < dist_pi1:
-                        node_dist = dist_pi
-                        (x,y) = pi
-                    else:
-                        node_dist = dist_pi1
-                        (x,y) = pi1
-
-                    d1, d2 = self.compute_distance_to_nodes(x, y, edge)
-
-                    if node_dist < min_dist.next_key(dist):
-                        if edge not in obs_to_edge.keys():
-                            obs_to_edge[edge] = {pt_index: (x, y)}
-                        else:
-                            obs_to_edge[edge][pt_index] =  (x, y)
-                        dist_to_node[pt_index] = {edge[0]:d1, edge[1]:d2}
-                        pointpattern.snapped_coordinates[pt_index] = (x,y)
-                        break
+        edges = list(self.edges)
+        locator = PackedSegmentLocator(
+            [self.node_coords[e[0]] + self.node_coords[e[1]] for e in edges])
+        pt_indices = list(pointpattern.points.iterkeys())
+        points = [pointpattern.points[pt_index]['coordinates'][:2]
+                  for pt_index in pt_indices]
+        nearest, dists, coords = locator.snap(points)
+
+        for pt_index, i, (x, y) in zip(pt_indices, nearest, coords.tolist()):
+            if i < 0:
+                continue
+            edge = edges[i]
+            #Compute the distance from the new point to the nodes
+            d1, d2 = self.compute_distance_to_nodes(x, y, edge)
+            obs_to_edge.setdefault(edge, {})[pt_index] = (x, y)
+            dist_to_node[pt_index] = {edge[0]:d1, edge[1]:d2}
+            pointpattern.snapped_coordinates[pt_index] = (x, y)
 
         obs_to_node = defaultdict(list)
         for k, v in obs_to_edge.iteritems():
@@ -1154,14 +1091,3 @@ class SimulatedPointPattern():
         self.obs_to_node = defaultdict(list)
         self.dist_to_node = {}
         self.snapped_coordinates = {}
-
-
-class SortedEdges(OrderedDict):
-    def next_key(self, key):
-        next = self._OrderedDict__map[key][1]
-        if next is self._OrderedDict__root:
-            raise ValueError("{!r} is the last key.".format(key))
-        return next[2]
-    def first_key(self):
-        for key in self: return key
-        raise ValueError("No sorted edges remain.")
@@ -568,25 +568,19 @@ def modified_knox(s_coords, t_coords, delta, tau, permutations=99):
     t = t_coords
     n = len(t)
 
-    # calculate the spatial and temporal distance matrices for the events
-    sdistmat = cg.distance_matrix(s)
-    tdistmat = cg.distance_matrix(t)
-
-    # identify events within thresholds
-    spacmat = np.ones((n, n))
-    spacbin = sdistmat <= delta
-    spacmat = spacmat * spacbin
-    timemat = np.ones((n, n))
-    timebin = tdistmat <= tau
-    timemat = timemat * timebin
+    # identify events within thresholds, keeping only the pairs within
+    # delta and tau of each other in sparse matrices
+    spacbin = cg.distance_matrix(s, max_distance=delta).tocsr()
+    spacbin.data[:] = 1
+    timebin = cg.distance_matrix(t, max_distance=tau).tocsr()
+    timebin.data[:] = 1
 
     # calculate the observed (original) statistic
-    knoxmat = timemat * spacmat
-    obsstat = (knoxmat.sum() - n)
+    obsstat = (spacbin.multiply(timebin).sum() - n)
 
     # calculate the expectated value
-    ssumvec = np.reshape((spacbin.sum(axis=0) - 1), (n, 1))
-    tsumvec = np.reshape((timebin.sum(axis=0) - 1), (n, 1))
+    ssumvec = np.asarray(spacbin.sum(axis=0)).reshape((n, 1)) - 1
+    tsumvec = np.asarray(timebin.sum(axis=0)).reshape((n, 1)) - 1
     expstat = (ssumvec * tsumvec).sum()
 
     # calculate the modified stat
@@ -599,18 +593,13 @@ def modified_knox(s_coords, t_coords, delta, tau, permutations=99):
 
     # loop for generating a random distribution to assess significance
     for p in range(permutations):
-        rtdistmat = util.shuffle_matrix(tdistmat, range(n))
-        timemat = np.ones((n, n))
-        timebin = rtdistmat <= tau
-        timemat = timemat * timebin
+        rtimebin = util.shuffle_matrix(timebin, range(n))
 
         # calculate the observed knox again
-        knoxmat = timemat * spacmat
-        obsstat = (knoxmat.sum() - n)
+        obsstat = (spacbin.multiply(rtimebin).sum() - n)
 
         # calculate the expectated value again
-        ssumvec = np.reshape((spacbin.sum(axis=0) - 1), (n, 1))
-        tsumvec = np.reshape((timebin.sum(axis=0) - 1), (n, 1))
+        tsumvec = np.asarray(rtimebin.sum(axis=0)).reshape((n, 1)) - 1
         expstat = (ssumvec * tsumvec).sum()
 
         # calculate the modified stat
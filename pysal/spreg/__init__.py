@@ -18,3 +18,4 @@ from ml_lag import *
 from ml_lag_regimes import *
 from ml_error import *
 from ml_error_regimes import *
+from impacts import *
@@ -3,13 +3,13 @@ Spatial diagnostics module
 """
 __author__ = "Luc Anselin luc.anselin@asu.edu, Daniel Arribas-Bel darribas@asu.edu"
 
-from utils import spdot
+from utils import spdot, get_spMoments
 from scipy.stats.stats import chisqprob
 from scipy.stats import norm
 import numpy as np
 import numpy.linalg as la
 
-__all__ = ['LMtests', 'MoranRes', 'AKtest']
+__all__ = ['LMtests', 'LMtests_Batch', 'MoranRes', 'AKtest']
 
 
 class LMtests:
@@ -507,8 +507,7 @@ class spDcache:
     @property
     def t(self):
         if 't' not in self._cache:
-            prod = (self.w.sparse.T + self.w.sparse) * self.w.sparse
-            self._cache['t'] = np.sum(prod.diagonal())
+            self._cache['t'] = get_t(self.w)
         return self._cache['t']
 
     @property
@@ -536,6 +535,183 @@ class spDcache:
         return self._cache['AB']
 
 
+class LMtests_Batch:
+
+    """
+    Lagrange Multiplier tests for many OLS models that share the same
+    explanatory variables and spatial weights, as in the screening of
+    several dependent variables (or transformations of one) against a single
+    set of regressors. The OLS fits and the LM tests of Anselin et al. (1996)
+    [1]_ are computed for all the models at once as matrix operations, and
+    the pieces that only depend on X and W (the inverse of X'X, the trace T
+    and, for Moran's I, the moments of MWM) are computed once.
+    ...
+
+    Parameters
+    ----------
+
+    y           : array
+                  nxm array with one dependent variable per column
+    x           : array
+                  nxk array of independent variables shared by all the
+                  models (excluding the constant)
+    w           : W
+                  Spatial weights instance
+    tests       : list
+                  Lists of strings with the tests desired to be performed.
+                  Values may be:
+
+                   * 'all': runs all the LM tests (default)
+                   * 'lme': LM error test
+                   * 'rlme': Robust LM error test
+                   * 'lml' : LM lag test
+                   * 'rlml': Robust LM lag test
+                   * 'sarma': LM SARMA test
+                   * 'moran': Moran's I of the residuals (not included in
+                     'all')
+
+    constant    : boolean
+                  If True, a constant is added to x
+
+    Attributes
+    ----------
+
+    n           : integer
+                  Number of observations
+    k           : integer
+                  Number of variables (including the constant)
+    m           : integer
+                  Number of models
+    betas       : array
+                  kxm array of OLS coefficients, one column per model
+    u           : array
+                  nxm array of residuals
+    sig2n       : array
+                  m array with the sigma squared (computed with n in the
+                  denominator) of each model
+    lme         : array
+                  (Only if 'lme' or 'all' was in tests). mx2 array with the
+                  statistic and p-value of the LM error test of each model.
+    lml         : array
+                  (Only if 'lml' or 'all' was in tests). mx2 array with the
+                  statistic and p-value of the LM lag test of each model.
+    rlme        : array
+                  (Only if 'rlme' or 'all' was in tests). mx2 array with the
+                  statistic and p-value of the Robust LM error test of each
+                  model.
+    rlml        : array
+                  (Only if 'rlml' or 'all' was in tests). mx2 array with the
+                  statistic and p-value of the Robust LM lag test of each
+                  model.
+    sarma       : array
+                  (Only if 'sarma' or 'all' was in tests). mx2 array with the
+                  statistic and p-value of the SARMA test of each model.
+    moran_res   : array
+                  (Only if 'moran' was in tests). mx3 array with Moran's I,
+                  its standardized value and p-value for each model. The
+                  mean and variance of I only depend on X and W and are
+                  shared by all the models.
+
+    References
+    ----------
+    .. [1] Anselin, L., Bera, A. K., Florax, R., Yoon, M. J. (1996) "Simple
+       diagnostic tests for spatial dependence". Regional Science and Urban
+       Economics, 26, 77-104.
+
+    Examples
+    --------
+
+    >>> import numpy as np
+    >>> import pysal
+    >>> csv = pysal.open(pysal.examples.get_path('columbus.dbf'),'r')
+    >>> y = np.array([csv.by_col('HOVAL'), csv.by_col('DISCBD')]).T
+    >>> x = np.array([csv.by_col('INC'), csv.by_col('CRIME')]).T
+    >>> w = pysal.open(pysal.examples.get_path('columbus.gal'), 'r').read()
+    >>> w.transform='r'
+
+    Run the LM tests of the two models (one per column of y) at once
+
+    >>> lms = LMtests_Batch(y, x, w)
+
+    LM error test, one row per model:
+
+    >>> print np.around(lms.lme[0], 4)
+    [ 3.0971  0.0784]
+
+    LM SARMA test:
+
+    >>> print np.around(lms.sarma[0], 4)
+    [ 4.1907  0.123 ]
+
+    The results match those of LMtests on each model
+
+    >>> from ols import OLS
+    >>> ols = OLS(y[:, 1:2], x)
+    >>> lm = LMtests(ols, w)
+    >>> np.allclose(lms.rlml[1], lm.rlml)
+    True
+
+    """
+
+    def __init__(self, y, x, w, tests=['all'], constant=True):
+        y = np.asarray(y, dtype=float)
+        if y.ndim == 1:
+            y = y.reshape((-1, 1))
+        x = np.asarray(x, dtype=float)
+        if constant:
+            x = np.hstack((np.ones((x.shape[0], 1)), x))
+        self.y, self.x = y, x
+        self.n, self.k = x.shape
+        self.m = y.shape[1]
+        self.xtxi = la.inv(np.dot(x.T, x))
+        self.betas = np.dot(self.xtxi, np.dot(x.T, y))
+        self.predy = np.dot(x, self.betas)
+        self.u = y - self.predy
+        self.utu = np.sum(self.u ** 2, axis=0)
+        self.sig2n = self.utu / self.n
+        if tests == ['all']:
+            tests = ['lme', 'lml', 'rlme', 'rlml', 'sarma']
+        cache = spDcache(self, w)
+        t = cache.t
+        ws = w.sparse
+        wu = ws * self.u
+        utwuDs = np.sum(self.u * wu, axis=0) / self.sig2n
+        if set(tests) - set(['lme', 'moran']):
+            utwyDs = np.sum(self.u * (ws * y), axis=0) / self.sig2n
+            # j for all models: [(WXb)'M(WXb) + T sig2n] / (n sig2n)
+            wxb = ws * self.predy
+            xwxb = np.dot(x.T, wxb)
+            num = np.sum(wxb ** 2, axis=0) - \
+                np.sum(xwxb * np.dot(self.xtxi, xwxb), axis=0)
+            nj = (num + t * self.sig2n) / self.sig2n
+        if 'lme' in tests:
+            self.lme = _lm_pairs(utwuDs ** 2 / t, 1)
+        if 'lml' in tests:
+            self.lml = _lm_pairs(utwyDs ** 2 / nj, 1)
+        if 'rlme' in tests:
+            num = (utwuDs - (t * utwyDs) / nj) ** 2
+            self.rlme = _lm_pairs(num / (t * (1. - t / nj)), 1)
+        if 'rlml' in tests:
+            self.rlml = _lm_pairs((utwyDs - utwuDs) ** 2 / (nj - t), 1)
+        if 'sarma' in tests:
+            lm = (utwyDs - utwuDs) ** 2 / (nj - t) + utwuDs ** 2 / t
+            self.sarma = _lm_pairs(lm, 2)
+        if 'moran' in tests:
+            mi = (w.n * np.sum(self.u * wu, axis=0)) / (w.s0 * self.utu)
+            ei = get_eI(self, w, cache)
+            vi = get_vI(self, w, ei, cache)
+            zi, pval = get_zI(mi, ei, vi)
+            self.moran_res = np.vstack((mi, zi, pval)).T
+
+
+def _lm_pairs(lm, df):
+    """
+    Stacks the m statistics in lm with their chi-squared p-values into an
+    mx2 array
+    """
+    return np.vstack((lm, chisqprob(lm, df))).T
+
+
 def lmErr(reg, w, spDcache):
     """
     LM error test. Implemented as presented in eq. (9) of Anselin et al.
@@ -710,6 +886,16 @@ def lmSarma(ols, w, spDcache):
     return (lm[0][0], pval[0][0])
 
 
+def get_t(w):
+    """
+    Trace term T = tr[(W' + W) W] of the LM tests. It only depends on W and
+    is cached with its sparse matrix, so it is computed once for all the
+    models and diagnostics that use the same weights.
+    """
+    mw = get_spMoments(w.sparse)
+    return mw.cached('lm_t', lambda: mw.trWtW + mw.trace(w.sparse, w.sparse))
+
+
 def get_mI(reg, w, spDcache):
     """
     Moran's I statistic of spatial autocorrelation as showed in Cliff & Ord
@@ -12,7 +12,7 @@ import ols as OLS
 from pysal import lag_spatial
 from utils import power_expansion, set_endog, iter_msg, sp_att
 from utils import get_A1_hom, get_A2_hom, get_A1_het, optim_moments, get_spFilter, get_lags, _moments2eqs
-from utils import spdot, RegressionPropsY, set_warn
+from utils import spdot, RegressionPropsY, set_warn, get_spMoments
 import twosls as TSLS
 import user_output as USER
 import summary_output as SUMMARY
@@ -1101,8 +1101,7 @@ def _momentsGM_Error(w, u):
     uwwu = np.dot(u.T, wwu)
     wwu2 = np.dot(wwu.T, wwu)
     wuwwu = np.dot(wu.T, wwu)
-    wtw = wsparse.T * wsparse
-    trWtW = np.sum(wtw.diagonal())
+    trWtW = get_spMoments(wsparse).trWtW
     g = np.array([[u2[0][0], wu2[0][0], uwu[0][0]]]).T / n
     G = np.array(
         [[2 * uwu[0][0], -wu2[0][0], n], [2 * wuwwu[0][0], -wwu2[0][0], trWtW],
@@ -121,7 +121,7 @@ class BaseGM_Error_Het(RegressionPropsY):
         # 1a. OLS --> \tilde{betas}
         ols = OLS.BaseOLS(y=y, x=x)
         self.x, self.y, self.n, self.k, self.xtx = ols.x, ols.y, ols.n, ols.k, ols.xtx
-        wA1 = UTILS.get_A1_het(w)
+        wA1 = UTILS.get_spMoments(w).A1_het
 
         # 1b. GMM --> \tilde{\lambda1}
         moments = UTILS._moments2eqs(wA1, w, ols.u)
@@ -403,6 +403,8 @@ class BaseGM_Endog_Error_Het(RegressionPropsY):
                    If "power_exp", then compute inverse using the power
                    expansion. If "true_inv", then compute the true inverse.
                    Note that true_inv will fail for large n.
+                   "splu", "gmres" and "bicgstab" use sparse solvers for
+                   (I - lambda W) (see utils.inverse_prod).
 
 
     Attributes
@@ -496,7 +498,7 @@ class BaseGM_Endog_Error_Het(RegressionPropsY):
         tsls = TSLS.BaseTSLS(y=y, x=x, yend=yend, q=q)
         self.x, self.z, self.h, self.y = tsls.x, tsls.z, tsls.h, tsls.y
         self.yend, self.q, self.n, self.k, self.hth = tsls.yend, tsls.q, tsls.n, tsls.k, tsls.hth
-        wA1 = UTILS.get_A1_het(w)
+        wA1 = UTILS.get_spMoments(w).A1_het
 
         # 1b. GMM --> \tilde{\lambda1}
         moments = UTILS._moments2eqs(wA1, w, tsls.u)
@@ -580,6 +582,8 @@ class GM_Endog_Error_Het(BaseGM_Endog_Error_Het):
                    If "power_exp", then compute inverse using the power
                    expansion. If "true_inv", then compute the true inverse.
                    Note that true_inv will fail for large n.
+                   "splu", "gmres" and "bicgstab" use sparse solvers for
+                   (I - lambda W) (see utils.inverse_prod).
     vm           : boolean
                    If True, include variance-covariance matrix in summary
                    results
@@ -844,6 +848,8 @@ class BaseGM_Combo_Het(BaseGM_Endog_Error_Het):
                    If "power_exp", then compute inverse using the power
                    expansion. If "true_inv", then compute the true inverse.
                    Note that true_inv will fail for large n.
+                   "splu", "gmres" and "bicgstab" use sparse solvers for
+                   (I - lambda W) (see utils.inverse_prod).
 
 
     Attributes
@@ -1001,6 +1007,8 @@ class GM_Combo_Het(BaseGM_Combo_Het):
                    If "power_exp", then compute inverse using the power
                    expansion. If "true_inv", then compute the true inverse.
                    Note that true_inv will fail for large n.
+                   "splu", "gmres" and "bicgstab" use sparse solvers for
+                   (I - lambda W) (see utils.inverse_prod).
     vm           : boolean
                    If True, include variance-covariance matrix in summary
                    results
@@ -1312,13 +1320,15 @@ def get_vc_het(w, wA1, E):
     592-614.
 
     """
-    aPatE = 2 * wA1 * E
-    wPwtE = (w + w.T) * E
-
-    psi11 = aPatE * aPatE
-    psi12 = aPatE * wPwtE
-    psi22 = wPwtE * wPwtE
-    psi = map(np.sum, [psi11.diagonal(), psi12.diagonal(), psi22.diagonal()])
+    # tr(A E B E) = e' (A o B') e, with the Hadamard products cached per W
+    mw = UTILS.get_spMoments(w)
+    e = np.array([E.diagonal()]).T
+    wpwt = mw.wpwt
+
+    psi11 = 4. * np.dot(e.T, mw.hadamard(wA1, wA1) * e)
+    psi12 = 2. * np.dot(e.T, mw.hadamard(wA1, wpwt) * e)
+    psi22 = np.dot(e.T, mw.hadamard(wpwt, wpwt) * e)
+    psi = [psi11[0][0], psi12[0][0], psi22[0][0]]
     return np.array([[psi[0], psi[1]], [psi[1], psi[2]]]) / (2. * w.shape[0])
 
 
@@ -1418,7 +1428,8 @@ def get_a1a2(w, wA1, reg, lambdapar, P, zs, inv_method, filt):
     """
     us = UTILS.get_spFilter(w, lambdapar, reg.u)
     alpha1 = (-2.0 / w.shape[0]) * (np.dot(spdot(zs.T, wA1), us))
-    alpha2 = (-1.0 / w.shape[0]) * (np.dot(spdot(zs.T, (w + w.T)), us))
+    wpwt = UTILS.get_spMoments(w).wpwt
+    alpha2 = (-1.0 / w.shape[0]) * (np.dot(spdot(zs.T, wpwt), us))
     a1 = np.dot(spdot(reg.h, P), alpha1)
     a2 = np.dot(spdot(reg.h, P), alpha2)
     if not filt:
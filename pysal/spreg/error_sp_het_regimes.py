@@ -330,7 +330,7 @@ class GM_Error_Het_Regimes(RegressionPropsY, REGI.Regimes_Frame):
                                                               regimes, constant_regi=None, cols2regi=cols2regi, names=name_x)
             ols = BaseOLS(y=y, x=self.x)
             self.k = ols.x.shape[1]
-            wA1 = UTILS.get_A1_het(w.sparse)
+            wA1 = UTILS.get_spMoments(w.sparse).A1_het
 
             # 1b. GMM --> \tilde{\lambda1}
             moments = UTILS._moments2eqs(wA1, w.sparse, ols.u)
@@ -511,6 +511,8 @@ class GM_Endog_Error_Het_Regimes(RegressionPropsY, REGI.Regimes_Frame):
                    If "power_exp", then compute inverse using the power
                    expansion. If "true_inv", then compute the true inverse.
                    Note that true_inv will fail for large n.
+                   "splu", "gmres" and "bicgstab" use sparse solvers for
+                   (I - lambda W) (see utils.inverse_prod).
     vm           : boolean
                    If True, include variance-covariance matrix in summary
                    results
@@ -836,7 +838,7 @@ class GM_Endog_Error_Het_Regimes(RegressionPropsY, REGI.Regimes_Frame):
             self.k = tsls.z.shape[1]
             self.x = tsls.x
             self.yend, self.z, self.h = tsls.yend, tsls.z, tsls.h
-            wA1 = UTILS.get_A1_het(w.sparse)
+            wA1 = UTILS.get_spMoments(w.sparse).A1_het
 
             # 1b. GMM --> \tilde{\lambda1}
             moments = UTILS._moments2eqs(wA1, w.sparse, tsls.u)
@@ -1057,6 +1059,8 @@ class GM_Combo_Het_Regimes(GM_Endog_Error_Het_Regimes):
                    If "power_exp", then compute inverse using the power
                    expansion. If "true_inv", then compute the true inverse.
                    Note that true_inv will fail for large n.
+                   "splu", "gmres" and "bicgstab" use sparse solvers for
+                   (I - lambda W) (see utils.inverse_prod).
     vm           : boolean
                    If True, include variance-covariance matrix in summary
                    results
@@ -22,7 +22,7 @@ from pysal import lag_spatial
 from utils import power_expansion, set_endog, iter_msg, sp_att
 from utils import get_A1_hom, get_A2_hom, get_A1_het, optim_moments
 from utils import get_spFilter, get_lags, _moments2eqs
-from utils import spdot, RegressionPropsY, set_warn
+from utils import spdot, RegressionPropsY, set_warn, get_spMoments
 import twosls as TSLS
 import user_output as USER
 import summary_output as SUMMARY
@@ -137,14 +137,9 @@ class BaseGM_Error_Hom(RegressionPropsY):
 
     def __init__(self, y, x, w,
                  max_iter=1, epsilon=0.00001, A1='hom_sc'):
-        if A1 == 'hom':
-            wA1 = get_A1_hom(w)
-        elif A1 == 'hom_sc':
-            wA1 = get_A1_hom(w, scalarKP=True)
-        elif A1 == 'het':
-            wA1 = get_A1_het(w)
-
-        wA2 = get_A2_hom(w)
+        mw = get_spMoments(w)
+        wA1 = mw.A1(A1)
+        wA2 = mw.A2_hom
 
         # 1a. OLS --> \tilde{\delta}
         ols = OLS.BaseOLS(y=y, x=x)
@@ -510,14 +505,9 @@ class BaseGM_Endog_Error_Hom(RegressionPropsY):
     def __init__(self, y, x, yend, q, w,
                  max_iter=1, epsilon=0.00001, A1='hom_sc'):
 
-        if A1 == 'hom':
-            wA1 = get_A1_hom(w)
-        elif A1 == 'hom_sc':
-            wA1 = get_A1_hom(w, scalarKP=True)
-        elif A1 == 'het':
-            wA1 = get_A1_het(w)
-
-        wA2 = get_A2_hom(w)
+        mw = get_spMoments(w)
+        wA1 = mw.A1(A1)
+        wA2 = mw.A2_hom
 
         # 1a. S2SLS --> \tilde{\delta}
         tsls = TSLS.BaseTSLS(y=y, x=x, yend=yend, q=q)
@@ -1358,13 +1348,11 @@ def get_vc_hom(w, wA1, wA2, reg, lambdapar, z_s=None, for_omegaOLS=False):
     mu3 = np.sum(u_s ** 3) / n
     mu4 = np.sum(u_s ** 4) / n
 
-    tr11 = wA1 * wA1
-    tr11 = np.sum(tr11.diagonal())
-    tr12 = wA1 * (wA2 * 2)
-    tr12 = np.sum(tr12.diagonal())
-    tr22 = wA2 * wA2 * 2
-    tr22 = np.sum(tr22.diagonal())
-    vecd1 = np.array([wA1.diagonal()]).T
+    mw = get_spMoments(w)
+    tr11 = mw.trace(wA1, wA1)
+    tr12 = 2 * mw.trace(wA1, wA2)
+    tr22 = 2 * mw.trace(wA2, wA2)
+    vecd1 = mw.diagonal(wA1)
 
     psi11 = 2 * sig2 ** 2 * tr11 + \
         (mu4 - 3 * sig2 ** 2) * np.dot(vecd1.T, vecd1)
@@ -1441,7 +1429,7 @@ def get_omega_hom(w, wA1, wA2, reg, lamb, G):
     u_s = get_spFilter(w, lamb, reg.u)
     sig2 = np.dot(u_s.T, u_s) / n
     mu3 = np.sum(u_s ** 3) / n
-    vecdA1 = np.array([wA1.diagonal()]).T
+    vecdA1 = get_spMoments(w).diagonal(wA1)
     psi, a1, a2, p = get_vc_hom(w, wA1, wA2, reg, lamb, z_s)
     j = np.dot(G, np.array([[1.], [2 * lamb]]))
     psii = la.inv(psi)
@@ -1493,7 +1481,7 @@ def get_omega_hom_ols(w, wA1, wA2, reg, lamb, G):
     x_s = get_spFilter(w, lamb, reg.x)
     u_s = get_spFilter(w, lamb, reg.u)
     sig2 = np.dot(u_s.T, u_s) / n
-    vecdA1 = np.array([wA1.diagonal()]).T
+    vecdA1 = get_spMoments(w).diagonal(wA1)
     psi, a1, a2, p = get_vc_hom(w, wA1, wA2, reg, lamb, for_omegaOLS=True)
     j = np.dot(G, np.array([[1.], [2 * lamb]]))
     psii = la.inv(psi)
@@ -12,7 +12,7 @@ from pysal import lag_spatial
 from utils import power_expansion, set_endog, iter_msg, sp_att
 from utils import get_A1_hom, get_A2_hom, get_A1_het, optim_moments
 from utils import get_spFilter, get_lags, _moments2eqs
-from utils import spdot, RegressionPropsY, set_warn
+from utils import spdot, RegressionPropsY, set_warn, get_spMoments
 from ols import BaseOLS
 from twosls import BaseTSLS
 from error_sp_hom import BaseGM_Error_Hom, BaseGM_Endog_Error_Hom, moments_hom, get_vc_hom, get_omega_hom, get_omega_hom_ols
@@ -341,14 +341,9 @@ class GM_Error_Hom_Regimes(RegressionPropsY, REGI.Regimes_Frame):
             else:
                 raise Exception, "All coefficients must vary accross regimes if regime_err_sep = True."
         else:
-            if A1 == 'hom':
-                wA1 = get_A1_hom(w.sparse)
-            elif A1 == 'hom_sc':
-                wA1 = get_A1_hom(w.sparse, scalarKP=True)
-            elif A1 == 'het':
-                wA1 = get_A1_het(w.sparse)
-
-            wA2 = get_A2_hom(w.sparse)
+            mw = get_spMoments(w.sparse)
+            wA1 = mw.A1(A1)
+            wA2 = mw.A2_hom
 
             # 1a. OLS --> \tilde{\delta}
             self.x, self.name_x = REGI.Regimes_Frame.__init__(self, x_constant,
@@ -849,14 +844,9 @@ class GM_Endog_Error_Hom_Regimes(RegressionPropsY, REGI.Regimes_Frame):
                                                            regimes, constant_regi=None,
                                                            cols2regi=cols2regi, yend=True, names=name_yend)
 
-            if A1 == 'hom':
-                wA1 = get_A1_hom(w.sparse)
-            elif A1 == 'hom_sc':
-                wA1 = get_A1_hom(w.sparse, scalarKP=True)
-            elif A1 == 'het':
-                wA1 = get_A1_het(w.sparse)
-
-            wA2 = get_A2_hom(w.sparse)
+            mw = get_spMoments(w.sparse)
+            wA1 = mw.A1(A1)
+            wA2 = mw.A2_hom
 
             # 1a. S2SLS --> \tilde{\delta}
             tsls = BaseTSLS(y=y, x=x, yend=yend2, q=q)
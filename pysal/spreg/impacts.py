@@ -0,0 +1,347 @@
+"""
+Direct, indirect and total impacts for spatial lag models
+"""
+
+import hashlib
+from warnings import warn
+import numpy as np
+from scipy.stats import norm
+from utils import get_spMoments
+import regimes as REGI
+
+__all__ = ["Impacts"]
+
+
+class Impacts:
+
+    """
+    Average direct, indirect and total impacts of the explanatory variables
+    in a spatial lag model, as in LeSage and Pace (2009) [1]_. The impacts of
+    variable k are the averages of the elements of
+
+    .. math::
+
+        S_k(W) = (I - \\rho W)^{-1} \\beta_k
+
+    which are computed from the power series of W, using exact traces for the
+    first powers and stochastic estimates for the rest [1]_ (p. 114). The
+    series only depend on W and are cached with it, so the impacts of any
+    number of models, and the simulation draws used for inference, never
+    form (I - \\rho W)^{-1}. Inference is based on draws of the coefficients
+    from a multivariate normal with the estimated variance-covariance matrix.
+    ...
+
+    Parameters
+    ----------
+    reg          : regression object
+                   Output instance from ML_Lag, GM_Lag, ML_Lag_Regimes or
+                   GM_Lag_Regimes
+    w            : pysal W object
+                   Spatial weights object used in the estimation of reg
+    ndraws       : integer
+                   Number of draws used in the simulation-based inference
+    max_power    : integer
+                   Highest power of W used in the series
+    ntraces      : integer
+                   Number of random vectors used in the stochastic estimation
+                   of the traces
+    seed         : integer
+                   Seed for the random numbers of the stochastic traces and
+                   of the simulation draws
+
+    Attributes
+    ----------
+    name         : list
+                   Names of the variables with impacts (all coefficients
+                   except the constant and the spatial lag)
+    direct       : array
+                   kx1 array of average direct impacts
+    indirect     : array
+                   kx1 array of average indirect impacts
+    total        : array
+                   kx1 array of average total impacts
+    direct_sd    : array
+                   kx1 array with the standard deviation of the simulated
+                   direct impacts
+    indirect_sd  : array
+                   kx1 array with the standard deviation of the simulated
+                   indirect impacts
+    total_sd     : array
+                   kx1 array with the standard deviation of the simulated
+                   total impacts
+    direct_z_stat: list of tuples
+                   z statistic; each tuple contains the pair (statistic,
+                   p-value), where each is a float
+    indirect_z_stat: list of tuples
+                   z statistic; each tuple contains the pair (statistic,
+                   p-value), where each is a float
+    total_z_stat : list of tuples
+                   z statistic; each tuple contains the pair (statistic,
+                   p-value), where each is a float
+    discarded    : integer
+                   Number of simulation draws dropped because their spatial
+                   autoregressive parameter was outside (-1, 1)
+    summary      : string
+                   Summary table of the impacts
+
+    Notes
+    -----
+    For models with regimes, the impacts of a regime-specific coefficient
+    correspond to a change of the variable in the observations of that
+    regime, averaged over all observations. If the spatial lag also varies
+    by regime (regime_lag_sep=True), the impacts are computed separately for
+    each regime with its own subset of W.
+
+    References
+    ----------
+
+    .. [1] LeSage, J., Pace, R. K. (2009) "Introduction to Spatial
+    Econometrics". CRC Press. Boca Raton.
+
+    Examples
+    --------
+
+    >>> import numpy as np
+    >>> import pysal
+    >>> db = pysal.open(pysal.examples.get_path("baltim.dbf"),'r')
+    >>> y = np.array(db.by_col("PRICE")).T
+    >>> y.shape = (len(y),1)
+    >>> x = np.array([db.by_col(var) for var in ["NROOM","AGE","SQFT"]]).T
+    >>> w = pysal.open(pysal.examples.get_path("baltim_q.gal")).read()
+    >>> w.transform = 'r'
+    >>> reg = pysal.spreg.ML_Lag(y, x, w, name_x=["NROOM","AGE","SQFT"])
+    >>> imp = Impacts(reg, w)
+    >>> imp.name
+    ['NROOM', 'AGE', 'SQFT']
+
+    For a row-standardized W the total impact is beta / (1 - rho)
+
+    >>> np.allclose(imp.total, reg.betas[1:-1] / (1 - reg.rho))
+    True
+    >>> np.allclose(imp.direct + imp.indirect, imp.total)
+    True
+    >>> print np.around(imp.direct, 4)
+    [[ 3.8623]
+     [-0.2225]
+     [ 0.7245]]
+
+    """
+
+    def __init__(self, reg, w, ndraws=1000, max_power=100, ntraces=50,
+                 seed=12345):
+        self.name = []
+        self.discarded = 0
+        point, sds = [], []
+        try:
+            multi = reg.multi
+        except AttributeError:
+            multi = None
+        if multi:
+            w_i = None
+            for r in reg.regimes_set:
+                w_r = getattr(multi[r], 'w', None)
+                if w_r is None:
+                    if w_i is None:
+                        w_i = REGI.w_regimes(w, reg.regimes, reg.regimes_set,
+                                             transform=True)[0]
+                    w_r = w_i[r]
+                self._add(multi[r], w_r, None, ndraws, max_power, ntraces,
+                          seed, point, sds)
+        else:
+            if getattr(reg, 'regime_lag_sep', False):
+                raise Exception, "Impacts are not available for models with a spatial lag by regimes that are not estimated separately by regime."
+            self._add(reg, w, getattr(reg, 'regimes', None), ndraws,
+                      max_power, ntraces, seed, point, sds)
+        point = np.vstack(point)
+        sd = np.vstack(sds)
+        self.direct, self.indirect, self.total = [
+            point[:, i:i + 1] for i in range(3)]
+        self.direct_sd, self.indirect_sd, self.total_sd = [
+            sd[:, i:i + 1] for i in range(3)]
+        self.direct_z_stat = _z_stat(self.direct, self.direct_sd)
+        self.indirect_z_stat = _z_stat(self.indirect, self.indirect_sd)
+        self.total_z_stat = _z_stat(self.total, self.total_sd)
+        if self.discarded:
+            warn("%d of the simulation draws had a spatial autoregressive parameter outside (-1, 1) and were discarded." % self.discarded, RuntimeWarning)
+        self._cache = {}
+
+    def _add(self, reg, w, regimes, ndraws, max_power, ntraces, seed,
+             point, sds):
+        """
+        Appends the point estimates and the standard deviations of the
+        simulated impacts of one model with a single spatial autoregressive
+        parameter (the last coefficient). Each model keeps its own number of
+        draws inside (-1, 1).
+        """
+        try:
+            names = reg.name_z
+        except AttributeError:
+            names = reg.name_x
+        idx = [i for i, name in enumerate(names[:-1])
+               if name != 'CONSTANT' and not name.endswith('_CONSTANT')]
+        self.name.extend([names[i] for i in idx])
+        n = w.n
+        selectors = np.ones((n, len(idx)), float)
+        if regimes is not None:
+            regimes = np.array(regimes)
+            for j, i in enumerate(idx):
+                for r in reg.regimes_set:
+                    if names[i].startswith('%s_' % str(r)):
+                        selectors[:, j] = regimes == r
+                        break
+        a, b = trace_series(w, selectors, max_power=max_power,
+                            ntraces=ntraces, seed=seed)
+        betas = reg.betas.flatten()
+        point.append(_impacts(betas[idx], betas[-1], a, b))
+
+        cols = idx + [len(betas) - 1]
+        vm = reg.vm[cols][:, cols]
+        rng = np.random.RandomState(seed)
+        draws = rng.multivariate_normal(betas[cols], vm, ndraws)
+        inside = np.abs(draws[:, -1]) < 1
+        self.discarded += int(ndraws - inside.sum())
+        draws = draws[inside]
+        sim = np.zeros((len(idx), 3, draws.shape[0]), float)
+        for d in range(draws.shape[0]):
+            sim[:, :, d] = _impacts(draws[d, :-1], draws[d, -1], a, b)
+        sds.append(sim.std(axis=2, ddof=1))
+
+    @property
+    def summary(self):
+        if 'summary' not in self._cache:
+            strSummary = "DIRECT, INDIRECT AND TOTAL IMPACTS\n"
+            strSummary += "-" * 34 + "\n"
+            for label, est, sd, z_stat in [
+                    ('Direct', self.direct, self.direct_sd,
+                     self.direct_z_stat),
+                    ('Indirect', self.indirect, self.indirect_sd,
+                     self.indirect_z_stat),
+                    ('Total', self.total, self.total_sd, self.total_z_stat)]:
+                strSummary += "%20s    %12s    %12s    %12s    %12s\n" % (
+                    label, 'Impact', 'Std.Dev.', 'z-Statistic', 'Probability')
+                for i, name in enumerate(self.name):
+                    strSummary += "%20s    %12.7f    %12.7f    %12.7f    %12.7f\n" % (
+                        name, est[i][0], sd[i][0], z_stat[i][0], z_stat[i][1])
+                strSummary += "\n"
+            if self.discarded:
+                strSummary += "Warning: %d simulation draws with the spatial autoregressive parameter\noutside (-1, 1) were discarded.\n" % self.discarded
+            self._cache['summary'] = strSummary
+        return self._cache['summary']
+
+
+def trace_series(w, selectors=None, max_power=100, ntraces=50, seed=12345):
+    """
+    Coefficients of the power series of the average direct and total impacts
+
+    .. math::
+
+        a_j(d) = n^{-1} tr(D W^j), \\quad b_j(d) = n^{-1} \\iota' W^j d
+
+    for j=0, ..., max_power and each selector vector d (D=diag(d)). The
+    traces are exact for j <= 2 and estimated stochastically for higher
+    powers as n^{-1} E[(d u)' W^j u], with u a vector of random signs. The
+    results are cached with W.
+    ...
+
+    Parameters
+    ----------
+    w           : pysal W object or csr_matrix
+                  Spatial weights
+    selectors   : array
+                  nxs array with one selector vector per column (ones for
+                  variables that apply to all observations). Defaults to a
+                  single vector of ones.
+    max_power   : integer
+                  Highest power of W in the series
+    ntraces     : integer
+                  Number of random vectors in the stochastic estimation
+    seed        : integer
+                  Seed for the random vectors
+
+    Returns
+    -------
+    a, b        : arrays
+                  sx(max_power+1) arrays with the coefficients of the direct
+                  and total series, respectively
+
+    Examples
+    --------
+
+    >>> import pysal
+    >>> w = pysal.lat2W(10, 10)
+    >>> w.transform = 'r'
+    >>> a, b = trace_series(w, max_power=10)
+    >>> wf = w.full()[0]
+    >>> np.allclose(a[0, :3], [1., 0., np.trace(np.dot(wf, wf)) / 100.])
+    True
+    >>> np.allclose(b, 1.)
+    True
+
+    """
+    try:
+        ws = w.sparse
+    except AttributeError:
+        ws = w
+    n = ws.shape[0]
+    if selectors is None:
+        selectors = np.ones((n, 1), float)
+    selectors = np.asarray(selectors, dtype=float).reshape((n, -1))
+    key = ('trace_series', max_power, ntraces, seed,
+           hashlib.sha1(np.ascontiguousarray(selectors)).hexdigest())
+
+    def builder():
+        s = selectors.shape[1]
+        a = np.zeros((s, max_power + 1), float)
+        b = np.zeros((s, max_power + 1), float)
+        # total impacts: b_j = iota' W^j d / n
+        v = selectors.copy()
+        b[:, 0] = v.sum(axis=0)
+        for j in range(1, max_power + 1):
+            v = ws * v
+            b[:, j] = v.sum(axis=0)
+        # direct impacts: exact for j <= 2
+        a[:, 0] = selectors.sum(axis=0)
+        if max_power >= 1:
+            a[:, 1] = np.dot(ws.diagonal(), selectors)
+        if max_power >= 2:
+            d2 = np.asarray(ws.multiply(ws.T).sum(axis=1)).flatten()
+            a[:, 2] = np.dot(d2, selectors)
+        if max_power >= 3:
+            rng = np.random.RandomState(seed)
+            u = rng.randint(0, 2, (n, ntraces)) * 2. - 1.
+            wu = ws * (ws * u)
+            for j in range(3, max_power + 1):
+                wu = ws * wu
+                a[:, j] = np.dot(selectors.T, (u * wu).sum(axis=1)) / ntraces
+        return a / n, b / n
+
+    return get_spMoments(ws).cached(key, builder)
+
+
+def _impacts(betas, rho, a, b):
+    """
+    Returns a kx3 array with the direct, indirect and total impacts for the
+    coefficients betas and spatial parameter rho, given the series from
+    trace_series
+    """
+    powers = rho ** np.arange(a.shape[1])
+    direct = betas * np.dot(a, powers)
+    total = betas * np.dot(b, powers)
+    return np.vstack((direct, total - direct, total)).T
+
+
+def _z_stat(est, sd):
+    z = est / sd
+    p = 2.0 * norm.sf(np.abs(z))
+    return zip(z.flatten(), p.flatten())
+
+
+def _test():
+    import doctest
+    start_suppress = np.get_printoptions()['suppress']
+    np.set_printoptions(suppress=True)
+    doctest.testmod()
+    np.set_printoptions(suppress=start_suppress)
+
+if __name__ == '__main__':
+    _test()
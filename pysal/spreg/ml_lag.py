@@ -8,6 +8,7 @@ import numpy as np
 import numpy.linalg as la
 import pysal as ps
 from pysal.spreg.utils import RegressionPropsY, RegressionPropsVM, inverse_prod
+from pysal.spreg.utils import _inv_method
 from utils import spdot
 import diagnostics as DIAG
 import user_output as USER
@@ -234,7 +235,8 @@ class BaseML_Lag(RegressionPropsY, RegressionPropsVM):
         xb = spdot(x, b)
 
         self.predy_e = inverse_prod(
-            w.sparse, xb, self.rho, inv_method="power_exp", threshold=epsilon)
+            w.sparse, xb, self.rho, inv_method=_inv_method(self.rho),
+            threshold=epsilon)
         self.e_pred = self.y - self.predy_e
 
         # residual variance
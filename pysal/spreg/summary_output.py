@@ -23,9 +23,247 @@ __all__ = []
 This section contains one function for each user level regression class. These
 are called directly from the user class. Each one mixes and matches smaller
 functions located later in this module.
+
+Except for Probit, calling them only registers the work on the regression
+object (see _deferred): diagnostics and summary are computed the first time
+one of the attributes they produce is requested, from the weights and
+arguments as they were when the model was fitted. compute_summary computes
+all of them, or a subset, right away.
 """
 
+_PRIMARY = {}
+
+
+def _setter(attr, func, **kwargs):
+    """
+    Single diagnostic: sets attr in reg to func(reg, **kwargs)
+    """
+    def single(reg, w):
+        setattr(reg, attr, func(reg, **kwargs))
+    return single
+
+
+def _sig2ML(reg, w):
+    reg.sig2ML = reg.sig2n
+
+
+def _lm_tests(reg, w):
+    lm_tests = diagnostics_sp.LMtests(reg, w)
+    reg.lm_error = lm_tests.lme
+    reg.lm_lag = lm_tests.lml
+    reg.rlm_error = lm_tests.rlme
+    reg.rlm_lag = lm_tests.rlml
+    reg.lm_sarma = lm_tests.sarma
+
+
+def _moran_res(reg, w):
+    moran_res = diagnostics_sp.MoranRes(reg, w, z=True)
+    reg.moran_res = moran_res.I, moran_res.zI, moran_res.p_norm
+
+
+def _ak_test(reg, w):
+    cache = diagnostics_sp.spDcache(reg, w)
+    mi, ak, ak_p = diagnostics_sp.akTest(reg, w, cache)
+    reg.ak_test = ak, ak_p
+
 
+# Diagnostics that can be computed one at a time, without running the full
+# battery and building the summary: {attribute: single(reg, w)}
+_BETA_OLS = {'std_err': _setter('std_err', diagnostics.se_betas),
+             't_stat': _setter('t_stat', diagnostics.t_stat),
+             'r2': _setter('r2', diagnostics.r2),
+             'ar2': _setter('ar2', diagnostics.ar2)}
+_BETA = {'std_err': _setter('std_err', diagnostics.se_betas),
+         'z_stat': _setter('z_stat', diagnostics.t_stat, z_stat=True),
+         'pr2': _setter('pr2', diagnostics_tsls.pr2_aspatial)}
+_NONSPAT_OLS = {'sig2ML': _sig2ML,
+                'f_stat': _setter('f_stat', diagnostics.f_stat),
+                'logll': _setter('logll', diagnostics.log_likelihood),
+                'aic': _setter('aic', diagnostics.akaike),
+                'schwarz': _setter('schwarz', diagnostics.schwarz),
+                'mulColli': _setter('mulColli', diagnostics.condition_index),
+                'jarque_bera': _setter('jarque_bera', diagnostics.jarque_bera),
+                'breusch_pagan': _setter('breusch_pagan',
+                                         diagnostics.breusch_pagan),
+                'koenker_bassett': _setter('koenker_bassett',
+                                           diagnostics.koenker_bassett)}
+_LM_TESTS = dict.fromkeys(
+    ['lm_error', 'lm_lag', 'rlm_error', 'rlm_lag', 'lm_sarma'], _lm_tests)
+_LAG_MODELS = ('GM_Lag', 'ML_Lag', 'GM_Combo', 'GM_Combo_Hom', 'GM_Combo_Het')
+
+
+def _diagnostics(name, reg, kwargs, parent):
+    """
+    Diagnostics computed by the primary summary function name for reg (the
+    regression object it is called with if parent, one of its multireg
+    models otherwise), with the single function computing each of them, or
+    None if it is only available from the full summary
+    """
+    diag = {'summary': None}
+    spat_diag = kwargs.get('spat_diag')
+    if name.endswith('_multi'):
+        name = name[:-len('_multi')]
+        if parent:
+            # the summary of the regimes models is built, but their
+            # diagnostics are only computed for the spatial tests
+            if spat_diag and name == 'OLS':
+                diag.update(_LM_TESTS)
+                if kwargs.get('moran'):
+                    diag['moran_res'] = _moran_res
+            elif spat_diag and name == 'TSLS':
+                diag['ak_test'] = _ak_test
+            return diag
+    if name == 'OLS':
+        diag.update(_BETA_OLS)
+        if kwargs.get('nonspat_diag'):
+            diag.update(_NONSPAT_OLS)
+            if kwargs.get('white_test'):
+                diag['white'] = _setter('white', diagnostics.white)
+        if spat_diag:
+            diag.update(_LM_TESTS)
+            if kwargs.get('moran'):
+                diag['moran_res'] = _moran_res
+        return diag
+    diag.update(_BETA)
+    if name in _LAG_MODELS and np.abs(reg.rho) < 1:
+        diag['pr2_e'] = _setter('pr2_e', diagnostics_tsls.pr2_spatial)
+    if spat_diag and name in ('TSLS', 'GM_Lag'):
+        diag['ak_test'] = _ak_test
+    return diag
+
+
+def _snapshot(value):
+    """
+    Copy of an argument of a primary summary function that is not affected
+    by later changes to the caller's objects. Weights are reduced to the
+    sparse matrix of their current transformation.
+    """
+    if hasattr(value, 'sparse') and hasattr(value, 'n'):
+        return pysal.weights.WSP(value.sparse)
+    if isinstance(value, (dict, list)):
+        return COPY.copy(value)
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return value
+
+
+class DeferredSummary:
+
+    """
+    Pending call to one of the primary summary functions. It is stored in the
+    regression object(s) as '_summary_job' and run by
+    utils.RegressionPropsY.__getattr__ when one of the attributes it produces
+    is requested for the first time. The weights and arguments of the call
+    are snapshots taken when the model is fitted.
+
+    Parameters
+    ----------
+    name        : string
+                  Name of the primary summary function
+    args        : tuple
+                  Positional arguments of the call
+    kwargs      : dict
+                  Keyword arguments of the call
+
+    Attributes
+    ----------
+    done        : boolean
+                  True once the full summary has been computed
+    """
+
+    def __init__(self, name, args, kwargs):
+        self.name = name
+        self.args = tuple(_snapshot(arg) for arg in args)
+        self.kwargs = dict((k, _snapshot(v)) for k, v in kwargs.iteritems())
+        self.done = False
+        self._diag = {}  # {id(reg): (w, {attribute: single or None})}
+        self._add(args[0], self.kwargs.get('w'), True)
+        multireg = self.kwargs.get('multireg') or {}
+        regime_w = {}
+        uses_w = ('regime_w' in _PRIMARY[name].func_code.co_varnames and
+                  self.kwargs.get('spat_diag'))
+        for m, mreg in multireg.iteritems():
+            if uses_w:
+                regime_w[m] = _snapshot(mreg.w)
+            self._add(mreg, regime_w.get(m), False)
+        if regime_w:
+            self.kwargs['regime_w'] = regime_w
+
+    def _add(self, reg, w, parent):
+        self._diag[id(reg)] = (w, _diagnostics(self.name, reg, self.kwargs,
+                                               parent))
+
+    def provides(self, reg, attr):
+        """True if the summary (still to run) computes attr for reg"""
+        return not self.done and attr in self._diag.get(id(reg), (None, {}))[1]
+
+    def run(self):
+        if not self.done:
+            self.done = True
+            _PRIMARY[self.name](*self.args, **self.kwargs)
+
+    def get(self, reg, attr):
+        """
+        Computes attr in reg, on its own if possible and by running the full
+        summary otherwise
+        """
+        w, diag = self._diag[id(reg)]
+        if diag[attr] is None:
+            self.run()
+        else:
+            diag[attr](reg, w)
+
+
+def _deferred(func):
+    """
+    Replaces a primary summary function with one that registers the call in
+    reg (and in every model of multireg) instead of running it
+    """
+    _PRIMARY[func.__name__] = func
+
+    def deferred(reg, *args, **kwargs):
+        # all the arguments but reg are passed by keyword, so the snapshots
+        # know which one is the weights
+        names = func.func_code.co_varnames[1:func.func_code.co_argcount]
+        kwargs.update(zip(names, args))
+        job = DeferredSummary(func.__name__, (reg,), kwargs)
+        regs = [reg]
+        if kwargs.get('multireg'):
+            regs.extend(kwargs['multireg'].values())
+        for r in regs:
+            r._summary_job = job
+    deferred.__name__ = func.__name__
+    deferred.__doc__ = func.__doc__
+    return deferred
+
+
+def _regime_w(mreg, m, regime_w):
+    # weights of a regimes model, as snapshot when the model was fitted
+    if regime_w:
+        return regime_w[m]
+    return mreg.w
+
+
+def compute_summary(reg, attrs=None):
+    """
+    Runs the diagnostics and builds the summary of reg if they are still
+    pending, so the regression object is complete (e.g. before pickling it).
+    If attrs is given, only those diagnostics are computed, on their own
+    when possible (e.g. ['std_err', 'ak_test']).
+    """
+    try:
+        job = reg._summary_job
+    except AttributeError:
+        return
+    if attrs is None:
+        job.run()
+        return
+    for attr in attrs:
+        if job.provides(reg, attr) and attr not in reg.__dict__:
+            job.get(reg, attr)
+
+
+@_deferred
 def OLS(reg, vm, w, nonspat_diag, spat_diag, moran, white_test, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -56,7 +294,8 @@ def OLS(reg, vm, w, nonspat_diag, spat_diag, moran, white_test, regimes=False):
             nonspat_diag=nonspat_diag, spat_diag=spat_diag)
 
 
-def OLS_multi(reg, multireg, vm, nonspat_diag, spat_diag, moran, white_test, regimes=False, sur=False, w=False):
+@_deferred
+def OLS_multi(reg, multireg, vm, nonspat_diag, spat_diag, moran, white_test, regimes=False, sur=False, w=False, regime_w=None):
     for m in multireg:
         mreg = multireg[m]
         mreg.__summary = {}
@@ -82,7 +321,7 @@ def OLS_multi(reg, multireg, vm, nonspat_diag, spat_diag, moran, white_test, reg
                 'summary_nonspat_diag_2'] = summary_nonspat_diag_2(mreg)
         if spat_diag:
             # compute diagnostics and organize summary output
-            spat_diag_ols(mreg, mreg.w, moran)
+            spat_diag_ols(mreg, _regime_w(mreg, m, regime_w), moran)
         if regimes:
             summary_regimes(mreg, chow=False)
         if sur:
@@ -102,6 +341,7 @@ def OLS_multi(reg, multireg, vm, nonspat_diag, spat_diag, moran, white_test, reg
                   nonspat_diag=nonspat_diag, spat_diag=spat_diag)
 
 
+@_deferred
 def TSLS(reg, vm, w, spat_diag, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -118,7 +358,8 @@ def TSLS(reg, vm, w, spat_diag, regimes=False):
             nonspat_diag=False, spat_diag=spat_diag)
 
 
-def TSLS_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False):
+@_deferred
+def TSLS_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False, regime_w=None):
     for m in multireg:
         mreg = multireg[m]
         mreg.__summary = {}
@@ -126,7 +367,7 @@ def TSLS_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False):
         beta_diag(mreg, mreg.robust)
         if spat_diag:
             # compute diagnostics and organize summary output
-            spat_diag_instruments(mreg, mreg.w)
+            spat_diag_instruments(mreg, _regime_w(mreg, m, regime_w))
         # build coefficients table body
         build_coefs_body_instruments(mreg)
         if regimes:
@@ -148,6 +389,7 @@ def TSLS_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False):
                   instruments=True, nonspat_diag=False, spat_diag=spat_diag)
 
 
+@_deferred
 def GM_Lag(reg, vm, w, spat_diag, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -165,7 +407,8 @@ def GM_Lag(reg, vm, w, spat_diag, regimes=False):
             nonspat_diag=False, spat_diag=spat_diag)
 
 
-def GM_Lag_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False):
+@_deferred
+def GM_Lag_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False, regime_w=None):
     for m in multireg:
         mreg = multireg[m]
         mreg.__summary = {}
@@ -173,7 +416,7 @@ def GM_Lag_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False
         beta_diag_lag(mreg, mreg.robust, error=False)
         if spat_diag:
             # compute diagnostics and organize summary output
-            spat_diag_instruments(mreg, mreg.w)
+            spat_diag_instruments(mreg, _regime_w(mreg, m, regime_w))
         # build coefficients table body
         summary_coefs_allx(mreg, mreg.z_stat)
         summary_coefs_instruments(mreg)
@@ -195,6 +438,7 @@ def GM_Lag_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False
                   instruments=True, nonspat_diag=False, spat_diag=spat_diag)
 
 
+@_deferred
 def ML_Lag(reg, w, vm, spat_diag, regimes=False):  # extra space d
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -215,6 +459,7 @@ def ML_Lag(reg, w, vm, spat_diag, regimes=False):  # extra space d
 
 
 # extra space d
+@_deferred
 def ML_Lag_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False):
     for m in multireg:
         mreg = multireg[m]
@@ -241,6 +486,7 @@ def ML_Lag_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False
                   instruments=False, nonspat_diag=False, spat_diag=spat_diag)
 
 
+@_deferred
 def ML_Error(reg, w, vm, spat_diag, regimes=False):   # extra space d
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -261,6 +507,7 @@ def ML_Error(reg, w, vm, spat_diag, regimes=False):   # extra space d
 
 
 # extra space d
+@_deferred
 def ML_Error_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=False):
     for m in multireg:
         mreg = multireg[m]
@@ -287,6 +534,7 @@ def ML_Error_multi(reg, multireg, vm, spat_diag, regimes=False, sur=False, w=Fal
                   instruments=False, nonspat_diag=False, spat_diag=spat_diag)
 
 
+@_deferred
 def GM_Error(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -301,6 +549,7 @@ def GM_Error(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Error_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -321,6 +570,7 @@ def GM_Error_multi(reg, multireg, vm, regimes=False):
                   instruments=False, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Endog_Error(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -336,6 +586,7 @@ def GM_Endog_Error(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Endog_Error_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -357,6 +608,7 @@ def GM_Endog_Error_multi(reg, multireg, vm, regimes=False):
                   instruments=True, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Error_Hom(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -372,6 +624,7 @@ def GM_Error_Hom(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Error_Hom_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -393,6 +646,7 @@ def GM_Error_Hom_multi(reg, multireg, vm, regimes=False):
                   instruments=False, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Endog_Error_Hom(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -409,6 +663,7 @@ def GM_Endog_Error_Hom(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Endog_Error_Hom_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -431,6 +686,7 @@ def GM_Endog_Error_Hom_multi(reg, multireg, vm, regimes=False):
                   instruments=True, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Error_Het(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -446,6 +702,7 @@ def GM_Error_Het(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Error_Het_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -467,6 +724,7 @@ def GM_Error_Het_multi(reg, multireg, vm, regimes=False):
                   instruments=False, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Endog_Error_Het(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -483,6 +741,7 @@ def GM_Endog_Error_Het(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Endog_Error_Het_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -505,6 +764,7 @@ def GM_Endog_Error_Het_multi(reg, multireg, vm, regimes=False):
                   instruments=True, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Combo(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -521,6 +781,7 @@ def GM_Combo(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Combo_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -543,6 +804,7 @@ def GM_Combo_multi(reg, multireg, vm, regimes=False):
                   instruments=True, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Combo_Hom(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -559,6 +821,7 @@ def GM_Combo_Hom(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Combo_Hom_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
@@ -582,6 +845,7 @@ def GM_Combo_Hom_multi(reg, multireg, vm, regimes=False):
                   instruments=True, nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Combo_Het(reg, vm, w, regimes=False):
     reg.__summary = {}
     # compute diagnostics and organize summary output
@@ -598,6 +862,7 @@ def GM_Combo_Het(reg, vm, w, regimes=False):
             nonspat_diag=False, spat_diag=False)
 
 
+@_deferred
 def GM_Combo_Het_multi(reg, multireg, vm, regimes=False):
     for m in multireg:
         mreg = multireg[m]
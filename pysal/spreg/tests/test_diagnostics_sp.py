@@ -6,6 +6,7 @@ from pysal.spreg.ols import OLS as OLS
 from pysal.spreg.twosls import TSLS as TSLS
 from pysal.spreg.twosls_sp import GM_Lag
 from pysal.spreg.diagnostics_sp import LMtests, MoranRes, spDcache, AKtest
+from pysal.spreg.diagnostics_sp import LMtests_Batch
 
 
 class TestLMtests(unittest.TestCase):
@@ -51,6 +52,39 @@ class TestLMtests(unittest.TestCase):
         np.testing.assert_array_almost_equal(lms.sarma, sarma, decimal=6)
 
 
+class TestLMtestsBatch(unittest.TestCase):
+    def setUp(self):
+        db = pysal.open(pysal.examples.get_path("columbus.dbf"),"r")
+        self.y = np.array([db.by_col("HOVAL"), db.by_col("DISCBD"),
+                           db.by_col("CRIME")]).T
+        self.X = np.array([db.by_col("INC"), db.by_col("OPEN")]).T
+        w = pysal.open(pysal.examples.get_path('columbus.gal'), 'r').read()
+        w.transform='r'
+        self.w = w
+
+    def test_batch(self):
+        tests = ['lme', 'lml', 'rlme', 'rlml', 'sarma']
+        lms = LMtests_Batch(self.y, self.X, self.w, tests=tests + ['moran'])
+        for i in range(self.y.shape[1]):
+            ols = OLS(self.y[:, i:i + 1], self.X)
+            np.testing.assert_array_almost_equal(lms.betas[:, i:i + 1],
+                                                 ols.betas, decimal=6)
+            lm = LMtests(ols, self.w)
+            for test in tests:
+                np.testing.assert_array_almost_equal(getattr(lms, test)[i],
+                                                     getattr(lm, test),
+                                                     decimal=6)
+            m = MoranRes(ols, self.w, z=True)
+            np.testing.assert_array_almost_equal(lms.moran_res[i],
+                                                 [m.I, m.zI, m.p_norm],
+                                                 decimal=6)
+
+    def test_tests(self):
+        lms = LMtests_Batch(self.y[:, 0], self.X, self.w, tests=['lme'])
+        self.assertEqual(lms.lme.shape, (1, 2))
+        self.assertFalse(hasattr(lms, 'lml'))
+
+
 class TestMoranRes(unittest.TestCase):
     def setUp(self):
         db = pysal.open(pysal.examples.get_path("columbus.dbf"),"r")
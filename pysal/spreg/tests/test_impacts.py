@@ -0,0 +1,115 @@
+import unittest
+import warnings
+import pysal
+import scipy
+import numpy as np
+from pysal.spreg.ml_lag import ML_Lag
+from pysal.spreg.twosls_sp import GM_Lag
+from pysal.spreg.twosls_sp_regimes import GM_Lag_Regimes
+from pysal.spreg.impacts import Impacts, trace_series
+
+
+class TestImpacts(unittest.TestCase):
+    def setUp(self):
+        db = pysal.open(pysal.examples.get_path("baltim.dbf"), 'r')
+        self.y = np.array(db.by_col("PRICE")).T
+        self.y.shape = (len(self.y), 1)
+        self.x_names = ["NROOM", "AGE", "SQFT"]
+        self.x = np.array([db.by_col(var) for var in self.x_names]).T
+        self.regimes = db.by_col("CITCOU")
+        ww = pysal.open(pysal.examples.get_path("baltim_q.gal"))
+        self.w = ww.read()
+        ww.close()
+        self.w.transform = 'r'
+
+    def _exact(self, betas, rho, d=None):
+        n = self.w.n
+        if d is None:
+            d = np.ones(n)
+        S = np.linalg.inv(np.eye(n) - rho * self.w.full()[0])
+        direct = betas * np.sum(np.diag(S) * d) / n
+        total = betas * np.dot(S.sum(axis=0), d) / n
+        return direct, total
+
+    @unittest.skipIf(int(scipy.__version__.split(".")[1]) < 11,
+                     "Max Likelihood requires SciPy version 11 or newer.")
+    def test_ml_lag(self):
+        reg = ML_Lag(self.y, self.x, w=self.w, name_x=self.x_names)
+        imp = Impacts(reg, self.w)
+        self.assertEqual(imp.name, self.x_names)
+        direct, total = self._exact(reg.betas[1:-1], reg.rho)
+        np.testing.assert_array_almost_equal(imp.direct, direct, 2)
+        np.testing.assert_array_almost_equal(imp.total, total, 6)
+        np.testing.assert_array_almost_equal(imp.indirect,
+                                             imp.total - imp.direct, 8)
+        self.assertEqual(len(imp.total_z_stat), 3)
+        self.assertTrue((imp.direct_sd > 0).all())
+
+    def test_gm_lag(self):
+        reg = GM_Lag(self.y, self.x, w=self.w, name_x=self.x_names)
+        imp = Impacts(reg, self.w)
+        direct, total = self._exact(reg.betas[1:-1], reg.rho)
+        np.testing.assert_array_almost_equal(imp.direct, direct, 2)
+        np.testing.assert_array_almost_equal(imp.total, total, 6)
+
+    def test_gm_lag_regimes(self):
+        reg = GM_Lag_Regimes(self.y, self.x, self.regimes, w=self.w)
+        imp = Impacts(reg, self.w)
+        self.assertEqual(imp.name, ['0_var_1', '0_var_2', '0_var_3',
+                                    '1_var_1', '1_var_2', '1_var_3'])
+        d = (np.array(self.regimes) == 1) * 1.
+        direct, total = self._exact(reg.betas[5:8], reg.rho, d)
+        np.testing.assert_array_almost_equal(imp.direct[3:], direct, 2)
+        np.testing.assert_array_almost_equal(imp.total[3:], total, 6)
+
+    def test_discarded_draws(self):
+        reg = GM_Lag(self.y, self.x, w=self.w, name_x=self.x_names)
+        self.assertEqual(Impacts(reg, self.w).discarded, 0)
+        np.random.seed(12345)
+        w = pysal.lat2W(15, 15)
+        w.transform = 'r'
+        x = np.random.normal(size=(w.n, 2))
+        e = np.random.normal(size=(w.n, 1))
+        y = np.linalg.solve(np.eye(w.n) - 0.97 * w.full()[0],
+                            1 + np.dot(x, [[1.], [2.]]) + e)
+        reg = GM_Lag(y, x, w=w, w_lags=2)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            imp = Impacts(reg, w, ndraws=200)
+        self.assertEqual(imp.discarded, 5)
+        self.assertTrue(any('5 of the simulation draws' in str(c.message)
+                            for c in caught))
+        self.assertTrue('5 simulation draws' in imp.summary)
+
+    def test_discarded_draws_regimes(self):
+        # only the draws of the regime with rho close to 1 are discarded
+        np.random.seed(12345)
+        w = pysal.lat2W(20, 20)
+        w.transform = 'r'
+        regimes = [int(i % 20 >= 10) for i in range(w.n)]
+        rho = np.where(np.array(regimes) == 0, 0.97, 0.2)
+        x = np.random.normal(size=(w.n, 2))
+        e = np.random.normal(size=(w.n, 1))
+        y = np.linalg.solve(np.eye(w.n) - rho[:, None] * w.full()[0],
+                            1 + np.dot(x, [[1.], [2.]]) + e)
+        reg = GM_Lag_Regimes(y, x, regimes, w=w, w_lags=2,
+                             regime_lag_sep=True)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            imp = Impacts(reg, w, ndraws=200)
+        self.assertEqual(imp.discarded, 47)
+        self.assertEqual(imp.direct_sd.shape, (4, 1))
+        self.assertTrue(np.isfinite(imp.total_sd).all())
+
+    def test_trace_series(self):
+        a, b = trace_series(self.w, max_power=4, ntraces=500)
+        wf = self.w.full()[0]
+        w3 = np.dot(wf, np.dot(wf, wf))
+        self.assertAlmostEqual(a[0, 2], np.trace(np.dot(wf, wf)) / self.w.n)
+        self.assertAlmostEqual(a[0, 3], np.trace(w3) / self.w.n, 2)
+        np.testing.assert_array_almost_equal(b, np.ones((1, 5)))
+        self.assertTrue(trace_series(self.w, max_power=4, ntraces=500)[0] is a)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -121,5 +121,41 @@ class TestBaseOLS(unittest.TestCase):
         np.testing.assert_array_almost_equal(ols.t_stat[2][1], \
                 0.0108745049098,7)
 
+    def test_OLS_lazy_diagnostics(self):
+        self.w.transform = 'r'
+        ols = EC.OLS(self.y, self.X, self.w, spat_diag=True, moran=True)
+        self.assertFalse('summary' in ols.__dict__)
+        self.assertFalse('f_stat' in ols.__dict__)
+        # diagnostics use the weights as they were when the model was fitted
+        self.w.transform = 'b'
+        # single diagnostics are computed on their own
+        np.testing.assert_array_almost_equal(ols.f_stat, \
+            (12.358198885356581, 5.0636903313953024e-05), 7)
+        np.testing.assert_array_almost_equal(ols.moran_res[0], \
+            0.20705105912, 7)
+        self.assertAlmostEqual(ols.lm_error[0], 3.99294726743, 7)
+        self.assertFalse(ols._summary_job.done)
+        # unknown attributes do not run anything
+        self.assertFalse(hasattr(ols, 'moran_rse'))
+        self.assertFalse(hasattr(ols, 'white'))
+        self.assertFalse(ols._summary_job.done)
+        # the summary runs the full battery once
+        self.assert_("0.2071" in ols.summary)
+        self.assertTrue(ols._summary_job.done)
+
+    def test_lazy_subset(self):
+        self.w.transform = 'r'
+        reg = EC.GM_Lag(self.y, self.X, w=self.w, spat_diag=True)
+        EC.summary_output.compute_summary(reg, ['z_stat', 'ak_test'])
+        self.assertTrue('ak_test' in reg.__dict__)
+        self.assertFalse('pr2' in reg.__dict__)
+        self.assertFalse(reg._summary_job.done)
+        np.testing.assert_array_almost_equal(reg.ak_test, \
+            (2.0752728547900006, 0.14970316617988419), 7)
+        z_stat = reg.z_stat
+        EC.summary_output.compute_summary(reg)
+        self.assertTrue(reg._summary_job.done)
+        np.testing.assert_array_almost_equal(reg.z_stat, z_stat, 7)
+
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,8 @@ import numpy as np
 import pysal
 import pysal.spreg.diagnostics as D
 from pysal.spreg.twosls_sp import BaseGM_Lag, GM_Lag
+from pysal.spreg.utils import sp_att
+from pysal import lag_spatial
 
 class TestBaseGMLag(unittest.TestCase):
     def setUp(self):
@@ -363,6 +365,26 @@ class TestGMLag(unittest.TestCase):
         self.assertEqual(reg.name_gwk, name_gwk)
         self.assertEqual(reg.name_ds, name_ds)
 
+    def test_high_rho(self):
+        # rho >= 0.9 is passed as a (1,) array to the sparse LU solver
+        np.random.seed(12345)
+        w = pysal.lat2W(15, 15)
+        w.transform = 'r'
+        x = np.random.normal(size=(w.n, 2))
+        e = np.random.normal(size=(w.n, 1))
+        a = np.eye(w.n) - 0.97 * w.full()[0]
+        y = np.linalg.solve(a, 1 + np.dot(x, [[1.], [2.]]) + e)
+        reg = GM_Lag(y, x, w=w, w_lags=2)
+        np.testing.assert_array_almost_equal(reg.rho, [0.97507129], 7)
+        self.assertAlmostEqual(reg.pr2_e, 0.796050075902, 7)
+        xb = reg.predy - reg.rho * lag_spatial(w, y)
+        predy_e = np.linalg.solve(np.eye(w.n) - reg.rho * w.full()[0], xb)
+        np.testing.assert_array_almost_equal(reg.predy_e, predy_e, 7)
+        predy_e, resid_e, warn = sp_att(w, y, reg.predy, lag_spatial(w, y),
+                                        reg.rho)
+        np.testing.assert_array_almost_equal(predy_e, reg.predy_e, 7)
+        self.assertEqual(warn, None)
+
 
 
 if __name__ == '__main__':
@@ -9,6 +9,7 @@ __author__ = "Luc Anselin luc.anselin@asu.edu, \
 
 import numpy as np
 from scipy import sparse as SP
+from scipy.sparse import linalg as SPla
 import scipy.optimize as op
 import numpy.linalg as la
 from pysal import lag_spatial
@@ -20,7 +21,8 @@ class RegressionPropsY:
     """
     Helper class that adds common regression properties to any regression
     class that inherits it.  It takes no parameters.  See BaseOLS for example
-    usage.
+    usage. It also computes the diagnostics and summary of the user classes,
+    which are deferred until one of their attributes is first requested.
 
     Parameters
     ----------
@@ -34,6 +36,20 @@ class RegressionPropsY:
 
     """
 
+    def __getattr__(self, attr):
+        # Diagnostics and summary are computed on first request (see
+        # summary_output.DeferredSummary)
+        if attr.startswith('_'):
+            raise AttributeError, attr
+        job = self.__dict__.get('_summary_job')
+        if job is None or not job.provides(self, attr):
+            raise AttributeError, attr
+        job.get(self, attr)
+        try:
+            return self.__dict__[attr]
+        except KeyError:
+            raise AttributeError, attr
+
     @property
     def mean_y(self):
         if 'mean_y' not in self._cache:
@@ -203,6 +219,211 @@ def get_A2_hom(s):
     return (s + s.T) / 2.
 
 
+class spMoments:
+
+    """
+    Helper class to build, once per spatial weights matrix, the sparse
+    matrices, diagonals and traces used in the moment conditions of the GM
+    error models. Traces are obtained from element-wise products, so products
+    such as W'W or A1*A1 are never formed.
+    ...
+
+    Parameters
+    ----------
+
+    w           : csr_matrix
+                  PySAL W object converted into Scipy sparse matrix
+
+    Attributes
+    ----------
+
+    wpwt        : csr_matrix
+                  W + W'
+    A1_het      : csr_matrix
+                  A1 matrix as in get_A1_het
+    A1_hom      : csr_matrix
+                  A1 matrix as in get_A1_hom
+    A1_hom_sc   : csr_matrix
+                  A1 matrix as in get_A1_hom with scalarKP=True
+    A2_hom      : csr_matrix
+                  A2 matrix as in get_A2_hom
+    trWtW       : float
+                  Trace of W'W
+
+    Examples
+    --------
+
+    >>> import pysal
+    >>> w = pysal.lat2W(5, 5)
+    >>> w.transform = 'r'
+    >>> mw = get_spMoments(w.sparse)
+    >>> mw is get_spMoments(w.sparse)
+    True
+    >>> wtw = w.sparse.T * w.sparse
+    >>> np.allclose(mw.trWtW, wtw.diagonal().sum())
+    True
+    >>> A1 = mw.A1('hom_sc')
+    >>> np.allclose(mw.trace(A1, mw.A2_hom), (A1 * mw.A2_hom).diagonal().sum())
+    True
+
+    """
+
+    def __init__(self, w):
+        self.w = w
+        self._cache = {}
+        self._pairs = {}
+
+    @property
+    def wpwt(self):
+        if 'wpwt' not in self._cache:
+            self._cache['wpwt'] = (self.w + self.w.T).tocsr()
+        return self._cache['wpwt']
+
+    @property
+    def A1_het(self):
+        if 'A1_het' not in self._cache:
+            self._cache['A1_het'] = get_A1_het(self.w)
+        return self._cache['A1_het']
+
+    @property
+    def A1_hom(self):
+        if 'A1_hom' not in self._cache:
+            self._cache['A1_hom'] = get_A1_hom(self.w)
+        return self._cache['A1_hom']
+
+    @property
+    def A1_hom_sc(self):
+        if 'A1_hom_sc' not in self._cache:
+            self._cache['A1_hom_sc'] = get_A1_hom(self.w, scalarKP=True)
+        return self._cache['A1_hom_sc']
+
+    @property
+    def A2_hom(self):
+        if 'A2_hom' not in self._cache:
+            self._cache['A2_hom'] = get_A2_hom(self.w)
+        return self._cache['A2_hom']
+
+    @property
+    def trWtW(self):
+        if 'trWtW' not in self._cache:
+            self._cache['trWtW'] = self.trace(self.w.T, self.w)
+        return self._cache['trWtW']
+
+    def A1(self, A1='hom_sc'):
+        """
+        Returns the cached A1 matrix for the flag used by the estimators
+        ('hom', 'hom_sc' or 'het')
+        """
+        if A1 == 'hom':
+            return self.A1_hom
+        elif A1 == 'hom_sc':
+            return self.A1_hom_sc
+        elif A1 == 'het':
+            return self.A1_het
+        else:
+            raise Exception, "Invalid value passed to A1: %s" % A1
+
+    def _pair(self, key, a, b, builder):
+        # Entries keep a reference to the operands so ids cannot be recycled
+        cache_key = (key, id(a), id(b))
+        entry = self._pairs.get(cache_key)
+        if entry is None or entry[0] is not a or entry[1] is not b:
+            entry = (a, b, builder(a, b))
+            self._pairs[cache_key] = entry
+        return entry[2]
+
+    def sym(self, a):
+        """
+        Returns a + a' for a sparse matrix a
+        """
+        if a is self.w:
+            return self.wpwt
+        return self._pair('sym', a, a, lambda a, b: (a + a.T).tocsr())
+
+    def hadamard(self, a, b):
+        """
+        Returns the element-wise product of a and b', so that for diagonal
+        matrices E=diag(e), tr(a E b E) = e' (a o b') e
+        """
+        return self._pair('hadamard', a, b,
+                          lambda a, b: SP.csr_matrix(a.multiply(b.T)))
+
+    def trace(self, a, b):
+        """
+        Returns tr(a b) computed as the sum of the element-wise product of a
+        and b'
+        """
+        return self._pair('trace', a, b,
+                          lambda a, b: float(a.multiply(b.T).sum()))
+
+    def diagonal(self, a):
+        """
+        Returns the diagonal of a as a nx1 array
+        """
+        return self._pair('diagonal', a, a,
+                          lambda a, b: np.array([a.diagonal()]).T)
+
+    def cached(self, key, builder):
+        """
+        Returns the object stored under key, calling builder() to compute it
+        the first time it is requested
+        """
+        if key not in self._cache:
+            self._cache[key] = builder()
+        return self._cache[key]
+
+    def splu(self, scalar):
+        """
+        Returns the sparse LU factorization of (I - scalar * W). The factor
+        for the last scalar requested is kept, so repeated solves with the
+        same spatial parameter (e.g. several right-hand sides) reuse it.
+        """
+        scalar = _as_float(scalar)
+        if self._cache.get('splu_scalar') != scalar:
+            n = self.w.shape[0]
+            a = SP.identity(n, format='csc') - scalar * self.w.tocsc()
+            self._cache['splu'] = SPla.splu(a.tocsc())
+            self._cache['splu_scalar'] = scalar
+        return self._cache['splu']
+
+
+def _as_float(scalar):
+    """
+    Spatial parameters are often passed as arrays of shape (1,) or (1, 1)
+    (e.g. GM_Lag's rho); returns them as a float
+    """
+    return float(np.asarray(scalar).ravel()[0])
+
+
+def get_spMoments(w):
+    """
+    Returns the spMoments instance attached to the sparse weights matrix w,
+    building it on first use so every estimator run on the same W shares the
+    moment matrices and traces.
+
+    Parameters
+    ----------
+
+    w           : csr_matrix
+                  PySAL W object converted into Scipy sparse matrix
+
+    Returns
+    -------
+
+    moments     : spMoments
+                  Instance of spMoments for w
+    """
+    try:
+        return w._spMoments
+    except AttributeError:
+        mw = spMoments(w)
+        try:
+            w._spMoments = mw
+        except AttributeError:
+            pass
+        return mw
+
+
 def _moments2eqs(A1, s, u):
     '''
     Helper to compute G and g in a system of two equations as in
@@ -239,15 +460,16 @@ def _moments2eqs(A1, s, u):
     N. 1, pp. 1-13.
     '''
     n = float(s.shape[0])
+    mw = get_spMoments(s)
     A1u = A1 * u
     wu = s * u
     g1 = np.dot(u.T, A1u)
     g2 = np.dot(u.T, wu)
     g = np.array([[g1][0][0], [g2][0][0]]) / n
 
-    G11 = np.dot(u.T, ((A1 + A1.T) * wu))
+    G11 = np.dot(u.T, (mw.sym(A1) * wu))
     G12 = -np.dot((wu.T * A1), wu)
-    G21 = np.dot(u.T, ((s + s.T) * wu))
+    G21 = np.dot(u.T, (mw.wpwt * wu))
     G22 = -np.dot(wu.T, (s * wu))
     G = np.array([[G11[0][0], G12[0][0]], [G21[0][0], G22[0][0]]]) / n
     return [G, g]
@@ -418,13 +640,20 @@ def inverse_prod(w, data, scalar, post_multiply=False, inv_method="power_exp", t
                       pre-multiplies.
     inv_method      : string
                       If "true_inv" uses the true inverse of W (slow);
-                      If "power_exp" uses the power expansion method (default)
+                      If "power_exp" uses the power expansion method (default);
+                      If "splu" solves the system with a sparse LU
+                      factorization of (I - scalar * W), reused across calls
+                      with the same W and scalar;
+                      If "gmres" or "bicgstab" solves the system iteratively
+                      with the corresponding Krylov method, preconditioned
+                      with an incomplete LU factorization.
 
     threshold       : float
                       Test value to stop the iterations. Test is against
                       sqrt(increment' * increment), where increment is a
                       vector representing the contribution from each
-                      iteration.
+                      iteration. For "gmres" and "bicgstab" it is the
+                      relative tolerance of the solver.
 
     max_iterations  : integer
                       Maximum number of iterations for the expansion.   
@@ -450,6 +679,19 @@ def inverse_prod(w, data, scalar, post_multiply=False, inv_method="power_exp", t
     >>> inv_reg = inverse_prod(w, data, rho, inv_method="true_inv", post_multiply=True)
     >>> np.allclose(inv_pow, inv_reg, atol=0.0001)
     True
+    >>> # sparse solvers, also for rho close to 1
+    >>> rho = 0.99
+    >>> inv_reg = inverse_prod(w, data, rho, inv_method="true_inv")
+    >>> inv_lu = inverse_prod(w, data, rho, inv_method="splu")
+    >>> np.allclose(inv_lu, inv_reg)
+    True
+    >>> inv_gm = inverse_prod(w, data, rho, inv_method="gmres")
+    >>> np.allclose(inv_gm, inv_reg, atol=0.0001)
+    True
+    >>> inv_lu = inverse_prod(w, data, rho, inv_method="splu", post_multiply=True)
+    >>> inv_reg = inverse_prod(w, data, rho, inv_method="true_inv", post_multiply=True)
+    >>> np.allclose(inv_lu, inv_reg)
+    True
 
     """
     if inv_method == "power_exp":
@@ -465,11 +707,97 @@ def inverse_prod(w, data, scalar, post_multiply=False, inv_method="power_exp", t
             inv_prod = spdot(data.T, matrix)
         else:
             inv_prod = spdot(matrix, data)
+    elif inv_method == "splu":
+        inv_prod = splu_solve(w, data, scalar, post_multiply=post_multiply)
+    elif inv_method in ["gmres", "bicgstab"]:
+        inv_prod = krylov_solve(
+            w, data, scalar, post_multiply=post_multiply, solver=inv_method,
+            threshold=threshold, max_iterations=max_iterations)
     else:
         raise Exception, "Invalid method selected for inversion."
     return inv_prod
 
 
+def _inv_method(scalar):
+    """
+    Picks the inversion method for the spatial filter: the power expansion
+    converges quickly for moderate values of the spatial parameter, while
+    for values close to the boundary a sparse LU solve is both faster and
+    more accurate.
+    """
+    if np.abs(scalar) < 0.9:
+        return "power_exp"
+    return "splu"
+
+
+def splu_solve(w, data, scalar, post_multiply=False):
+    """
+    Solve (I - scalar * W)x = data (or x'(I - scalar * W) = data' if
+    post_multiply) using a sparse LU factorization that is cached with the
+    weights, so it is computed only once for many right-hand sides.
+
+    Examples
+    --------
+    Tests for this function are in inverse_prod()
+
+    """
+    try:
+        ws = w.sparse
+    except:
+        ws = w
+    lu = get_spMoments(ws).splu(scalar)
+    data = np.asarray(data, dtype=float)
+    if post_multiply:
+        return lu.solve(data, trans='T').T
+    return lu.solve(data)
+
+
+def krylov_solve(w, data, scalar, post_multiply=False, solver="gmres",
+                 threshold=0.0000000001, max_iterations=None):
+    """
+    Solve (I - scalar * W)x = data (or x'(I - scalar * W) = data' if
+    post_multiply) column by column with a Krylov method (GMRES or
+    BiCGSTAB) preconditioned with an incomplete LU factorization.
+
+    Examples
+    --------
+    Tests for this function are in inverse_prod()
+
+    """
+    try:
+        ws = w.sparse
+    except:
+        ws = w
+    n = ws.shape[0]
+    scalar = _as_float(scalar)
+    if post_multiply:
+        ws = ws.T
+    a = (SP.identity(n, format='csc') - scalar * ws.tocsc()).tocsc()
+    ilu = SPla.spilu(a)
+    m = SPla.LinearOperator((n, n), ilu.solve)
+    if solver == "gmres":
+        method = SPla.gmres
+    elif solver == "bicgstab":
+        method = SPla.bicgstab
+    else:
+        raise ValueError, "Invalid solver selected: %s" % solver
+    data = np.asarray(data, dtype=float)
+    b = data.reshape((n, -1))
+    x = np.zeros(b.shape, float)
+    for j in range(b.shape[1]):
+        x[:, j], info = method(a, b[:, j], tol=threshold,
+                               maxiter=max_iterations, M=m)
+        if info > 0:
+            raise la.LinAlgError, "%s did not converge after %i iterations" % (
+                solver, info)
+        elif info < 0:
+            raise la.LinAlgError, "Illegal input or breakdown in %s" % solver
+    x.shape = data.shape
+    if post_multiply:
+        return x.T
+    return x
+
+
 def power_expansion(w, data, scalar, post_multiply=False, threshold=0.0000000001, max_iterations=None):
     """
     Compute the inverse of a matrix using the power expansion (Leontief
@@ -574,7 +902,7 @@ def iter_msg(iteration, max_iter):
 def sp_att(w, y, predy, w_y, rho):
     xb = predy - rho * w_y
     if np.abs(rho) < 1:
-        predy_sp = inverse_prod(w, xb, rho)
+        predy_sp = inverse_prod(w, xb, rho, inv_method=_inv_method(rho))
         warn = None
         # Note 1: Here if omitting pseudo-R2; If not, see Note 2.
         resid_sp = y - predy_sp
@@ -4,9 +4,10 @@ Contiguity based spatial weights.
 """
 
 __author__ = "Sergio J. Rey <srey@asu.edu> "
-__all__ = ['buildContiguity']
+__all__ = ['buildContiguity', 'buildSharedPerimeter']
 
 import pysal
+from scipy import sparse
 from _contW_binning import ContiguityWeights_binning as ContiguityWeights
 from _contW_binning import ContiguityWeightsPolygons
 
@@ -98,3 +99,87 @@ def buildContiguity(polygons, criterion="rook", ids=None):
             neighbors[key] = list(neighbor_data[key])
     return pysal.weights.W(neighbors, id_order=ids)
 
+
+
+def buildSharedPerimeter(polygons, ids=None, normalize=True):
+    """
+    Build shared perimeter weights from a source.
+
+    The length of boundary shared by every pair of polygons is computed in
+    one pass over the edges of all the polygons (see
+    pysal.cg.GeometryArray.shared_boundaries).
+
+    Parameters
+    ----------
+
+    polygons   : 
+                 an instance of a pysal geo file handler (any thing
+                 returned by pysal.open that is explicitly polygons), or
+                 a pysal.cg.GeometryArray of polygons
+    ids        : list
+                 identifiers for i,j
+    normalize  : boolean
+                 If True, w_ij is the length of boundary shared by i and j
+                 divided by the perimeter of i, if False the length itself
+
+    Returns
+    -------
+
+    w         : W 
+                instance; shared perimeter weights object, the neighbors
+                are the rook neighbors
+
+    Examples
+    --------
+
+    >>> w = buildSharedPerimeter(pysal.open(pysal.examples.get_path('columbus.shp'),'r'))
+    >>> w.neighbors[0]
+    [1, 2]
+    >>> ["%.4f" % v for v in w.weights[0]]
+    ['0.0945', '0.1458']
+    >>> w = buildSharedPerimeter(pysal.open(pysal.examples.get_path('columbus.shp'),'r'), normalize=False)
+    >>> "%.4f" % w[1][0]
+    '0.2307'
+    >>> "%.4f" % w[0][1]
+    '0.2307'
+
+    Notes
+    -----
+
+    Boundaries are shared when the two polygons have the same vertices
+    along them, as rook contiguity requires.
+
+    """
+
+    if ids and len(ids) != len(set(ids)):
+        raise ValueError("The argument to the ids parameter contains duplicate entries.")
+
+    if isinstance(polygons, pysal.cg.GeometryArray):
+        geometries = polygons
+    elif issubclass(type(polygons), pysal.open):
+        polygons.seek(0)  # Make sure we read from the beginging of the file.
+        if hasattr(polygons, 'read_arrays'):
+            geometries = pysal.cg.GeometryArray.from_arrays(
+                polygons.read_arrays())
+        else:
+            geometries = pysal.cg.GeometryArray.from_shapes(polygons.read())
+    else:
+        raise TypeError(
+            "Argument must be a FileIO handler or a GeometryArray.")
+    n = len(geometries)
+    i, j, lengths = geometries.shared_boundaries()
+    shared = sparse.coo_matrix((lengths, (i, j)), shape=(n, n))
+    shared = (shared + shared.T).tocsr()
+    if normalize:
+        shared = sparse.diags([1.0 / geometries.perimeter], [0]) * shared
+    shared.sort_indices()
+    neighbors = {}
+    weights = {}
+    for key in xrange(n):
+        row = slice(shared.indptr[key], shared.indptr[key + 1])
+        if ids:
+            neighbors[ids[key]] = [ids[x] for x in shared.indices[row]]
+        else:
+            neighbors[key] = shared.indices[row].tolist()
+        weights[ids[key] if ids else key] = shared.data[row].tolist()
+    return pysal.weights.W(neighbors, weights, id_order=ids)
@@ -108,7 +108,7 @@ def knnW(data, k=2, p=2, ids=None, pct_unique=0.25):
 
     """
 
-    if issubclass(type(data), scipy.spatial.KDTree):
+    if isinstance(data, (scipy.spatial.KDTree, scipy.spatial.cKDTree)):
         kd = data
         data = kd.data
         nnq = kd.query(data, k=k+1, p=p)
@@ -303,7 +303,7 @@ class Kernel(W):
     def __init__(self, data, bandwidth=None, fixed=True, k=2,
                  function='triangular', eps=1.0000001, ids=None,
                  diagonal=False):
-        if issubclass(type(data), scipy.spatial.KDTree):
+        if isinstance(data, (scipy.spatial.KDTree, scipy.spatial.cKDTree)):
             self.kdt = data
             self.data = self.kdt.data
             data = self.data
@@ -475,7 +475,7 @@ class DistanceBand(W):
         See detail in pysal issue #126.
 
         """
-        if issubclass(type(data), scipy.spatial.KDTree):
+        if isinstance(data, (scipy.spatial.KDTree, scipy.spatial.cKDTree)):
             self.kd = data
             self.data = self.kd.data
         else:
@@ -1,3 +1,4 @@
+import numpy as np
 import pysal.cg.rtree as rtree
 from pysal.cg.standalone import get_shared_segments
 #Order by Degree of connectivity, i.e. rook is more connected then queen.
@@ -37,7 +38,6 @@ class _PolyQ(dict):
 
 class ContiguityWeights_rtree:
     def __init__(self, geoObj, joinType=ROOK):
-        self.index = rtree.Rtree()
         self.geoObj = geoObj
         self.joinType = joinType
         self.w = {}
@@ -49,21 +49,33 @@ class ContiguityWeights_rtree:
         #print "Hits: ",self.cache_hits
 
     def create(self):
+        bboxes = self.bboxes()
+        self.index = rtree.PackedRTree(bboxes)
+        # grow the bounding boxes slightly to handle coincident edges
+        offsets, candidates = self.index.query_rects(
+            bboxes + [-rtree.BUFFER, -rtree.BUFFER, rtree.BUFFER, rtree.BUFFER])
         for id, poly in enumerate(self.geoObj):
             poly.id = id
-            self.append(poly)
+            self.append(poly, candidates[offsets[id]:offsets[id + 1]])
 
-    def append(self, poly):
+    def bboxes(self):
+        "nx4 array with the bounding box of each polygon"
+        try:
+            return self.geoObj.dataObj.read_bboxes()
+        except AttributeError:
+            bboxes = [poly.bounding_box for poly in self.geoObj]
+            return np.array([[b.left, b.lower, b.right, b.upper]
+                             for b in bboxes], float).reshape((-1, 4))
+
+    def append(self, poly, candidates):
+        "checks poly against the candidates with a lower id"
         self.Q.add(poly)
-        b = poly.bounding_box
-        bbox = [b.left, b.lower, b.right, b.upper]
-        for id in self.index.intersection(bbox):
+        for id in candidates[candidates < poly.id]:
             id = int(id)
             if self.check(id, poly) >= self.joinType:
                 self.setW(id, poly.id)
         if poly.id not in self.w:  # add the null cases
             self.w[poly.id] = set()
-        self.index.add(poly.id, bbox)
 
     def setW(self, id0, id1):
         "updates the W matrix seting two polygon's as neighbors"
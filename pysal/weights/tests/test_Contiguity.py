@@ -22,6 +22,27 @@ class TestContiguity(unittest.TestCase):
         self.assertEqual(w['35001000107'], {'35001003805': 1.0, '35001003721':
                                             1.0, '35001000111': 1.0, '35001000112': 1.0, '35001000108': 1.0})
 
+    def test_buildSharedPerimeter(self):
+        shp = pysal.open(self.polyShp, 'r')
+        polygons = shp.read()
+        w = pysal.buildSharedPerimeter(shp, normalize=False)
+        rook = pysal.buildContiguity(pysal.open(self.polyShp, 'r'))
+        for i in rook.neighbors:
+            self.assertEqual(set(w.neighbors[i]), set(rook.neighbors[i]))
+        for i in (0, 5, 85):
+            for j, length in w[i].iteritems():
+                segments = pysal.cg.get_shared_segments(polygons[i],
+                                                        polygons[j])
+                self.assertAlmostEqual(length,
+                                       sum(seg.len for seg in segments))
+        fips = pysal.open(pysal.examples.get_path('10740.dbf')).by_col('STFID')
+        w = pysal.buildSharedPerimeter(shp, ids=fips)
+        self.assertAlmostEqual(sum(w['35001000107'].values()) *
+                               polygons[0].perimeter, sum(
+                                   seg.len for j in rook.neighbors[0]
+                                   for seg in pysal.cg.get_shared_segments(
+                                       polygons[0], polygons[j])))
+
 
 if __name__ == "__main__":
     unittest.main()
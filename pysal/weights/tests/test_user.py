@@ -17,6 +17,19 @@ class Testuser(unittest.TestCase):
     def test_rook_from_shapefile(self):
         self.assertAlmostEquals(self.wr.pct_nonzero, 8.329862557267806)
 
+    def test_shared_perimeter_from_shapefile(self):
+        shp = pysal.examples.get_path("columbus.shp")
+        wp = pysal.shared_perimeter_from_shapefile(shp)
+        for i in self.wr.neighbors:
+            self.assertEqual(set(wp.neighbors[i]), set(self.wr.neighbors[i]))
+        perimeters = [p.perimeter for p in pysal.open(shp)]
+        lengths = pysal.shared_perimeter_from_shapefile(shp, normalize=False)
+        for i in wp.neighbors:
+            np.testing.assert_allclose(
+                np.array(wp.weights[i]) * perimeters[i], lengths.weights[i])
+            for j, length in lengths[i].iteritems():
+                self.assertAlmostEquals(lengths[j][i], length)
+
     def test_knnW_from_array(self):
         import numpy as np
         x, y = np.indices((5, 5))
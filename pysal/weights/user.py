@@ -6,12 +6,13 @@ contiguity and distance criteria.
 __author__ = "Sergio J. Rey <srey@asu.edu> "
 
 import pysal
-from Contiguity import buildContiguity
+from Contiguity import buildContiguity, buildSharedPerimeter
 from Distance import knnW, Kernel, DistanceBand
 from util import get_ids, get_points_array_from_shapefile, min_threshold_distance
 import numpy as np
+import os
 
-__all__ = ['queen_from_shapefile', 'rook_from_shapefile', 'knnW_from_array', 'knnW_from_shapefile', 'threshold_binaryW_from_array', 'threshold_binaryW_from_shapefile', 'threshold_continuousW_from_array', 'threshold_continuousW_from_shapefile', 'kernelW', 'kernelW_from_shapefile', 'adaptive_kernelW', 'adaptive_kernelW_from_shapefile', 'min_threshold_dist_from_shapefile', 'build_lattice_shapefile']
+__all__ = ['queen_from_shapefile', 'rook_from_shapefile', 'shared_perimeter_from_shapefile', 'knnW_from_array', 'knnW_from_shapefile', 'threshold_binaryW_from_array', 'threshold_binaryW_from_shapefile', 'threshold_continuousW_from_array', 'threshold_continuousW_from_shapefile', 'kernelW', 'kernelW_from_shapefile', 'adaptive_kernelW', 'adaptive_kernelW_from_shapefile', 'min_threshold_dist_from_shapefile', 'build_lattice_shapefile']
 
 
 def queen_from_shapefile(shapefile, idVariable=None, sparse=False):
@@ -58,20 +59,25 @@ def queen_from_shapefile(shapefile, idVariable=None, sparse=False):
     :class:`pysal.weights.W`
 
     """
-    shp = pysal.open(shapefile)
-    w = buildContiguity(shp, criterion='queen')
-    if idVariable:
-        ids = get_ids(shapefile, idVariable)
-        w.remap_ids(ids)
-    else:
-        ids = None
-    shp.close()
-    w.set_shapefile(shapefile, idVariable)
+    def builder():
+        shp = pysal.open(shapefile)
+        w = buildContiguity(shp, criterion='queen')
+        if idVariable:
+            ids = get_ids(shapefile, idVariable)
+            w.remap_ids(ids)
+        else:
+            ids = None
+        shp.close()
+        w.set_shapefile(shapefile, idVariable)
+
+        if sparse:
+            w = pysal.weights.WSP(w.sparse, id_order=ids)
 
-    if sparse:
-        w = pysal.weights.WSP(w.sparse, id_order=ids)
+        return w
 
-    return w
+    return pysal.core.IOCache.cache.fetch(
+        shapefile, ('queen_from_shapefile', idVariable, sparse), builder,
+        pysal.core.IOCache.share_weights, _id_files(shapefile, idVariable))
 
 
 def rook_from_shapefile(shapefile, idVariable=None, sparse=False):
@@ -114,21 +120,106 @@ def rook_from_shapefile(shapefile, idVariable=None, sparse=False):
     :class:`pysal.weights.W`
 
     """
-    shp = pysal.open(shapefile)
-    w = buildContiguity(shp, criterion='rook')
-    if idVariable:
-        ids = get_ids(shapefile, idVariable)
-        w.remap_ids(ids)
-    else:
-        ids = None
-    shp.close()
-    w.set_shapefile(shapefile, idVariable)
+    def builder():
+        shp = pysal.open(shapefile)
+        w = buildContiguity(shp, criterion='rook')
+        if idVariable:
+            ids = get_ids(shapefile, idVariable)
+            w.remap_ids(ids)
+        else:
+            ids = None
+        shp.close()
+        w.set_shapefile(shapefile, idVariable)
+
+        if sparse:
+            w = pysal.weights.WSP(w.sparse, id_order=ids)
 
-    if sparse:
-        w = pysal.weights.WSP(w.sparse, id_order=ids)
+        return w
 
+    return pysal.core.IOCache.cache.fetch(
+        shapefile, ('rook_from_shapefile', idVariable, sparse), builder,
+        pysal.core.IOCache.share_weights, _id_files(shapefile, idVariable))
 
-    return w
+
+def shared_perimeter_from_shapefile(shapefile, idVariable=None,
+                                    normalize=True, sparse=False):
+    """
+    Shared perimeter weights from a polygon shapefile.
+
+    Parameters
+    ----------
+
+    shapefile   : string
+                  name of polygon shapefile including suffix.
+    idVariable  : string
+                  name of a column in the shapefile's DBF to use for ids.
+    normalize   : boolean
+                  If True, w_ij is the length of boundary shared by i and j
+                  divided by the perimeter of i
+                  If False, w_ij is the length of boundary shared
+    sparse      : boolean
+                  If True return WSP instance
+                  If False return W instance
+
+    Returns
+    -------
+
+    w            : W
+                   instance of spatial weights
+
+    Examples
+    --------
+    >>> wp = shared_perimeter_from_shapefile(pysal.examples.get_path("columbus.shp"))
+    >>> "%.3f"%wp.pct_nonzero
+    '8.330'
+    >>> "%.4f"%wp[0][1]
+    '0.0945'
+    >>> wp = shared_perimeter_from_shapefile(pysal.examples.get_path("columbus.shp"), "POLYID", normalize=False)
+    >>> "%.4f"%wp[2][1]
+    '0.2307'
+
+    Notes
+    -----
+
+    The neighbors are the rook neighbors, the length of boundary shared by
+    all the pairs of polygons is computed at once from the columnar
+    geometry arrays of the shapefile.
+
+    See Also
+    --------
+    :class:`pysal.weights.W`
+    :func:`pysal.weights.Contiguity.buildSharedPerimeter`
+
+    """
+    def builder():
+        shp = pysal.open(shapefile)
+        if idVariable:
+            ids = get_ids(shapefile, idVariable)
+        else:
+            ids = None
+        w = buildSharedPerimeter(shp, ids=ids, normalize=normalize)
+        shp.close()
+        w.set_shapefile(shapefile, idVariable)
+
+        if sparse:
+            w = pysal.weights.WSP(w.sparse, id_order=ids)
+
+        return w
+
+    return pysal.core.IOCache.cache.fetch(
+        shapefile, ('shared_perimeter_from_shapefile', idVariable, normalize,
+                    sparse), builder, pysal.core.IOCache.share_weights,
+        _id_files(shapefile, idVariable))
+
+
+def _id_files(shapefile, idVariable):
+    """
+    Files, besides the shapefile, that weights built from it depend on:
+    the DBF read by get_ids when idVariable is given
+    """
+    if idVariable:
+        return [os.path.splitext(shapefile)[0] + '.dbf']
+    return []
 
 
 def spw_from_gal(galfile):
@@ -1094,7 +1094,7 @@ def min_threshold_distance(data, p=2):
     1.0
 
     """
-    if issubclass(type(data), scipy.spatial.KDTree):
+    if isinstance(data, (scipy.spatial.KDTree, scipy.spatial.cKDTree)):
         kd = data
         data = kd.data
     else:
@@ -1087,6 +1087,23 @@ class WSP(object):
             self._cache['s0'] = self._s0
         return self._s0
 
+    @property
+    def s1(self):
+        """s1 is defined as
+
+        .. math::
+
+               s1=1/2 \sum_i \sum_j (w_{i,j} + w_{j,i})^2
+
+        """
+        if 's1' not in self._cache:
+            t = self.sparse.transpose()
+            t = t + self.sparse
+            t2 = t.multiply(t)  # element-wise square
+            self._s1 = t2.sum() / 2.
+            self._cache['s1'] = self._s1
+        return self._s1
+
     @property
     def trcWtW_WW(self):
         """Trace of :math:`W^{'}W + WW`.